@@ -1,34 +1,106 @@
+import logging
+import os
+
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
 from flask import Flask
 from flask_cors import CORS
+from flask_migrate import Migrate
+from sqlalchemy import inspect
 from config.config import Config
 from models.models import db
 from routes.auth import auth_bp
 from routes.soap import soap_bp
-from routes.documents import documents_bp
+from routes.documents import documents_bp, init_document_jobs
 from routes.medications import medications_bp
+from routes.conditions import conditions_bp
 from routes.reports import reports_bp
+from utils import report_search
+from utils.files import make_private_dir
+from utils.preprocess import check_preset
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Where files holding patient data go unless configured elsewhere, relative
+# to the instance folder
+INSTANCE_FILES = {
+    "OCR_CACHE_PATH": "ocr_cache.db",
+    "ANALYSIS_CACHE_PATH": "analysis_cache.db",
+    "JOB_SPOOL_DIR": "jobs",
+    "REFERENCE_DATA_PATH": "reference_data.db",
+}
+
+
+def init_database():
+    """Prepare the database and return whether its schema is up to date.
+
+    A new, empty database gets the tables of the current models and is
+    stamped with the latest migration. A database Alembic has stamped is
+    left to the migrations (flask db upgrade), with a warning if it is
+    behind them. One made before migrations were tracked still gets any
+    missing tables created.
+    """
+    with db.engine.connect() as connection:
+        tables = inspect(connection).get_table_names()
+        current = MigrationContext.configure(connection).get_current_revision()
+    scripts = ScriptDirectory(MIGRATIONS_DIR)
+    head = scripts.get_current_head()
+
+    if current is None:
+        db.create_all()
+        report_search.ensure_index()
+        if not tables:
+            with db.engine.begin() as connection:
+                MigrationContext.configure(connection).stamp(scripts, head)
+        return True
+
+    report_search.ensure_index(create=False)
+    if current != head:
+        logger.warning(
+            f"Database schema is at {current}, not {head}: run flask db upgrade"
+        )
+        return False
+    return True
 
 
 def create_app():
     app = Flask(__name__)
 
-    # Load configuration
+    # Keep caches and spooled uploads in the instance folder, private to
+    # this user, unless they are configured elsewhere
+    make_private_dir(app.instance_path)
+    for name, filename in INSTANCE_FILES.items():
+        if not getattr(Config, name):
+            setattr(Config, name, os.path.join(app.instance_path, filename))
+    make_private_dir(Config.JOB_SPOOL_DIR)
+
+    # Load configuration, failing now on settings every upload would trip on
+    check_preset(Config.OCR_PREPROCESS)
     app.config.from_object(Config)
 
     # Initialize extensions
     CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
     db.init_app(app)
+    Migrate(
+        app, db, directory=MIGRATIONS_DIR, include_object=report_search.include_object
+    )
 
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(soap_bp)
     app.register_blueprint(documents_bp)
     app.register_blueprint(medications_bp)
+    app.register_blueprint(conditions_bp)
     app.register_blueprint(reports_bp)
 
-    # Create database tables
+    # Create the tables of a new database
     with app.app_context():
-        db.create_all()
+        schema_current = init_database()
+
+    # Start background document processing
+    init_document_jobs(app, resume=schema_current)
 
     return app
 
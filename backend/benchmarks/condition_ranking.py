@@ -0,0 +1,79 @@
+"""Measure symptom-to-condition ranking on a synthetic reference set.
+
+Builds a ConditionRanker over --conditions conditions drawn from
+--symptoms symptoms, then times single queries and batches of queries
+with each scoring method.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.condition_ranking --conditions 10000 --symptoms 1000
+"""
+import argparse
+import random
+import time
+
+from utils.conditions import METHODS, ConditionRanker
+
+
+def synthetic_reference(condition_count, symptom_count, seed):
+    """Return (conditions, symptoms), with some symptoms far more common."""
+    rng = random.Random(seed)
+    symptoms = [{"id": str(i), "name": f"Symptom {i}"} for i in range(symptom_count)]
+    weights = [1 / (rank + 1) for rank in range(symptom_count)]
+    conditions = []
+    for i in range(condition_count):
+        chosen = set(rng.choices(range(symptom_count), weights, k=rng.randint(3, 12)))
+        conditions.append(
+            {
+                "id": str(i),
+                "name": f"Condition {i}",
+                "symptoms": [str(s) for s in sorted(chosen)],
+            }
+        )
+    return conditions, symptoms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conditions", type=int, default=10_000)
+    parser.add_argument("--symptoms", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    conditions, symptoms = synthetic_reference(args.conditions, args.symptoms, args.seed)
+    start = time.perf_counter()
+    ranker = ConditionRanker.build(conditions, symptoms)
+    print(
+        f"Built {args.conditions} x {args.symptoms} matrix in "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+
+    rng = random.Random(args.seed + 1)
+
+    def symptom_set():
+        return [str(rng.randrange(args.symptoms)) for _ in range(rng.randint(1, 6))]
+
+    queries = [symptom_set() for _ in range(args.queries)]
+    batch = [symptom_set() for _ in range(args.batch)]
+
+    print(f"{'method':<10}{'single ms':>12}{'batch s':>10}{'sets/s':>10}")
+    for method in METHODS:
+        start = time.perf_counter()
+        for query in queries:
+            ranker.rank(query, args.limit, method)
+        single = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        ranker.rank_many(batch, args.limit, method)
+        batched = time.perf_counter() - start
+        print(
+            f"{method:<10}{single * 1000:>12.2f}{batched:>10.2f}"
+            f"{len(batch) / batched:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Measure interaction lookups on a synthetic interaction table.
+
+Builds an InteractionIndex over --pairs random medication pairs, checks its
+answers against a linear scan of the table, then times lookups for
+selections of each size in --selected, and bulk checks of --lists
+medication lists one by one and with find_many.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.interaction_lookup --pairs 500000 --selected 2 5 10 50
+"""
+import argparse
+import gc
+import random
+import time
+
+from utils.interactions import InteractionIndex, pair_key
+from utils.metrics import current_rss
+
+SEVERITIES = ("low", "moderate", "high")
+
+
+def synthetic_interactions(pair_count, medication_count, seed):
+    """Return pair_count distinct interactions, skewed towards common drugs."""
+    rng = random.Random(seed)
+    seen = set()
+    interactions = []
+    while len(interactions) < pair_count:
+        # Squaring the draw makes low ids far more connected, as in real data
+        medication1 = int(medication_count * rng.random() ** 2)
+        medication2 = rng.randrange(medication_count)
+        key = pair_key(str(medication1), str(medication2))
+        if medication1 == medication2 or key in seen:
+            continue
+        seen.add(key)
+        interactions.append(
+            {
+                "medication1": key[0],
+                "medication2": key[1],
+                "severity": rng.choice(SEVERITIES),
+                "description": f"Synthetic interaction {len(interactions)}",
+            }
+        )
+    return interactions
+
+
+def linear_scan(interactions, selected):
+    """The lookup check_interactions used before the index."""
+    return [
+        interaction
+        for interaction in interactions
+        if interaction["medication1"] in selected
+        and interaction["medication2"] in selected
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=500_000)
+    parser.add_argument("--medications", type=int, default=20_000)
+    parser.add_argument("--selected", type=int, nargs="+", default=[2, 5, 10, 20, 50])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--lists", type=int, default=20000, help="bulk check size")
+    parser.add_argument("--verify", type=int, default=20, help="queries checked by scan")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    interactions = synthetic_interactions(args.pairs, args.medications, args.seed)
+    print(f"Generated {len(interactions)} pairs in {time.perf_counter() - start:.2f}s")
+
+    rss_before = current_rss()
+    start = time.perf_counter()
+    index = InteractionIndex.build(interactions)
+    print(
+        f"Built index in {time.perf_counter() - start:.2f}s, "
+        f"+{(current_rss() - rss_before) / 2**20:.0f} MB"
+    )
+
+    rng = random.Random(args.seed + 1)
+    medications = [str(i) for i in range(args.medications)]
+    # Bias selections towards well-connected drugs so lookups find something
+    common = medications[: max(1, args.medications // 20)]
+
+    def selection(size):
+        picks = rng.sample(common, min(size // 2, len(common)))
+        return picks + rng.sample(medications, size - len(picks))
+
+    for size in args.selected:
+        for _ in range(args.verify):
+            selected = selection(size)
+            if index.find(selected) != linear_scan(interactions, set(selected)):
+                raise SystemExit(f"Index and scan disagree for {selected}")
+
+    print(f"{'selected':>9}{'index us':>10}{'scan ms':>10}{'speedup':>10}{'found':>8}")
+    for size in args.selected:
+        queries = [selection(size) for _ in range(args.queries)]
+        start = time.perf_counter()
+        found = sum(len(index.find(selected)) for selected in queries)
+        index_time = (time.perf_counter() - start) / len(queries)
+
+        scan_queries = queries[: max(1, args.verify)]
+        start = time.perf_counter()
+        for selected in scan_queries:
+            linear_scan(interactions, set(selected))
+        scan_time = (time.perf_counter() - start) / len(scan_queries)
+
+        print(
+            f"{size:>9}{index_time * 1e6:>10.1f}{scan_time * 1e3:>10.1f}"
+            f"{scan_time / index_time:>10.0f}{found / len(queries):>8.2f}"
+        )
+
+    # Bulk checks: patient lists of 2 to 15 medications
+    lists = [selection(rng.randint(2, 15)) for _ in range(args.lists)]
+    # Start each run from a clean heap so a collection of the large index
+    # does not land in one of them only
+    gc.collect()
+    start = time.perf_counter()
+    one_by_one = [index.find(selected) for selected in lists]
+    single_time = time.perf_counter() - start
+    gc.collect()
+    start = time.perf_counter()
+    batched = index.find_many(lists)
+    batch_time = time.perf_counter() - start
+    if batched != one_by_one:
+        raise SystemExit("find_many and find disagree")
+    print(f"\n{'bulk':<12}{'seconds':>10}{'lists/s':>12}")
+    print(f"{'find':<12}{single_time:>10.2f}{len(lists) / single_time:>12.0f}")
+    print(f"{'find_many':<12}{batch_time:>10.2f}{len(lists) / batch_time:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
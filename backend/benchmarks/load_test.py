@@ -0,0 +1,364 @@
+"""Measure throughput and latency of the API endpoints under concurrent load.
+
+The app is served in-process by a threaded Werkzeug server on a scratch
+database, with the fake LLM backend and a stubbed Tesseract, so runs use
+no Gemini quota and need no OCR install. Each endpoint is driven by
+--concurrency client threads, each with its own logged-in session, and
+results are printed and saved as JSON for comparison across commits.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.load_test --concurrency 1 8 32 --requests 200
+    python -m benchmarks.load_test --compare benchmarks/results/<earlier run>.json
+
+Pass --url to drive a server that is already running (start it with
+LLM_BACKEND=fake); the stubs then do not apply.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pytesseract
+import requests
+from PIL import Image
+from werkzeug.serving import make_server
+
+from config.config import Config
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+PASSWORD = "load-test-password"
+DESCRIPTION = "I have had a headache and a mild fever for three days."
+INTERVIEW_HISTORY = [
+    ["When did the symptoms start?", "Three days ago."],
+    ["Have you taken anything for it?", "Ibuprofen twice a day."],
+    ["Any other symptoms?", "Some fatigue and a sore throat."],
+]
+REPORT_CONTENT = "# SOAP Notes\n\n" + "Subjective: headache and fever. " * 40
+
+
+def make_upload():
+    """Return a small PNG to upload; the stubbed Tesseract ignores its content."""
+    buffer = io.BytesIO()
+    Image.new("L", (600, 800), 255).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+UPLOAD = make_upload()
+
+
+class Client:
+    """One simulated user: a cookie session with a registered account."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.email = f"load-{uuid.uuid4().hex}@example.com"
+        self.interview_id = None
+        response = self.post(
+            "/api/auth/register",
+            json={"email": self.email, "password": PASSWORD, "name": "Load Test"},
+        )
+        response.raise_for_status()
+
+    def get(self, path, **kwargs):
+        return self.session.get(self.base_url + path, timeout=300, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.session.post(self.base_url + path, timeout=300, **kwargs)
+
+    def start_interview(self):
+        response = self.post("/api/soap/start", json={"description": DESCRIPTION})
+        response.raise_for_status()
+        self.interview_id = response.json()["session_id"]
+
+
+def check_interactions(client):
+    return client.post(
+        "/api/check-interactions", json={"medications": ["1", "2", "3", "7", "8"]}
+    )
+
+
+def process_document(client):
+    return client.post(
+        "/api/documents/process",
+        files={"files": ("scan.png", UPLOAD, "image/png")},
+        data={"language": "en"},
+    )
+
+
+def save_report(client):
+    return client.post(
+        "/api/reports/save",
+        json={"title": "Load test", "content": REPORT_CONTENT, "type": "soap"},
+    )
+
+
+def submit_answer(client):
+    return client.post(
+        "/api/soap/answer",
+        json={"answer": "About a week.", "session_id": client.interview_id},
+    )
+
+
+# Endpoint name -> (request, untimed per-client setup or None)
+ENDPOINTS = {
+    "auth.login": (
+        lambda c: c.post(
+            "/api/auth/login", json={"email": c.email, "password": PASSWORD}
+        ),
+        None,
+    ),
+    "auth.me": (lambda c: c.get("/api/auth/me"), None),
+    "medications.list": (lambda c: c.get("/api/medications"), None),
+    "medications.check": (check_interactions, None),
+    "reports.save": (save_report, None),
+    "reports.list": (lambda c: c.get("/api/reports"), None),
+    "soap.start": (
+        lambda c: c.post("/api/soap/start", json={"description": DESCRIPTION}),
+        None,
+    ),
+    "soap.answer": (submit_answer, Client.start_interview),
+    "soap.generate": (
+        lambda c: c.post(
+            "/api/soap/generate", json={"interview_history": INTERVIEW_HISTORY}
+        ),
+        None,
+    ),
+    "documents.process": (process_document, None),
+}
+
+
+def stub_tesseract(latency_ms):
+    """Replace Tesseract with a fixed delay and unique text per call.
+
+    Unique text keeps the analysis cache from answering repeat uploads.
+    """
+
+    def image_to_string(image, *args, **kwargs):
+        time.sleep(latency_ms / 1000)
+        return f"Lab report {uuid.uuid4().hex}\nHemoglobin 13.5 g/dL\nWBC 6.1"
+
+    pytesseract.image_to_string = image_to_string
+    pytesseract.get_tesseract_version = lambda: "stub"
+
+
+def start_server(args):
+    """Serve the app on a free local port and return (server, base_url)."""
+    Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="load-test-"), "load_test.db"
+    )
+    Config.LLM_BACKEND = "fake"
+    Config.FAKE_LLM_LATENCY_MS = args.llm_latency_ms
+    Config.FAKE_LLM_JITTER_MS = args.llm_jitter_ms
+    Config.FAKE_LLM_OUTPUT_TOKENS = args.llm_output_tokens
+    Config.FAKE_LLM_TOKENS_PER_SECOND = args.llm_tokens_per_second
+    Config.FAKE_LLM_SEED = 0
+    Config.OCR_CACHE_ENABLED = False
+    if args.llm_rate_limit is not None:
+        Config.LLM_RATE_LIMIT = args.llm_rate_limit
+    stub_tesseract(args.ocr_latency_ms)
+
+    from app import create_app
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_endpoint(clients, name, total):
+    """Send total requests to one endpoint, split across the clients."""
+    call, _ = ENDPOINTS[name]
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(clients) + 1)
+
+    def worker(client, count):
+        barrier.wait()
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                status = call(client).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not isinstance(status, int) or status >= 400:
+                    errors.append(status)
+
+    threads = []
+    for i, client in enumerate(clients):
+        count = total // len(clients) + (i < total % len(clients))
+        threads.append(threading.Thread(target=worker, args=(client, count)))
+        threads[-1].start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "endpoint": name,
+        "concurrency": len(clients),
+        "requests": total,
+        "errors": len(errors),
+        "error_statuses": sorted({str(status) for status in errors}),
+        "seconds": round(wall, 3),
+        "throughput": round(total / wall, 2) if wall else None,
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    previous = {}
+    for row in (baseline or {}).get("results", []):
+        previous[(row["endpoint"], row["concurrency"])] = row
+
+    header = (
+        f"{'endpoint':<20}{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'errors':>8}"
+    )
+    if previous:
+        header += f"{'req/s vs base':>15}{'p95 vs base':>13}"
+    print(header)
+    for row in results:
+        line = (
+            f"{row['endpoint']:<20}{row['concurrency']:>5}{row['throughput']:>9.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+            f"{row['errors']:>8}"
+        )
+        base = previous.get((row["endpoint"], row["concurrency"]))
+        if base:
+            line += (
+                f"{row['throughput'] / base['throughput'] - 1:>+15.1%}"
+                f"{row['p95_ms'] / base['p95_ms'] - 1:>+13.1%}"
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--requests", type=int, default=200, help="requests per endpoint and level"
+    )
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--url", help="drive an already running server instead")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50)
+    parser.add_argument("--llm-output-tokens", type=int, default=50)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=500)
+    parser.add_argument(
+        "--llm-rate-limit",
+        type=float,
+        help="override LLM_RATE_LIMIT (0 disables it) for the in-process server",
+    )
+    parser.add_argument("--ocr-latency-ms", type=float, default=300)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    # Per-request logging from the app and server would swamp the report
+    logging.disable(logging.INFO)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server, base_url = start_server(args)
+    base_url = base_url.rstrip("/")
+
+    endpoints = args.endpoints or list(ENDPOINTS)
+    results = []
+    try:
+        for concurrency in args.concurrency:
+            clients = [Client(base_url) for _ in range(concurrency)]
+            for name in endpoints:
+                _, setup = ENDPOINTS[name]
+                if setup:
+                    for client in clients:
+                        setup(client)
+                if args.warmup:
+                    run_endpoint(clients[:1], name, args.warmup)
+                results.append(run_endpoint(clients, name, args.requests))
+                print(
+                    f"{name} x{concurrency}: {results[-1]['throughput']} req/s",
+                    flush=True,
+                )
+    finally:
+        if server:
+            server.shutdown()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "url": args.url,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_output_tokens": args.llm_output_tokens,
+            "llm_tokens_per_second": args.llm_tokens_per_second,
+            "llm_rate_limit": (
+                Config.LLM_RATE_LIMIT if args.url is None else args.llm_rate_limit
+            ),
+            "ocr_latency_ms": args.ocr_latency_ms,
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(
+            RESULTS_DIR, f"{stamp}-{report['meta']['revision'] or 'unknown'}.json"
+        )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print()
+    print_results(results, baseline)
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
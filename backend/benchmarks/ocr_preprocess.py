@@ -0,0 +1,61 @@
+"""Compare OCR time and accuracy across the image preprocessing presets.
+
+Accuracy is the similarity of each preset's text to a reference: a
+ground-truth file next to each image (same name, .txt extension) when one
+exists, otherwise the text Tesseract produces with no preprocessing.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.ocr_preprocess scans/*.jpg --presets none fast balanced
+"""
+import argparse
+import difflib
+import os
+import time
+
+import pytesseract
+from PIL import Image
+
+from utils.preprocess import PRESETS, preprocess_image
+
+
+def similarity(reference, text):
+    return difflib.SequenceMatcher(None, reference.split(), text.split()).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--presets", nargs="+", default=list(PRESETS))
+    parser.add_argument("--target-dpi", type=int, default=300)
+    args = parser.parse_args()
+
+    images = [Image.open(path) for path in args.images]
+    references = []
+    for path, image in zip(args.images, images):
+        truth_path = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(truth_path):
+            with open(truth_path) as f:
+                references.append(f.read())
+        else:
+            references.append(pytesseract.image_to_string(image))
+
+    print(f"{'preset':<10}{'seconds':>10}{'s/image':>10}{'similarity':>12}")
+    for preset in args.presets:
+        elapsed = 0.0
+        scores = []
+        for image, reference in zip(images, references):
+            start = time.perf_counter()
+            text = pytesseract.image_to_string(
+                preprocess_image(image, preset, args.target_dpi)
+            )
+            elapsed += time.perf_counter() - start
+            scores.append(similarity(reference, text))
+        print(
+            f"{preset:<10}{elapsed:>10.2f}{elapsed / len(images):>10.2f}"
+            f"{sum(scores) / len(scores):>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
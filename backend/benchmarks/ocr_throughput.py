@@ -0,0 +1,65 @@
+"""Measure PDF OCR throughput (pages per second) against worker count.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.ocr_throughput path/to/document.pdf --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf2image
+
+from utils.ocr import extract_text_from_image, extract_text_from_pdf_parallel
+
+
+def run_sequential(pdf_path):
+    images = pdf2image.convert_from_path(pdf_path)
+    for image in images:
+        extract_text_from_image(image)
+
+
+def run_parallel(pdf_path, page_count, workers):
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        # Warm the workers up so process start-up is not counted
+        list(pool.map(abs, range(workers)))
+        start = time.perf_counter()
+        extract_text_from_pdf_parallel(pdf_path, range(1, page_count + 1), pool)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdf_path")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+    )
+    args = parser.parse_args()
+
+    page_count = pdf2image.pdfinfo_from_path(args.pdf_path)["Pages"]
+    print(f"{args.pdf_path}: {page_count} pages, {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    run_sequential(args.pdf_path)
+    baseline = time.perf_counter() - start
+    print(f"{'mode':<12}{'seconds':>10}{'pages/s':>10}{'speedup':>10}")
+    print(f"{'sequential':<12}{baseline:>10.2f}{page_count / baseline:>10.2f}{1:>10.2f}")
+
+    for workers in args.workers:
+        elapsed = run_parallel(args.pdf_path, page_count, workers)
+        label = f"{workers} workers"
+        print(
+            f"{label:<12}{elapsed:>10.2f}{page_count / elapsed:>10.2f}"
+            f"{baseline / elapsed:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
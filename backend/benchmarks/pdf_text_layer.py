@@ -0,0 +1,45 @@
+"""Compare reading a PDF's embedded text layer with OCR'ing every page.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.pdf_text_layer path/to/document.pdf [...]
+"""
+import argparse
+import time
+
+import pdf2image
+
+from config.config import Config
+from utils.ocr import extract_text_from_pdf
+
+
+def timed_extract(pdf_path, text_layer):
+    Config.PDF_TEXT_LAYER = text_layer
+    start = time.perf_counter()
+    text, pages = extract_text_from_pdf(pdf_path)
+    return time.perf_counter() - start, text or "", pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdf_paths", nargs="+")
+    args = parser.parse_args()
+
+    print(
+        f"{'document':<32}{'pages':>6}{'text':>6}{'ocr s':>9}{'fast s':>9}"
+        f"{'speedup':>9}{'chars ocr/fast':>16}"
+    )
+    for pdf_path in args.pdf_paths:
+        page_count = pdf2image.pdfinfo_from_path(pdf_path)["Pages"]
+        ocr_seconds, ocr_text, _ = timed_extract(pdf_path, text_layer=False)
+        fast_seconds, fast_text, pages = timed_extract(pdf_path, text_layer=True)
+        print(
+            f"{pdf_path[-32:]:<32}{page_count:>6}{pages.count('text'):>6}"
+            f"{ocr_seconds:>9.2f}{fast_seconds:>9.2f}"
+            f"{ocr_seconds / fast_seconds:>9.1f}"
+            f"{f'{len(ocr_text)}/{len(fast_text)}':>16}"
+        )
+
+
+if __name__ == "__main__":
+    main()
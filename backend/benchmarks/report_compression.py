@@ -0,0 +1,241 @@
+"""Measure compression of saved report content.
+
+Compresses --reports synthetic SOAP notes and document analyses (or the
+reports in --database) and prints the size ratio with and without the
+preset dictionary and the encode and decode time per report. Then saves
+and indexes them all through SQLAlchemy in two scratch SQLite databases,
+as the save endpoint does: one laid out as before compression, plain
+content with a search index holding a copy of it, and one as now,
+compressed content with a contentless index. It reads them back as the
+list endpoint does and compares the time taken, the space the content
+takes and the total size of each database file.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.report_compression --reports 2000
+    python -m benchmarks.report_compression --database instance/health_portal.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import zlib
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    create_engine,
+    select,
+    text,
+)
+
+from models.types import (
+    COMPRESSION_LEVEL,
+    CompressedText,
+    compress_text,
+    decompress_text,
+)
+from utils.report_search import CREATE_TABLE, TABLE
+
+# (content column type, search index) of saved reports before compression
+# and now
+LAYOUTS = {
+    "before": (
+        Text,
+        f"CREATE VIRTUAL TABLE {TABLE} "
+        "USING fts5(title, content, user_id, report_type)",
+    ),
+    "after": (CompressedText, CREATE_TABLE),
+}
+
+SENTENCES = [
+    "Patient reports {n} days of {symptom} that is worse at night.",
+    "Denies {symptom} or {symptom}.",
+    "Symptoms began after {event} and have been {trend} since.",
+    "Severity is {n}/10 and {trend} with rest.",
+    "Takes {drug} {n} mg daily.",
+    "Recommend {drug} and follow-up in {n} weeks if {symptom} persists.",
+    "Seek emergency care for {symptom} or {symptom}.",
+    "No known drug allergies.",
+    "Father had {condition}; mother is healthy.",
+    "Findings are consistent with {condition}.",
+]
+WORDS = {
+    "symptom": [
+        "cough", "fever", "headache", "chest pain", "nausea", "fatigue",
+        "shortness of breath", "dizziness", "abdominal pain", "joint pain",
+    ],
+    "event": ["a cold", "travel", "starting a new medication", "exercise"],
+    "trend": ["improving", "worsening", "unchanged", "intermittent"],
+    "drug": ["ibuprofen", "amoxicillin", "metformin", "lisinopril", "albuterol"],
+    "condition": [
+        "hypertension", "type 2 diabetes", "asthma", "pneumonia", "migraine",
+    ],
+}
+
+SOAP_FIELDS = {
+    "Subjective": [
+        "Chief Complaint (CC)", "History of Present Illness (HPI)",
+        "Past Medical History (PMH)", "Medications", "Family History",
+        "Social History", "Review of Systems",
+    ],
+    "Objective": ["Vital Signs", "Physical Exam", "Lab Results", "Imaging"],
+    "Assessment": ["Primary Diagnosis", "Clinical Reasoning"],
+    "Plan": ["Treatment", "Follow-up", "Patient Education"],
+}
+ANALYSIS_FIELDS = {
+    "Document Overview": ["Type", "Purpose", "Date"],
+    "Key Information": ["Main Points", "Findings", "Diagnoses"],
+    "Required Actions": [
+        "Follow-up Appointments", "Medications", "Lifestyle Changes",
+        "Other Tasks",
+    ],
+    "Important Dates": ["Appointments", "Deadlines", "Follow-up Schedule"],
+    "Additional Notes": ["Warnings", "Questions", "Additional Information"],
+}
+
+
+def sentence(rng):
+    template = rng.choice(SENTENCES)
+    while "{" in template:
+        start = template.index("{")
+        end = template.index("}", start)
+        key = template[start + 1 : end]
+        value = str(rng.randint(1, 10)) if key == "n" else rng.choice(WORDS[key])
+        template = template[:start] + value + template[end + 1 :]
+    return template
+
+
+def synthetic_report(rng):
+    """Return Markdown shaped like a saved SOAP note or document analysis."""
+    if rng.random() < 0.5:
+        lines = ["# SOAP Notes", "", f"**Summary:** {sentence(rng)} {sentence(rng)}"]
+        sections = SOAP_FIELDS
+    else:
+        lines = []
+        sections = ANALYSIS_FIELDS
+    for section, fields in sections.items():
+        lines += ["", f"## {section}"]
+        for field in fields:
+            if rng.random() < 0.2:
+                lines.append(f"- **{field}:** Not available")
+            else:
+                text = " ".join(sentence(rng) for _ in range(rng.randint(1, 3)))
+                lines.append(f"- **{field}:** {text}")
+    return "\n".join(lines)
+
+
+def database_reports(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [
+            decompress_text(content)
+            for (content,) in conn.execute("SELECT content FROM saved_report")
+        ]
+    finally:
+        conn.close()
+
+
+def per_report_us(function, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        function(item)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--database", help="measure the reports in this database")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.database:
+        reports = database_reports(args.database)
+    else:
+        rng = random.Random(args.seed)
+        reports = [synthetic_report(rng) for _ in range(args.reports)]
+    if not reports:
+        raise SystemExit("No reports to measure")
+    raw = [report.encode("utf-8") for report in reports]
+    raw_size = sum(len(r) for r in raw)
+    print(f"{len(reports)} reports, {raw_size / len(reports):.0f} bytes on average")
+
+    encoded = [compress_text(report) for report in reports]
+    plain_zlib = sum(len(zlib.compress(r, COMPRESSION_LEVEL)) for r in raw)
+    print(f"{'':<22}{'bytes/report':>13}{'ratio':>8}")
+    for label, size in (
+        ("zlib", plain_zlib),
+        ("zlib + dictionary", sum(len(e) for e in encoded)),
+    ):
+        print(f"{label:<22}{size / len(reports):>13.0f}{raw_size / size:>8.2f}")
+    print(
+        f"encode {per_report_us(compress_text, reports):.1f} us/report, "
+        f"decode {per_report_us(decompress_text, encoded):.1f} us/report"
+    )
+
+    directory = tempfile.mkdtemp()
+    rows = [{"content": report} for report in reports]
+    index_rows = [
+        {"id": id, "content": report} for id, report in enumerate(reports, 1)
+    ]
+    print(
+        f"\n{'layout':<12}{'save ms':>9}{'list ms':>9}{'content MB':>12}"
+        f"{'file MB':>9}"
+    )
+    for name, (content_type, create_index) in LAYOUTS.items():
+        path = os.path.join(directory, f"{name}.db")
+        engine = create_engine(f"sqlite:///{path}")
+        metadata = MetaData()
+        table = Table(
+            "saved_report",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("content", content_type),
+        )
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(create_index)
+        with engine.begin() as conn:
+            start = time.perf_counter()
+            conn.execute(table.insert(), rows)
+            conn.execute(
+                text(
+                    f"INSERT INTO {TABLE} "
+                    "(rowid, title, content, user_id, report_type) "
+                    "VALUES (:id, '', :content, '1', 'soap')"
+                ),
+                index_rows,
+            )
+            save_time = time.perf_counter() - start
+        with engine.connect() as conn:
+            start = time.perf_counter()
+            listed = conn.execute(select(table.c.content)).scalars().all()
+            list_time = time.perf_counter() - start
+        if listed != reports:
+            raise SystemExit(f"{name} did not read back what was saved")
+        with engine.begin() as conn:
+            size = conn.exec_driver_sql(
+                "SELECT SUM(LENGTH(CAST(content AS BLOB))) FROM saved_report"
+            ).scalar()
+        # Leave out free pages, as a long-lived database reuses them
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        engine.dispose()
+        print(
+            f"{name:<12}{save_time * 1e3:>9.1f}{list_time * 1e3:>9.1f}"
+            f"{size / 2**20:>12.2f}{os.path.getsize(path) / 2**20:>9.2f}"
+        )
+        os.unlink(path)
+    os.rmdir(directory)
+
+if __name__ == "__main__":
+    main()
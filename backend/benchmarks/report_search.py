@@ -0,0 +1,209 @@
+"""Measure report search latency on a synthetic table of saved reports.
+
+Fills a scratch SQLite database with --rows reports spread over --users
+users, indexes them as utils.report_search does, then times searches by
+random users for rare, common, multi-word and prefix queries. Each is run
+three ways: scoped to the user inside the full-text index, with snippets
+built from the decoded reports (what the app does), filtering the
+full-text matches of every user on user_id afterwards, and a LIKE scan of
+the user's reports.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.report_search --rows 1000000 --users 2000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from models.models import db, SavedReport, User
+from models.types import decompress_text
+from utils.report_search import (
+    CREATE_TABLE,
+    SEARCH_QUERY,
+    TABLE,
+    query_terms,
+    search_params,
+    snippet,
+    user_match,
+)
+
+# Words every report is made of, most common first: clinical words, then a
+# long tail standing in for the rest of the language
+VOCABULARY = [
+    "patient", "reports", "pain", "history", "denies", "fever", "plan",
+    "assessment", "follow", "up", "blood", "pressure", "normal", "chest",
+    "cough", "headache", "nausea", "fatigue", "medication", "dose", "daily",
+    "exam", "lungs", "clear", "heart", "rate", "regular", "abdomen", "soft",
+    "tenderness", "swelling", "rash", "dizziness", "shortness", "breath",
+    "glucose", "insulin", "statin", "ecg", "troponin", "creatinine",
+    "potassium", "hemoglobin", "platelets", "antibiotic", "amoxicillin",
+    "ibuprofen", "metformin", "lisinopril", "warfarin",
+] + [f"word{i}" for i in range(20_000)]
+
+# (label, query) pairs timed for each user
+QUERIES = [
+    ("rare word", "warfarin"),
+    ("common word", "patient"),
+    ("two words", "chest pain"),
+    ("prefix", "trop*"),
+]
+
+# The same search without the user in the MATCH, filtered by the join
+JOIN_FILTER_QUERY = (
+    "SELECT saved_report.id, saved_report.content, "
+    f"bm25({TABLE}, :title_weight, :content_weight, 0.0, 0.0) AS score "
+    f"FROM {TABLE} JOIN saved_report ON saved_report.id = {TABLE}.rowid "
+    f"WHERE {TABLE} MATCH :match AND saved_report.user_id = :user_id "
+    "ORDER BY score LIMIT :limit"
+)
+
+
+# Zipf-like: word k is drawn about 1/k as often as the first
+CUMULATIVE_WEIGHTS = list(
+    itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY)))
+)
+
+
+def synthetic_words(rng, count):
+    return rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=count)
+
+
+def fill(connection, rows, users, words, seed):
+    rng = random.Random(seed)
+    start_time = datetime(2024, 1, 1)
+    connection.executemany(
+        "INSERT INTO user (id, email, password_hash, name) VALUES (?, ?, '', ?)",
+        [(i, f"user{i}@example.com", f"User {i}") for i in range(1, users + 1)],
+    )
+    batch_size = 10_000
+    for first in range(1, rows + 1, batch_size):
+        reports = []
+        for report_id in range(first, min(first + batch_size, rows + 1)):
+            title = " ".join(synthetic_words(rng, 4))
+            content = " ".join(synthetic_words(rng, words))
+            reports.append(
+                (
+                    report_id,
+                    rng.randint(1, users),
+                    title,
+                    content,
+                    rng.choice(("soap", "analysis")),
+                    start_time + timedelta(minutes=report_id),
+                )
+            )
+        connection.executemany(
+            "INSERT INTO saved_report "
+            "(id, user_id, title, content, report_type, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            reports,
+        )
+        connection.executemany(
+            f"INSERT INTO {TABLE} (rowid, title, content, user_id, report_type) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(r[0], r[2], r[3], str(r[1]), r[4]) for r in reports],
+        )
+    connection.commit()
+
+
+def timed(connection, sql, params):
+    start = time.perf_counter()
+    rows = connection.execute(sql, params).fetchall()
+    return time.perf_counter() - start, len(rows)
+
+
+def timed_search(connection, query, params):
+    """Time a search as the app runs it, snippets included."""
+    terms = query_terms(query)
+    start = time.perf_counter()
+    rows = connection.execute(SEARCH_QUERY, params).fetchall()
+    for row in rows:
+        snippet(decompress_text(row[4]), terms)
+    return time.perf_counter() - start, len(rows)
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=60, help="words per report")
+    parser.add_argument("--searches", type=int, default=200, help="per query")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the database")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "reports.db")
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine, tables=[User.__table__, SavedReport.__table__])
+    raw_connection = engine.raw_connection()
+    connection = raw_connection.driver_connection
+    connection.execute(CREATE_TABLE)
+
+    start = time.perf_counter()
+    fill(connection, args.rows, args.users, args.words, args.seed)
+    print(
+        f"Indexed {args.rows} reports in {time.perf_counter() - start:.1f}s, "
+        f"{os.path.getsize(path) / 2**20:.0f} MB"
+    )
+
+    rng = random.Random(args.seed + 1)
+    print(
+        f"{'query':<14}{'scoped p50':>11}{'p95':>8}"
+        f"{'filtered p50':>14}{'p95':>8}{'LIKE p50':>10}{'hits':>7}  (ms)"
+    )
+    for label, query in QUERIES:
+        scoped, filtered, like, hits = [], [], [], []
+        for _ in range(args.searches):
+            user_id = rng.randint(1, args.users)
+            params = search_params(user_match(user_id, query), args.limit)
+            elapsed, found = timed_search(connection, query, params)
+            scoped.append(elapsed)
+            hits.append(found)
+
+            params = search_params(user_match(user_id, query), args.limit)
+            params["match"] = params["match"].split(" AND ", 1)[1]
+            params["user_id"] = user_id
+            filtered.append(timed(connection, JOIN_FILTER_QUERY, params)[0])
+
+            pattern = f"%{query}%"
+            like.append(
+                timed(
+                    connection,
+                    "SELECT id FROM saved_report WHERE user_id = ? "
+                    "AND (title LIKE ? OR content LIKE ?) LIMIT ?",
+                    (user_id, pattern, pattern, args.limit),
+                )[0]
+            )
+        print(
+            f"{label:<14}{statistics.median(scoped) * 1e3:>11.2f}"
+            f"{percentile(scoped, 0.95) * 1e3:>8.2f}"
+            f"{statistics.median(filtered) * 1e3:>14.2f}"
+            f"{percentile(filtered, 0.95) * 1e3:>8.2f}"
+            f"{statistics.median(like) * 1e3:>10.2f}"
+            f"{statistics.mean(hits):>7.1f}"
+        )
+
+    raw_connection.close()
+    engine.dispose()
+    if args.keep:
+        print(f"Kept {path}")
+    else:
+        os.unlink(path)
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
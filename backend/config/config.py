@@ -6,3 +6,122 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.urandom(24)
     CORS_ORIGINS = [os.getenv("FRONTEND_URL", "http://localhost:5173")]
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+    # OCR: spread the pages of a PDF across a process pool
+    OCR_PARALLEL = os.getenv("OCR_PARALLEL", "false").lower() == "true"
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+    # Number of PDF pages rasterized at a time when OCR runs in-process
+    OCR_PAGE_WINDOW = int(os.getenv("OCR_PAGE_WINDOW", 4))
+    # On-disk OCR text cache keyed by file hash, shared by all workers.
+    # Paths left unset here and below default to the instance folder.
+    OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH")
+    OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    OCR_CACHE_TTL = int(os.getenv("OCR_CACHE_TTL", 7 * 24 * 60 * 60))
+
+    # Cache of Gemini document analyses: "memory", "sqlite" or "none"
+    ANALYSIS_CACHE_BACKEND = os.getenv("ANALYSIS_CACHE_BACKEND", "memory")
+    ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH")
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 1000))
+    ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 60 * 60))
+
+    # Background document jobs (POST /api/documents/jobs)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", 100))
+    JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR")
+    JOB_EVENT_INTERVAL = float(os.getenv("JOB_EVENT_INTERVAL", 0.5))
+
+    # SOAP interview sessions: "database" (shared by all workers) or "memory"
+    SOAP_SESSION_BACKEND = os.getenv("SOAP_SESSION_BACKEND", "database")
+    # Seconds an interview may sit idle, and the most kept at once
+    SOAP_SESSION_TTL = int(os.getenv("SOAP_SESSION_TTL", 2 * 60 * 60))
+    SOAP_SESSION_MAX_ENTRIES = int(os.getenv("SOAP_SESSION_MAX_ENTRIES", 10000))
+    # Once an interview's history passes this many tokens, all but the last
+    # SOAP_HISTORY_KEEP_TURNS question/answer pairs are folded into a summary
+    SOAP_HISTORY_TOKEN_BUDGET = int(os.getenv("SOAP_HISTORY_TOKEN_BUDGET", 1500))
+    SOAP_HISTORY_KEEP_TURNS = int(os.getenv("SOAP_HISTORY_KEEP_TURNS", 3))
+    # Rewrite a draft of the SOAP notes in the background after each answer,
+    # so /api/soap/generate can return it straight away
+    SOAP_DRAFTS = os.getenv("SOAP_DRAFTS", "true").lower() == "true"
+    SOAP_DRAFT_WORKERS = int(os.getenv("SOAP_DRAFT_WORKERS", 4))
+    # Seconds generate waits for a running draft before writing its own
+    SOAP_DRAFT_WAIT = float(os.getenv("SOAP_DRAFT_WAIT", 60))
+    # Drafts only use spare LLM capacity: one is skipped, and generate
+    # writes the notes itself, unless a call slot is free and more than this
+    # many rate-limit tokens are left for interactive calls
+    SOAP_DRAFT_RESERVE = int(os.getenv("SOAP_DRAFT_RESERVE", 5))
+
+    # Medications, interactions, symptoms and conditions: edited as JSON,
+    # compiled to a read-only SQLite file and a directory of index arrays
+    # next to it, both memory-mapped and shared by all workers, and reloaded
+    # when the JSON changes
+    REFERENCE_DATA_SOURCE = os.getenv(
+        "REFERENCE_DATA_SOURCE",
+        os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "reference_data.json",
+        ),
+    )
+    REFERENCE_DATA_PATH = os.getenv("REFERENCE_DATA_PATH")
+    # Seconds between checks of the source file for changes
+    REFERENCE_DATA_CHECK_INTERVAL = float(os.getenv("REFERENCE_DATA_CHECK_INTERVAL", 5))
+
+    # Bulk interaction checks: lists accepted in one JSON request, and lists
+    # checked together per batch of an NDJSON stream
+    BULK_INTERACTION_MAX_LISTS = int(os.getenv("BULK_INTERACTION_MAX_LISTS", 10000))
+    BULK_INTERACTION_BATCH = int(os.getenv("BULK_INTERACTION_BATCH", 1000))
+    # Symptom sets accepted in one /api/conditions/rank/batch request
+    CONDITION_RANK_MAX_QUERIES = int(os.getenv("CONDITION_RANK_MAX_QUERIES", 10000))
+
+    # Files of one /api/documents/process request handled at the same time
+    DOCUMENT_CONCURRENCY = int(os.getenv("DOCUMENT_CONCURRENCY", 4))
+
+    # Read the embedded text layer of digital PDFs instead of running OCR;
+    # pages with fewer characters than this are treated as scanned
+    PDF_TEXT_LAYER = os.getenv("PDF_TEXT_LAYER", "true").lower() == "true"
+    PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", 25))
+
+    # Uploads up to this size are processed from memory, larger ones are
+    # spooled to a temp file
+    UPLOAD_MEMORY_LIMIT = int(os.getenv("UPLOAD_MEMORY_LIMIT", 16 * 1024 * 1024))
+
+    # Image preprocessing before Tesseract: "none", "fast", "balanced" or
+    # "accurate" (see utils/preprocess.py)
+    OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "fast")
+    OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", 300))
+    # Resolution PDF pages are rendered at before OCR
+    PDF_RASTER_DPI = int(os.getenv("PDF_RASTER_DPI", 200))
+
+    # Documents longer than this many tokens are summarized in chunks
+    # before the final analysis
+    LONG_DOC_TOKEN_THRESHOLD = int(os.getenv("LONG_DOC_TOKEN_THRESHOLD", 30000))
+    LONG_DOC_CHUNK_TOKENS = int(os.getenv("LONG_DOC_CHUNK_TOKENS", 8000))
+    LONG_DOC_CHUNK_OVERLAP = int(os.getenv("LONG_DOC_CHUNK_OVERLAP", 200))
+    LONG_DOC_MAP_CONCURRENCY = int(os.getenv("LONG_DOC_MAP_CONCURRENCY", 4))
+
+    # Shared LLM client (utils/llm.py)
+    # "gemini", or "fake" for a local stand-in that needs no API key
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+    # Seconds a call waits for one of those slots before giving up
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 30))
+    # Average calls per second and burst size; a rate of 0 disables limiting
+    LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", 5))
+    LLM_BURST = int(os.getenv("LLM_BURST", 10))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+    LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 3))
+    # Consecutive failures that open the circuit, and seconds it stays open
+    LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))
+    LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", 30))
+
+    # Fake LLM backend: time to first token ("constant", "uniform", "normal"
+    # or "lognormal" around FAKE_LLM_LATENCY_MS), output speed and failures
+    FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal")
+    FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 800))
+    FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", 300))
+    FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", 80))
+    FAKE_LLM_OUTPUT_TOKENS = int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", 300))
+    FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", 0))
+    FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED")) if os.getenv("FAKE_LLM_SEED") else None
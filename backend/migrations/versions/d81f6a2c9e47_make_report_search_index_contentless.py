@@ -0,0 +1,80 @@
+"""Make the report search index contentless
+
+Revision ID: d81f6a2c9e47
+Revises: b3d47c9e5a21
+Create Date: 2026-10-19 00:41:57.203518
+
+"""
+import sqlite3
+
+from alembic import op
+import sqlalchemy as sa
+
+from models.types import decompress_text
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f6a2c9e47'
+down_revision = 'b3d47c9e5a21'
+branch_labels = None
+depends_on = None
+
+# Reports indexed per statement batch
+BATCH = 500
+
+
+def fill_index():
+    """Index every report, decoding its content, a batch at a time."""
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(
+                "SELECT id, title, content, user_id, report_type FROM saved_report "
+                "WHERE id > :last_id ORDER BY id LIMIT :batch"
+            ),
+            {"last_id": last_id, "batch": BATCH},
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            sa.text(
+                "INSERT INTO saved_report_fts "
+                "(rowid, title, content, user_id, report_type) "
+                "VALUES (:id, :title, :content, :user_id, :report_type)"
+            ),
+            [
+                {
+                    "id": row.id,
+                    "title": row.title,
+                    "content": decompress_text(row.content),
+                    "user_id": str(row.user_id),
+                    "report_type": row.report_type,
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    # The index only holds terms now; the report text is read from
+    # saved_report. contentless_delete needs SQLite 3.43.
+    options = "content=''"
+    if sqlite3.sqlite_version_info >= (3, 43, 0):
+        options += ", contentless_delete=1"
+    op.execute("DROP TABLE IF EXISTS saved_report_fts")
+    op.execute(
+        "CREATE VIRTUAL TABLE saved_report_fts "
+        f"USING fts5(title, content, user_id, report_type, {options})"
+    )
+    fill_index()
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS saved_report_fts")
+    op.execute(
+        "CREATE VIRTUAL TABLE saved_report_fts "
+        "USING fts5(title, content, user_id, report_type)"
+    )
+    fill_index()
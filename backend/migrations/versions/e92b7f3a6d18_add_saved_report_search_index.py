@@ -0,0 +1,33 @@
+"""Add full-text search index over SavedReport
+
+Revision ID: e92b7f3a6d18
+Revises: c5e81d2f4b36
+Create Date: 2026-10-18 22:03:11.482906
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e92b7f3a6d18'
+down_revision = 'c5e81d2f4b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 virtual table, kept in sync by utils/report_search.py
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS saved_report_fts "
+        "USING fts5(title, content, user_id, report_type)"
+    )
+    # The app may have created and filled it already on startup
+    op.execute("DELETE FROM saved_report_fts")
+    op.execute(
+        "INSERT INTO saved_report_fts (rowid, title, content, user_id, report_type) "
+        "SELECT id, title, content, CAST(user_id AS TEXT), report_type FROM saved_report"
+    )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS saved_report_fts")
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from models.types import CompressedText
 
 db = SQLAlchemy()
 
@@ -23,6 +24,44 @@ class SavedReport(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    # Markdown, stored zlib-compressed
+    content = db.Column(CompressedText, nullable=False)
     report_type = db.Column(db.String(20), nullable=False)  # 'soap' or 'analysis'
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Serves a user's reports newest first, and the pages after a cursor
+    __table_args__ = (
+        db.Index("ix_saved_report_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+class DocumentJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    # 'queued', 'running', 'completed' or 'failed'
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    language = db.Column(db.String(10), nullable=False, default="en")
+    # One entry per uploaded file: filename, spooled path, status and result
+    files = db.Column(db.JSON, nullable=False)
+    # host:pid of the process working on the job
+    owner = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
+class InterviewSession(db.Model):
+    id = db.Column(db.String(64), primary_key=True)
+    # Chat turns so far: [{"role": "user" | "model", "parts": [text]}, ...]
+    history = db.Column(db.JSON, nullable=False)
+    # [question, answer] pairs, and the question awaiting an answer
+    transcript = db.Column(db.JSON, nullable=False, default=list)
+    question = db.Column(db.Text)
+    # Latest SOAP notes draft and how many transcript pairs it covers
+    draft = db.Column(db.Text)
+    draft_turns = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Last activity; idle sessions are expired and evicted by this
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, index=True
+    )
@@ -0,0 +1,126 @@
+import zlib
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+# Stored values start with MAGIC and a format byte. MAGIC begins with a NUL,
+# which no text saved before compression starts with, so such values are
+# still told apart from it.
+MAGIC = b"\x00MZ"
+STORED = 0  # UTF-8, uncompressed: compression would not have saved space
+ZLIB_V1 = 1  # zlib with PRESET_DICTIONARY_V1
+
+# Text seeding the compressor's window, so even a short report can refer
+# back to the headings and phrases every report repeats. It is part of the
+# stored format: never edit it; add a new dictionary and format byte
+# instead. zlib finds the end of a dictionary cheapest to refer to, so the
+# most common text comes last.
+PRESET_DICTIONARY_V1 = (
+    "the patient reports denies history of with and without a the of to in "
+    "for on is was has have not no any mild moderate severe acute chronic "
+    "pain fever cough headache nausea vomiting fatigue shortness of breath "
+    "chest pain dizziness rash swelling blood pressure heart rate "
+    "temperature oxygen saturation respiratory rate mg daily twice daily "
+    "as needed emergency care seek immediate medical attention if symptoms "
+    "worsen rest and stay hydrated over-the-counter medications "
+    "follow up with your primary care provider within days weeks "
+    "If available Not available Not mentioned None reported Unknown\n"
+    "## Document Overview\n"
+    "- **Type:** \n"
+    "- **Purpose:** \n"
+    "- **Date:** \n\n"
+    "## Key Information\n"
+    "- **Main Points:** \n"
+    "- **Findings:** \n"
+    "- **Diagnoses:** \n\n"
+    "## Required Actions\n"
+    "- **Follow-up Appointments:** \n"
+    "- **Medications:** \n"
+    "- **Lifestyle Changes:** \n"
+    "- **Other Tasks:** \n\n"
+    "## Important Dates\n"
+    "- **Appointments:** \n"
+    "- **Deadlines:** \n"
+    "- **Follow-up Schedule:** \n\n"
+    "## Additional Notes\n"
+    "- **Warnings:** \n"
+    "- **Questions:** \n"
+    "- **Additional Information:** \n"
+    "# SOAP Notes\n\n"
+    "**Summary:** \n\n"
+    "## Subjective\n"
+    "- **Chief Complaint (CC):** \n"
+    "- **History of Present Illness (HPI):** \n"
+    "- **Past Medical History (PMH):** \n"
+    "- **Medications:** \n"
+    "- **Family History:** \n"
+    "- **Social History:** \n"
+    "- **Review of Systems:** \n\n"
+    "## Objective\n"
+    "- **Vital Signs:** \n"
+    "- **Physical Exam:** \n"
+    "- **Lab Results:** \n"
+    "- **Imaging:** \n\n"
+    "## Assessment\n"
+    "- **Primary Diagnosis:** \n"
+    "- **Differential Diagnoses:**\n"
+    "  - \n"
+    "- **Clinical Reasoning:** \n\n"
+    "## Plan\n"
+    "- **Treatment:**\n"
+    "  - \n"
+    "- **Follow-up:**\n"
+    "  - \n"
+    "- **Patient Education:**\n"
+    "  - "
+).encode("utf-8")
+
+COMPRESSION_LEVEL = 6
+
+
+def compress_text(text):
+    """Encode text in the stored format."""
+    raw = text.encode("utf-8")
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=PRESET_DICTIONARY_V1)
+    compressed = compressor.compress(raw) + compressor.flush()
+    if len(compressed) < len(raw):
+        return MAGIC + bytes([ZLIB_V1]) + compressed
+    return MAGIC + bytes([STORED]) + raw
+
+
+def decompress_text(value):
+    """Decode a stored value, compressed or written before compression."""
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(MAGIC):
+        return value.decode("utf-8")
+    version, payload = value[len(MAGIC)], value[len(MAGIC) + 1 :]
+    if version == STORED:
+        return payload.decode("utf-8")
+    if version == ZLIB_V1:
+        decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY_V1)
+        return (decompressor.decompress(payload) + decompressor.flush()).decode(
+            "utf-8"
+        )
+    raise ValueError(f"Unknown compressed text format {version}")
+
+
+class CompressedText(TypeDecorator):
+    """Text stored compressed, read and written as plain str.
+
+    Values written before a column switched to this type are read as they
+    are, so rows can be compressed after the switch.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(value)
@@ -0,0 +1,108 @@
+from flask import Blueprint, Response, jsonify, request
+from config.config import Config
+from utils.conditions import METHODS
+from utils.reference_data import get_reference_data
+
+conditions_bp = Blueprint("conditions", __name__)
+
+# Conditions returned per symptom set when no limit is given, and the most a
+# client may ask for
+RANK_LIMIT = 5
+MAX_RANK_LIMIT = 50
+
+
+def read_ranking_options(data):
+    """Return (limit, method, error) from a ranking request body."""
+    try:
+        limit = int(data.get("limit", RANK_LIMIT))
+    except (TypeError, ValueError):
+        return None, None, "limit must be an integer"
+    method = data.get("method", "tfidf")
+    if method not in METHODS:
+        return None, None, f"method must be one of: {', '.join(METHODS)}"
+    return max(1, min(limit, MAX_RANK_LIMIT)), method, None
+
+
+def is_symptom_list(value):
+    return isinstance(value, list) and all(isinstance(s, str) for s in value)
+
+
+@conditions_bp.route("/api/symptoms", methods=["GET"])
+def get_symptoms():
+    return Response(
+        get_reference_data().records_json("symptoms"), mimetype="application/json"
+    )
+
+
+@conditions_bp.route("/api/conditions/rank", methods=["POST"])
+def rank_conditions():
+    data = request.get_json(silent=True)
+    symptom_ids = data.get("symptoms") if isinstance(data, dict) else None
+    if not symptom_ids or not is_symptom_list(symptom_ids):
+        return jsonify({"error": "symptoms must be a non-empty list of ids"}), 400
+    limit, method, error = read_ranking_options(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    ranker = get_reference_data().condition_ranker
+    _, unknown = ranker.known(symptom_ids)
+    return jsonify(
+        {
+            "conditions": ranker.rank(symptom_ids, limit, method),
+            "unknown_symptoms": unknown,
+        }
+    )
+
+
+@conditions_bp.route("/api/conditions/rank/batch", methods=["POST"])
+def rank_conditions_batch():
+    """Rank conditions for many symptom sets in one call.
+
+    queries is a list of symptom id arrays, or of {"id", "symptoms"}
+    objects; results come back in the same order, numbered by position
+    when no id is given.
+    """
+    data = request.get_json(silent=True)
+    queries = data.get("queries") if isinstance(data, dict) else None
+    if not isinstance(queries, list):
+        return jsonify({"error": "queries is required"}), 400
+    if len(queries) > Config.CONDITION_RANK_MAX_QUERIES:
+        return (
+            jsonify(
+                {
+                    "error": f"At most {Config.CONDITION_RANK_MAX_QUERIES} "
+                    "queries per request"
+                }
+            ),
+            413,
+        )
+    limit, method, error = read_ranking_options(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    ids = []
+    symptom_sets = []
+    for position, query in enumerate(queries):
+        query_id = position
+        if isinstance(query, dict):
+            query_id = query.get("id", position)
+            query = query.get("symptoms")
+        if not is_symptom_list(query):
+            return (
+                jsonify({"error": f"queries[{position}] must list symptom ids"}),
+                400,
+            )
+        ids.append(query_id)
+        symptom_sets.append(query)
+
+    ranked = get_reference_data().condition_ranker.rank_many(
+        symptom_sets, limit, method
+    )
+    return jsonify(
+        {
+            "results": [
+                {"id": query_id, "conditions": conditions}
+                for query_id, conditions in zip(ids, ranked)
+            ]
+        }
+    )
@@ -1,332 +1,420 @@
-from flask import Blueprint, jsonify, request
-import google.generativeai as genai
-import pytesseract
-from PIL import Image
-import pdf2image
+from flask import Blueprint, current_app, jsonify, request
+import hashlib
+import logging
 import os
+import secrets
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
 import tempfile
 from config.config import Config
+from models.models import db, DocumentJob
+from utils.cache import make_cache
+from utils.chunking import count_tokens, split_text
+from utils.files import make_private_dir, open_private_file
+from utils.jobs import JobQueue, owner_is_alive, worker_id
+from utils.llm import get_llm
+from utils.ocr import extract_text, get_ocr_cache
+from utils.metrics import log_stream_latency, track_peak_rss, track_stream_peak_rss
+from utils.sse import format_sse, sse_response
 from dotenv import load_dotenv
 
 load_dotenv()
 
 documents_bp = Blueprint("documents", __name__)
+logger = logging.getLogger(__name__)
 
 # Configure upload folder
 UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg"}
+JOB_FINISHED_STATUSES = {"completed", "failed"}
+
+
+# Bump whenever the analysis prompt changes so cached analyses are not reused
+ANALYSIS_PROMPT_VERSION = 1
+
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+CHUNK_SUMMARY_PROMPT = """The following text is part {part} of {parts} of a long medical document.
+Summarize it in English as a concise list of facts for a later, complete analysis of the whole document.
+Keep the document type, every date and time, finding, diagnosis, medication with its dosage, instruction, appointment, deadline and warning exactly as written.
+Do not add anything that is not in the text.
+
+Document text:
+{text}"""
 
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def extract_text_from_image(image):
-    """Extract text from an image using Tesseract OCR."""
-    try:
-        text = pytesseract.image_to_string(image)
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting text from image: {str(e)}")
-        return None
+def get_analysis_cache():
+    """Return the shared analysis cache, or None when it is disabled."""
+    global _analysis_cache
+    with _analysis_cache_lock:
+        if _analysis_cache is None and Config.ANALYSIS_CACHE_BACKEND != "none":
+            _analysis_cache = make_cache(
+                Config.ANALYSIS_CACHE_BACKEND,
+                path=Config.ANALYSIS_CACHE_PATH,
+                max_entries=Config.ANALYSIS_CACHE_MAX_ENTRIES,
+                ttl=Config.ANALYSIS_CACHE_TTL,
+            )
+        return _analysis_cache
 
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file."""
-    try:
-        # Convert PDF to images
-        images = pdf2image.convert_from_path(pdf_path)
-
-        # Extract text from each page
-        text = ""
-        for image in images:
-            page_text = extract_text_from_image(image)
-            if page_text:
-                text += page_text + "\n"
-
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting text from PDF: {str(e)}")
-        return None
+def analysis_cache_key(text, language):
+    """Key an analysis by normalized text, language, model and prompt version."""
+    normalized = " ".join(text.split())
+    text_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{text_hash}:{language}:{Config.GEMINI_MODEL}:v{ANALYSIS_PROMPT_VERSION}"
 
 
 def analyze_document(text, language="en"):
-    """Analyze document text using Gemini."""
-    try:
-        # Configure Gemini
-        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
-        # Language-specific instructions and section headers
-        language_config = {
-            "en": {
-                "instruction": "Provide the entire analysis in English, including all section headers and content. Make the output user-friendly and easy to understand.",
-                "headers": {
-                    "overview": "Document Overview",
-                    "type": "Type",
-                    "purpose": "Purpose",
-                    "date": "Date",
-                    "key_info": "Key Information",
-                    "main_points": "Main Points",
-                    "findings": "Findings",
-                    "diagnoses": "Diagnoses",
-                    "actions": "Required Actions",
-                    "followup": "Follow-up Appointments",
-                    "medications": "Medications",
-                    "lifestyle": "Lifestyle Changes",
-                    "tasks": "Other Tasks",
-                    "dates": "Important Dates",
-                    "appointments": "Appointments",
-                    "deadlines": "Deadlines",
-                    "schedule": "Follow-up Schedule",
-                    "notes": "Additional Notes",
-                    "warnings": "Warnings",
-                    "questions": "Questions",
-                    "additional": "Additional Information",
-                },
+    """Analyze document text using Gemini, reusing cached analyses."""
+    cache = get_analysis_cache()
+    key = analysis_cache_key(text, language)
+    if cache:
+        analysis = cache.get(key)
+        if analysis is not None:
+            return analysis
+
+    analysis = generate_analysis(text, language)
+    if cache and analysis:
+        cache.set(key, analysis)
+    return analysis
+
+
+def stream_analysis(text, language="en"):
+    """Yield the analysis of a document in chunks as Gemini generates it.
+
+    A cached analysis is yielded in one piece; a fresh one is cached once
+    the stream completes.
+    """
+    cache = get_analysis_cache()
+    key = analysis_cache_key(text, language)
+    if cache:
+        analysis = cache.get(key)
+        if analysis is not None:
+            yield analysis
+            return
+
+    chunks = []
+    prompt = build_analysis_prompt(condense_long_document(text), language)
+    for chunk in get_llm().generate_stream(prompt):
+        if chunk:
+            chunks.append(chunk)
+            yield chunk
+
+    if cache and chunks:
+        cache.set(key, "".join(chunks))
+
+
+def condense_long_document(text):
+    """Map step for long documents: summarize token-bounded chunks in parallel.
+
+    Documents under LONG_DOC_TOKEN_THRESHOLD tokens are returned unchanged.
+    Longer ones are replaced by their chunk summaries, which the regular
+    analysis prompt then merges into the usual sectioned format.
+    """
+    tokens = count_tokens(text)
+    if tokens <= Config.LONG_DOC_TOKEN_THRESHOLD:
+        return text
+
+    chunks = split_text(
+        text, Config.LONG_DOC_CHUNK_TOKENS, Config.LONG_DOC_CHUNK_OVERLAP
+    )
+    logger.info(f"Analyzing long document ({tokens} tokens) in {len(chunks)} chunks")
+
+    def summarize(part):
+        prompt = CHUNK_SUMMARY_PROMPT.format(
+            part=part + 1, parts=len(chunks), text=chunks[part]
+        )
+        return get_llm().generate(prompt)
+
+    workers = max(1, min(Config.LONG_DOC_MAP_CONCURRENCY, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        summaries = list(executor.map(summarize, range(len(chunks))))
+
+    return "\n\n".join(
+        f"[Part {part + 1} of {len(chunks)}]\n{summary}"
+        for part, summary in enumerate(summaries)
+    )
+
+
+def build_analysis_prompt(text, language="en"):
+    """Build the Gemini prompt that analyzes a document in a language."""
+    # Language-specific instructions and section headers
+    language_config = {
+        "en": {
+            "instruction": "Provide the entire analysis in English, including all section headers and content. Make the output user-friendly and easy to understand.",
+            "headers": {
+                "overview": "Document Overview",
+                "type": "Type",
+                "purpose": "Purpose",
+                "date": "Date",
+                "key_info": "Key Information",
+                "main_points": "Main Points",
+                "findings": "Findings",
+                "diagnoses": "Diagnoses",
+                "actions": "Required Actions",
+                "followup": "Follow-up Appointments",
+                "medications": "Medications",
+                "lifestyle": "Lifestyle Changes",
+                "tasks": "Other Tasks",
+                "dates": "Important Dates",
+                "appointments": "Appointments",
+                "deadlines": "Deadlines",
+                "schedule": "Follow-up Schedule",
+                "notes": "Additional Notes",
+                "warnings": "Warnings",
+                "questions": "Questions",
+                "additional": "Additional Information",
             },
-            "es": {
-                "instruction": "Proporciona todo el análisis en español, incluyendo todos los encabezados de sección y contenido. Haz que el resultado sea fácil de entender para el usuario.",
-                "headers": {
-                    "overview": "Descripción General del Documento",
-                    "type": "Tipo",
-                    "purpose": "Propósito",
-                    "date": "Fecha",
-                    "key_info": "Información Clave",
-                    "main_points": "Puntos Principales",
-                    "findings": "Hallazgos",
-                    "diagnoses": "Diagnósticos",
-                    "actions": "Acciones Requeridas",
-                    "followup": "Citas de Seguimiento",
-                    "medications": "Medicamentos",
-                    "lifestyle": "Cambios en el Estilo de Vida",
-                    "tasks": "Otras Tareas",
-                    "dates": "Fechas Importantes",
-                    "appointments": "Citas",
-                    "deadlines": "Plazos",
-                    "schedule": "Calendario de Seguimiento",
-                    "notes": "Notas Adicionales",
-                    "warnings": "Advertencias",
-                    "questions": "Preguntas",
-                    "additional": "Información Adicional",
-                },
+        },
+        "es": {
+            "instruction": "Proporciona todo el análisis en español, incluyendo todos los encabezados de sección y contenido. Haz que el resultado sea fácil de entender para el usuario.",
+            "headers": {
+                "overview": "Descripción General del Documento",
+                "type": "Tipo",
+                "purpose": "Propósito",
+                "date": "Fecha",
+                "key_info": "Información Clave",
+                "main_points": "Puntos Principales",
+                "findings": "Hallazgos",
+                "diagnoses": "Diagnósticos",
+                "actions": "Acciones Requeridas",
+                "followup": "Citas de Seguimiento",
+                "medications": "Medicamentos",
+                "lifestyle": "Cambios en el Estilo de Vida",
+                "tasks": "Otras Tareas",
+                "dates": "Fechas Importantes",
+                "appointments": "Citas",
+                "deadlines": "Plazos",
+                "schedule": "Calendario de Seguimiento",
+                "notes": "Notas Adicionales",
+                "warnings": "Advertencias",
+                "questions": "Preguntas",
+                "additional": "Información Adicional",
             },
-            "fr": {
-                "instruction": "Fournir l'analyse complète en français, y compris tous les en-têtes de section et le contenu. Rendez le résultat facile à comprendre pour l'utilisateur.",
-                "headers": {
-                    "overview": "Aperçu du Document",
-                    "type": "Type",
-                    "purpose": "Objectif",
-                    "date": "Date",
-                    "key_info": "Informations Clés",
-                    "main_points": "Points Principaux",
-                    "findings": "Trouvailles",
-                    "diagnoses": "Diagnostics",
-                    "actions": "Actions Requises",
-                    "followup": "Rendez-vous de Suivi",
-                    "medications": "Médicaments",
-                    "lifestyle": "Changements de Mode de Vie",
-                    "tasks": "Autres Tâches",
-                    "dates": "Dates Importantes",
-                    "appointments": "Rendez-vous",
-                    "deadlines": "Échéances",
-                    "schedule": "Calendrier de Suivi",
-                    "notes": "Notes Supplémentaires",
-                    "warnings": "Avertissements",
-                    "questions": "Questions",
-                    "additional": "Informations Supplémentaires",
-                },
+        },
+        "fr": {
+            "instruction": "Fournir l'analyse complète en français, y compris tous les en-têtes de section et le contenu. Rendez le résultat facile à comprendre pour l'utilisateur.",
+            "headers": {
+                "overview": "Aperçu du Document",
+                "type": "Type",
+                "purpose": "Objectif",
+                "date": "Date",
+                "key_info": "Informations Clés",
+                "main_points": "Points Principaux",
+                "findings": "Trouvailles",
+                "diagnoses": "Diagnostics",
+                "actions": "Actions Requises",
+                "followup": "Rendez-vous de Suivi",
+                "medications": "Médicaments",
+                "lifestyle": "Changements de Mode de Vie",
+                "tasks": "Autres Tâches",
+                "dates": "Dates Importantes",
+                "appointments": "Rendez-vous",
+                "deadlines": "Échéances",
+                "schedule": "Calendrier de Suivi",
+                "notes": "Notes Supplémentaires",
+                "warnings": "Avertissements",
+                "questions": "Questions",
+                "additional": "Informations Supplémentaires",
             },
-            "de": {
-                "instruction": "Geben Sie die vollständige Analyse auf Deutsch ab, einschließlich aller Abschnittsüberschriften und Inhalte. Machen Sie die Ausgabe benutzerfreundlich und leicht verständlich.",
-                "headers": {
-                    "overview": "Dokumentübersicht",
-                    "type": "Typ",
-                    "purpose": "Zweck",
-                    "date": "Datum",
-                    "key_info": "Wichtige Informationen",
-                    "main_points": "Hauptpunkte",
-                    "findings": "Befunde",
-                    "diagnoses": "Diagnosen",
-                    "actions": "Erforderliche Maßnahmen",
-                    "followup": "Nachfolgetermine",
-                    "medications": "Medikamente",
-                    "lifestyle": "Lebensstiländerungen",
-                    "tasks": "Weitere Aufgaben",
-                    "dates": "Wichtige Termine",
-                    "appointments": "Termine",
-                    "deadlines": "Fristen",
-                    "schedule": "Nachfolgeplan",
-                    "notes": "Zusätzliche Hinweise",
-                    "warnings": "Warnungen",
-                    "questions": "Fragen",
-                    "additional": "Zusätzliche Informationen",
-                },
+        },
+        "de": {
+            "instruction": "Geben Sie die vollständige Analyse auf Deutsch ab, einschließlich aller Abschnittsüberschriften und Inhalte. Machen Sie die Ausgabe benutzerfreundlich und leicht verständlich.",
+            "headers": {
+                "overview": "Dokumentübersicht",
+                "type": "Typ",
+                "purpose": "Zweck",
+                "date": "Datum",
+                "key_info": "Wichtige Informationen",
+                "main_points": "Hauptpunkte",
+                "findings": "Befunde",
+                "diagnoses": "Diagnosen",
+                "actions": "Erforderliche Maßnahmen",
+                "followup": "Nachfolgetermine",
+                "medications": "Medikamente",
+                "lifestyle": "Lebensstiländerungen",
+                "tasks": "Weitere Aufgaben",
+                "dates": "Wichtige Termine",
+                "appointments": "Termine",
+                "deadlines": "Fristen",
+                "schedule": "Nachfolgeplan",
+                "notes": "Zusätzliche Hinweise",
+                "warnings": "Warnungen",
+                "questions": "Fragen",
+                "additional": "Zusätzliche Informationen",
             },
-            "it": {
-                "instruction": "Fornisci l'analisi completa in italiano, inclusi tutti gli intestazioni delle sezioni e il contenuto. Rendi l'output facile da capire per l'utente.",
-                "headers": {
-                    "overview": "Panoramica del Documento",
-                    "type": "Tipo",
-                    "purpose": "Scopo",
-                    "date": "Data",
-                    "key_info": "Informazioni Chiave",
-                    "main_points": "Punti Principali",
-                    "findings": "Risultati",
-                    "diagnoses": "Diagnosi",
-                    "actions": "Azioni Richieste",
-                    "followup": "Appuntamenti di Follow-up",
-                    "medications": "Farmaci",
-                    "lifestyle": "Modifiche allo Stile di Vita",
-                    "tasks": "Altre Attività",
-                    "dates": "Date Importanti",
-                    "appointments": "Appuntamenti",
-                    "deadlines": "Scadenze",
-                    "schedule": "Programma di Follow-up",
-                    "notes": "Note Aggiuntive",
-                    "warnings": "Avvertenze",
-                    "questions": "Domande",
-                    "additional": "Informazioni Aggiuntive",
-                },
+        },
+        "it": {
+            "instruction": "Fornisci l'analisi completa in italiano, inclusi tutti gli intestazioni delle sezioni e il contenuto. Rendi l'output facile da capire per l'utente.",
+            "headers": {
+                "overview": "Panoramica del Documento",
+                "type": "Tipo",
+                "purpose": "Scopo",
+                "date": "Data",
+                "key_info": "Informazioni Chiave",
+                "main_points": "Punti Principali",
+                "findings": "Risultati",
+                "diagnoses": "Diagnosi",
+                "actions": "Azioni Richieste",
+                "followup": "Appuntamenti di Follow-up",
+                "medications": "Farmaci",
+                "lifestyle": "Modifiche allo Stile di Vita",
+                "tasks": "Altre Attività",
+                "dates": "Date Importanti",
+                "appointments": "Appuntamenti",
+                "deadlines": "Scadenze",
+                "schedule": "Programma di Follow-up",
+                "notes": "Note Aggiuntive",
+                "warnings": "Avvertenze",
+                "questions": "Domande",
+                "additional": "Informazioni Aggiuntive",
             },
-            "pt": {
-                "instruction": "Forneça a análise completa em português, incluindo todos os cabeçalhos de seção e conteúdo. Torne a saída fácil de entender para o usuário.",
-                "headers": {
-                    "overview": "Visão Geral do Documento",
-                    "type": "Tipo",
-                    "purpose": "Propósito",
-                    "date": "Data",
-                    "key_info": "Informações Principais",
-                    "main_points": "Pontos Principais",
-                    "findings": "Resultados",
-                    "diagnoses": "Diagnósticos",
-                    "actions": "Ações Necessárias",
-                    "followup": "Consultas de Acompanhamento",
-                    "medications": "Medicamentos",
-                    "lifestyle": "Mudanças no Estilo de Vida",
-                    "tasks": "Outras Tarefas",
-                    "dates": "Datas Importantes",
-                    "appointments": "Consultas",
-                    "deadlines": "Prazos",
-                    "schedule": "Agenda de Acompanhamento",
-                    "notes": "Notas Adicionais",
-                    "warnings": "Avisos",
-                    "questions": "Perguntas",
-                    "additional": "Informações Adicionais",
-                },
+        },
+        "pt": {
+            "instruction": "Forneça a análise completa em português, incluindo todos os cabeçalhos de seção e conteúdo. Torne a saída fácil de entender para o usuário.",
+            "headers": {
+                "overview": "Visão Geral do Documento",
+                "type": "Tipo",
+                "purpose": "Propósito",
+                "date": "Data",
+                "key_info": "Informações Principais",
+                "main_points": "Pontos Principais",
+                "findings": "Resultados",
+                "diagnoses": "Diagnósticos",
+                "actions": "Ações Necessárias",
+                "followup": "Consultas de Acompanhamento",
+                "medications": "Medicamentos",
+                "lifestyle": "Mudanças no Estilo de Vida",
+                "tasks": "Outras Tarefas",
+                "dates": "Datas Importantes",
+                "appointments": "Consultas",
+                "deadlines": "Prazos",
+                "schedule": "Agenda de Acompanhamento",
+                "notes": "Notas Adicionais",
+                "warnings": "Avisos",
+                "questions": "Perguntas",
+                "additional": "Informações Adicionais",
             },
-            "ru": {
-                "instruction": "Предоставьте полный анализ на русском языке, включая все заголовки разделов и содержание. Сделайте вывод удобным для понимания пользователем.",
-                "headers": {
-                    "overview": "Обзор Документа",
-                    "type": "Тип",
-                    "purpose": "Назначение",
-                    "date": "Дата",
-                    "key_info": "Ключевая Информация",
-                    "main_points": "Основные Пункты",
-                    "findings": "Результаты",
-                    "diagnoses": "Диагнозы",
-                    "actions": "Необходимые Действия",
-                    "followup": "Последующие Приемы",
-                    "medications": "Лекарства",
-                    "lifestyle": "Изменения Образа Жизни",
-                    "tasks": "Другие Задачи",
-                    "dates": "Важные Даты",
-                    "appointments": "Приемы",
-                    "deadlines": "Сроки",
-                    "schedule": "График Наблюдения",
-                    "notes": "Дополнительные Заметки",
-                    "warnings": "Предупреждения",
-                    "questions": "Вопросы",
-                    "additional": "Дополнительная Информация",
-                },
+        },
+        "ru": {
+            "instruction": "Предоставьте полный анализ на русском языке, включая все заголовки разделов и содержание. Сделайте вывод удобным для понимания пользователем.",
+            "headers": {
+                "overview": "Обзор Документа",
+                "type": "Тип",
+                "purpose": "Назначение",
+                "date": "Дата",
+                "key_info": "Ключевая Информация",
+                "main_points": "Основные Пункты",
+                "findings": "Результаты",
+                "diagnoses": "Диагнозы",
+                "actions": "Необходимые Действия",
+                "followup": "Последующие Приемы",
+                "medications": "Лекарства",
+                "lifestyle": "Изменения Образа Жизни",
+                "tasks": "Другие Задачи",
+                "dates": "Важные Даты",
+                "appointments": "Приемы",
+                "deadlines": "Сроки",
+                "schedule": "График Наблюдения",
+                "notes": "Дополнительные Заметки",
+                "warnings": "Предупреждения",
+                "questions": "Вопросы",
+                "additional": "Дополнительная Информация",
             },
-            "zh": {
-                "instruction": "用中文提供完整的分析，包括所有章节标题和内容。使输出对用户来说易于理解。",
-                "headers": {
-                    "overview": "文档概述",
-                    "type": "类型",
-                    "purpose": "目的",
-                    "date": "日期",
-                    "key_info": "关键信息",
-                    "main_points": "要点",
-                    "findings": "发现",
-                    "diagnoses": "诊断",
-                    "actions": "所需行动",
-                    "followup": "后续预约",
-                    "medications": "药物",
-                    "lifestyle": "生活方式改变",
-                    "tasks": "其他任务",
-                    "dates": "重要日期",
-                    "appointments": "预约",
-                    "deadlines": "截止日期",
-                    "schedule": "随访时间表",
-                    "notes": "补充说明",
-                    "warnings": "警告",
-                    "questions": "问题",
-                    "additional": "补充信息",
-                },
+        },
+        "zh": {
+            "instruction": "用中文提供完整的分析，包括所有章节标题和内容。使输出对用户来说易于理解。",
+            "headers": {
+                "overview": "文档概述",
+                "type": "类型",
+                "purpose": "目的",
+                "date": "日期",
+                "key_info": "关键信息",
+                "main_points": "要点",
+                "findings": "发现",
+                "diagnoses": "诊断",
+                "actions": "所需行动",
+                "followup": "后续预约",
+                "medications": "药物",
+                "lifestyle": "生活方式改变",
+                "tasks": "其他任务",
+                "dates": "重要日期",
+                "appointments": "预约",
+                "deadlines": "截止日期",
+                "schedule": "随访时间表",
+                "notes": "补充说明",
+                "warnings": "警告",
+                "questions": "问题",
+                "additional": "补充信息",
             },
-            "ja": {
-                "instruction": "日本語で完全な分析を提供し、すべてのセクションヘッダーとコンテンツを含めてください。出力をユーザーにとって理解しやすいものにしてください。",
-                "headers": {
-                    "overview": "文書概要",
-                    "type": "種類",
-                    "purpose": "目的",
-                    "date": "日付",
-                    "key_info": "重要情報",
-                    "main_points": "主なポイント",
-                    "findings": "所見",
-                    "diagnoses": "診断",
-                    "actions": "必要な行動",
-                    "followup": "フォローアップ予約",
-                    "medications": "薬物",
-                    "lifestyle": "生活習慣の変更",
-                    "tasks": "その他のタスク",
-                    "dates": "重要な日付",
-                    "appointments": "予約",
-                    "deadlines": "期限",
-                    "schedule": "フォローアップスケジュール",
-                    "notes": "追加メモ",
-                    "warnings": "警告",
-                    "questions": "質問",
-                    "additional": "追加情報",
-                },
+        },
+        "ja": {
+            "instruction": "日本語で完全な分析を提供し、すべてのセクションヘッダーとコンテンツを含めてください。出力をユーザーにとって理解しやすいものにしてください。",
+            "headers": {
+                "overview": "文書概要",
+                "type": "種類",
+                "purpose": "目的",
+                "date": "日付",
+                "key_info": "重要情報",
+                "main_points": "主なポイント",
+                "findings": "所見",
+                "diagnoses": "診断",
+                "actions": "必要な行動",
+                "followup": "フォローアップ予約",
+                "medications": "薬物",
+                "lifestyle": "生活習慣の変更",
+                "tasks": "その他のタスク",
+                "dates": "重要な日付",
+                "appointments": "予約",
+                "deadlines": "期限",
+                "schedule": "フォローアップスケジュール",
+                "notes": "追加メモ",
+                "warnings": "警告",
+                "questions": "質問",
+                "additional": "追加情報",
             },
-            "ko": {
-                "instruction": "한국어로 전체 분석을 제공하고, 모든 섹션 헤더와 내용을 포함하세요. 출력을 사용자가 이해하기 쉽게 만드세요.",
-                "headers": {
-                    "overview": "문서 개요",
-                    "type": "유형",
-                    "purpose": "목적",
-                    "date": "날짜",
-                    "key_info": "주요 정보",
-                    "main_points": "주요 포인트",
-                    "findings": "발견",
-                    "diagnoses": "진단",
-                    "actions": "필요한 조치",
-                    "followup": "후속 예약",
-                    "medications": "약물",
-                    "lifestyle": "생활 방식 변경",
-                    "tasks": "기타 작업",
-                    "dates": "중요 날짜",
-                    "appointments": "예약",
-                    "deadlines": "마감일",
-                    "schedule": "후속 일정",
-                    "notes": "추가 메모",
-                    "warnings": "경고",
-                    "questions": "질문",
-                    "additional": "추가 정보",
-                },
+        },
+        "ko": {
+            "instruction": "한국어로 전체 분석을 제공하고, 모든 섹션 헤더와 내용을 포함하세요. 출력을 사용자가 이해하기 쉽게 만드세요.",
+            "headers": {
+                "overview": "문서 개요",
+                "type": "유형",
+                "purpose": "목적",
+                "date": "날짜",
+                "key_info": "주요 정보",
+                "main_points": "주요 포인트",
+                "findings": "발견",
+                "diagnoses": "진단",
+                "actions": "필요한 조치",
+                "followup": "후속 예약",
+                "medications": "약물",
+                "lifestyle": "생활 방식 변경",
+                "tasks": "기타 작업",
+                "dates": "중요 날짜",
+                "appointments": "예약",
+                "deadlines": "마감일",
+                "schedule": "후속 일정",
+                "notes": "추가 메모",
+                "warnings": "경고",
+                "questions": "질문",
+                "additional": "추가 정보",
             },
-        }
+        },
+    }
 
-        # Get language configuration or default to English
-        config = language_config.get(language, language_config["en"])
-        headers = config["headers"]
+    # Get language configuration or default to English
+    config = language_config.get(language, language_config["en"])
+    headers = config["headers"]
 
-        prompt = f"""Analyze the following medical document and provide a clear, well-structured explanation of its contents and any required actions.
+    prompt = f"""Analyze the following medical document and provide a clear, well-structured explanation of its contents and any required actions.
 {config['instruction']}
 
 Format the response in markdown with the following sections:
@@ -377,15 +465,84 @@ Make sure to:
 14. Use consistent formatting throughout the document
 15. Add clear transitions between sections"""
 
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        print(f"Error analyzing document: {str(e)}")
+    return prompt
+
+
+def generate_analysis(text, language="en"):
+    """Analyze document text using Gemini."""
+    try:
+        prompt = build_analysis_prompt(condense_long_document(text), language)
+        return get_llm().generate(prompt)
+    except Exception:
+        logger.exception("Error analyzing document")
         return None
 
 
+def read_uploads(files, spooled):
+    """Read uploaded files into (filename, source) pairs.
+
+    Small uploads are kept in memory as bytes; large ones are spooled to
+    uniquely named temp files, whose paths are added to spooled so the
+    caller can remove them. Disallowed files get a source of None.
+    """
+    uploads = []
+    for file in files:
+        if file and allowed_file(file.filename):
+            filename = secure_filename(file.filename)
+            file.stream.seek(0, os.SEEK_END)
+            size = file.stream.tell()
+            file.stream.seek(0)
+            if size <= Config.UPLOAD_MEMORY_LIMIT:
+                uploads.append((filename, file.read()))
+            else:
+                fd, file_path = tempfile.mkstemp(
+                    prefix="medassist_", suffix=f"_{filename}", dir=UPLOAD_FOLDER
+                )
+                os.close(fd)
+                spooled.append(file_path)
+                file.save(file_path)
+                uploads.append((filename, file_path))
+        else:
+            uploads.append((file.filename, None))
+    return uploads
+
+
+def remove_files(paths):
+    """Clean up temporary files."""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def process_file(source, filename, language, on_progress=None):
+    """OCR and analyze one upload, given as bytes or as a path to the file.
+
+    Returns (analysis, error, pages), where pages lists the extraction path
+    ("text" or "ocr") taken by each page.
+    """
+    if on_progress:
+        on_progress("extracting")
+    # Extract text, skipping OCR for previously seen files
+    text, pages = extract_text(source, filename)
+    if not text:
+        return None, "Failed to extract text from document", pages
+
+    if on_progress:
+        on_progress("analyzing")
+    # Analyze the document with selected language
+    analysis = analyze_document(text, language)
+    if not analysis:
+        return None, "Failed to analyze document", pages
+
+    return analysis, None, pages
+
+
 @documents_bp.route("/api/documents/process", methods=["POST"])
+@track_peak_rss("process_documents")
 def process_documents():
+    if request.args.get("async", "").lower() in ("1", "true"):
+        return submit_document_job()
+
     if "files" not in request.files:
         return jsonify({"error": "No documents provided"}), 400
 
@@ -397,46 +554,318 @@ def process_documents():
 
     analyses = {}
     errors = {}
+    extraction = {}
 
-    for file in files:
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
+    spooled = []
+    try:
+        saved = read_uploads(files, spooled)
+
+        # OCR runs in subprocesses and analysis waits on the network, so
+        # threads overlap both across files
+        workers = max(1, min(Config.DOCUMENT_CONCURRENCY, len(saved)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(process_file, source, filename, language)
+                if source is not None
+                else None
+                for filename, source in saved
+            ]
+
+            for (filename, _), future in zip(saved, futures):
+                if future is None:
+                    errors[filename] = "File type not allowed"
+                    continue
+                try:
+                    analysis, error, extraction[filename] = future.result()
+                    if error:
+                        errors[filename] = error
+                        continue
 
-            try:
-                # Save the uploaded file
-                file.save(file_path)
+                    analyses[filename] = analysis
 
-                # Extract text based on file type
-                if filename.lower().endswith(".pdf"):
-                    text = extract_text_from_pdf(file_path)
-                else:
-                    image = Image.open(file_path)
-                    text = extract_text_from_image(image)
+                except Exception as e:
+                    errors[filename] = str(e)
+                    logger.exception(f"Error processing {filename}")
+    finally:
+        remove_files(spooled)
 
-                if not text:
-                    errors[filename] = "Failed to extract text from document"
-                    continue
+    if not analyses and not errors:
+        return jsonify({"error": "No documents were successfully processed"}), 400
 
-                # Analyze the document with selected language
-                analysis = analyze_document(text, language)
-                if not analysis:
-                    errors[filename] = "Failed to analyze document"
+    return jsonify({"analyses": analyses, "errors": errors, "extraction": extraction})
+
+
+@documents_bp.route("/api/documents/process/stream", methods=["POST"])
+def stream_process_documents():
+    """Like process_documents, but stream each analysis as server-sent events.
+
+    Events: "file" when a document's analysis starts, "token" for each
+    chunk of analysis text, "error" for a document that failed, and a final
+    "done" carrying the same analyses/errors/extraction as the JSON endpoint.
+    """
+    if "files" not in request.files:
+        return jsonify({"error": "No documents provided"}), 400
+
+    files = request.files.getlist("files")
+    language = request.form.get("language", "en")
+
+    if not files or files[0].filename == "":
+        return jsonify({"error": "No selected files"}), 400
+
+    spooled = []
+    try:
+        saved = read_uploads(files, spooled)
+    except Exception:
+        remove_files(spooled)
+        raise
+
+    def generate():
+        analyses = {}
+        errors = {}
+        extraction = {}
+        try:
+            # Extract every file up front, then stream the analyses in order
+            workers = max(1, min(Config.DOCUMENT_CONCURRENCY, len(saved)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(extract_text, source, filename)
+                    if source is not None
+                    else None
+                    for filename, source in saved
+                ]
+
+                for (filename, _), future in zip(saved, futures):
+                    try:
+                        if future is None:
+                            raise ValueError("File type not allowed")
+                        text, extraction[filename] = future.result()
+                        if not text:
+                            raise ValueError("Failed to extract text from document")
+
+                        yield format_sse(
+                            {"filename": filename, "extraction": extraction[filename]},
+                            "file",
+                        )
+                        chunks = []
+                        for chunk in log_stream_latency(
+                            stream_analysis(text, language),
+                            f"analyze_document stream ({filename})",
+                        ):
+                            chunks.append(chunk)
+                            yield format_sse({"filename": filename, "text": chunk}, "token")
+                        if not chunks:
+                            raise ValueError("Failed to analyze document")
+
+                        analyses[filename] = "".join(chunks)
+
+                    except Exception as e:
+                        errors[filename] = str(e)
+                        logger.exception(f"Error processing {filename}")
+                        yield format_sse({"filename": filename, "error": str(e)}, "error")
+
+            yield format_sse(
+                {"analyses": analyses, "errors": errors, "extraction": extraction},
+                "done",
+            )
+        finally:
+            remove_files(spooled)
+
+    return sse_response(
+        track_stream_peak_rss(generate(), "stream_process_documents")
+    )
+
+
+def serialize_job(job):
+    analyses = {}
+    errors = {}
+    extraction = {}
+    for entry in job.files:
+        if entry.get("pages"):
+            extraction[entry["filename"]] = entry["pages"]
+        if entry.get("analysis"):
+            analyses[entry["filename"]] = entry["analysis"]
+        if entry.get("error"):
+            errors[entry["filename"]] = entry["error"]
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "language": job.language,
+        "files": [
+            {"filename": entry["filename"], "status": entry["status"]}
+            for entry in job.files
+        ],
+        "analyses": analyses,
+        "errors": errors,
+        "extraction": extraction,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+    }
+
+
+@track_peak_rss("run_document_job")
+def run_document_job(job_id):
+    """Process every file of a queued job, saving progress after each step."""
+    # Claim the job so no other worker picks it up
+    claimed = DocumentJob.query.filter_by(id=job_id, status="queued").update(
+        {"status": "running", "owner": worker_id()}
+    )
+    db.session.commit()
+    if not claimed:
+        return
+
+    job = db.session.get(DocumentJob, job_id)
+    entries = [dict(entry) for entry in job.files]
+
+    def save():
+        job.files = [dict(entry) for entry in entries]
+        db.session.commit()
+
+    for entry in entries:
+        # Files finished before a restart keep their results
+        if entry["status"] in ("done", "error"):
+            continue
+
+        def on_progress(status):
+            entry["status"] = status
+            save()
+
+        try:
+            analysis, error, entry["pages"] = process_file(
+                entry["path"], entry["filename"], job.language, on_progress
+            )
+        except Exception as e:
+            analysis, error = None, str(e)
+            logger.exception(f"Error processing {entry['filename']}")
+
+        entry["status"] = "error" if error else "done"
+        entry["analysis"] = analysis
+        entry["error"] = error
+        save()
+        if os.path.exists(entry["path"]):
+            os.remove(entry["path"])
+
+    job.status = (
+        "completed" if any(entry.get("analysis") for entry in entries) else "failed"
+    )
+    db.session.commit()
+    shutil.rmtree(os.path.join(Config.JOB_SPOOL_DIR, job.id), ignore_errors=True)
+
+
+def init_document_jobs(app, resume=True):
+    """Start the job worker pool and requeue jobs interrupted by a restart.
+
+    resume is False while the database has yet to be migrated, when there
+    may be no job table to requeue from.
+    """
+    queue = JobQueue(app, run_document_job, Config.JOB_WORKERS)
+    app.extensions["document_jobs"] = queue
+    if not resume:
+        return
+
+    with app.app_context():
+        pending = DocumentJob.query.filter(
+            DocumentJob.status.in_(["queued", "running"])
+        ).order_by(DocumentJob.created_at)
+        resumed = []
+        for job in pending:
+            if job.status == "running":
+                if owner_is_alive(job.owner):
                     continue
+                job.status = "queued"
+            resumed.append(job.id)
+        db.session.commit()
 
-                analyses[filename] = analysis
+    for job_id in resumed:
+        queue.submit(job_id)
 
-            except Exception as e:
-                errors[filename] = str(e)
-                print(f"Error processing {filename}: {str(e)}")
-            finally:
-                # Clean up temporary file
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-        else:
-            errors[file.filename] = "File type not allowed"
 
-    if not analyses and not errors:
-        return jsonify({"error": "No documents were successfully processed"}), 400
+@documents_bp.route("/api/documents/jobs", methods=["POST"])
+def submit_document_job():
+    if "files" not in request.files:
+        return jsonify({"error": "No documents provided"}), 400
+
+    files = request.files.getlist("files")
+    language = request.form.get("language", "en")
 
-    return jsonify({"analyses": analyses, "errors": errors})
+    if not files or files[0].filename == "":
+        return jsonify({"error": "No selected files"}), 400
+
+    pending = DocumentJob.query.filter(
+        DocumentJob.status.in_(["queued", "running"])
+    ).count()
+    if pending >= Config.JOB_MAX_PENDING:
+        return jsonify({"error": "Too many pending jobs, try again later"}), 503
+
+    # Spool uploads to disk so queued work survives a restart
+    job_id = secrets.token_hex(16)
+    job_dir = os.path.join(Config.JOB_SPOOL_DIR, job_id)
+    make_private_dir(job_dir)
+
+    entries = []
+    for index, file in enumerate(files):
+        if file and allowed_file(file.filename):
+            filename = secure_filename(file.filename)
+            file_path = os.path.join(job_dir, f"{index}_{filename}")
+            with open_private_file(file_path) as f:
+                file.save(f)
+            entries.append({"filename": filename, "path": file_path, "status": "queued"})
+        else:
+            entries.append(
+                {
+                    "filename": file.filename,
+                    "path": "",
+                    "status": "error",
+                    "error": "File type not allowed",
+                }
+            )
+
+    job = DocumentJob(id=job_id, language=language, files=entries)
+    db.session.add(job)
+    db.session.commit()
+    current_app.extensions["document_jobs"].submit(job_id)
+
+    return jsonify(serialize_job(job)), 202
+
+
+@documents_bp.route("/api/documents/jobs/<job_id>", methods=["GET"])
+def get_document_job(job_id):
+    job = db.session.get(DocumentJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(serialize_job(job))
+
+
+@documents_bp.route("/api/documents/jobs/<job_id>/events", methods=["GET"])
+def stream_document_job(job_id):
+    """Push the job state as server-sent events until the job finishes."""
+    if not db.session.get(DocumentJob, job_id):
+        return jsonify({"error": "Job not found"}), 404
+
+    def generate():
+        last_event = None
+        while True:
+            # End the read transaction so commits from the worker are visible
+            db.session.rollback()
+            job = db.session.get(DocumentJob, job_id)
+            event = format_sse(serialize_job(job))
+            if event != last_event:
+                yield event
+                last_event = event
+            if job.status in JOB_FINISHED_STATUSES:
+                return
+            time.sleep(Config.JOB_EVENT_INTERVAL)
+
+    return sse_response(generate())
+
+
+@documents_bp.route("/api/documents/cache/stats", methods=["GET"])
+def get_cache_stats():
+    ocr_cache = get_ocr_cache()
+    analysis_cache = get_analysis_cache()
+    return jsonify(
+        {
+            "ocr": ocr_cache.stats() if ocr_cache else None,
+            "analysis": analysis_cache.stats() if analysis_cache else None,
+        }
+    )
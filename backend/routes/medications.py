@@ -1,94 +1,41 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+import json
+import logging
+import time
+from config.config import Config
+from utils.interactions import summarize
+from utils.reference_data import get_reference_data
 
 medications_bp = Blueprint("medications", __name__)
+logger = logging.getLogger(__name__)
 
-# Dummy medication data
-medications = [
-    {
-        "id": "1",
-        "name": "Ibuprofen",
-        "description": "Nonsteroidal anti-inflammatory drug (NSAID)",
-    },
-    {
-        "id": "2",
-        "name": "Aspirin",
-        "description": "Salicylate drug used for pain relief and blood thinning",
-    },
-    {"id": "3", "name": "Warfarin", "description": "Blood thinner medication"},
-    {"id": "4", "name": "Metformin", "description": "Diabetes medication"},
-    {
-        "id": "5",
-        "name": "Lisinopril",
-        "description": "ACE inhibitor for blood pressure",
-    },
-    {"id": "6", "name": "Amoxicillin", "description": "Antibiotic medication"},
-    {
-        "id": "7",
-        "name": "Omeprazole",
-        "description": "Proton pump inhibitor for acid reflux",
-    },
-    {"id": "8", "name": "Sertraline", "description": "Antidepressant medication"},
-    {
-        "id": "9",
-        "name": "Atorvastatin",
-        "description": "Cholesterol-lowering medication",
-    },
-    {
-        "id": "10",
-        "name": "Metoprolol",
-        "description": "Beta blocker for heart conditions",
-    },
-]
-
-medication_interactions = [
-    {
-        "medication1": "1",
-        "medication2": "3",
-        "severity": "high",
-        "description": "Taking ibuprofen while on blood thinners may increase bleeding risk.",
-    },
-    {
-        "medication1": "2",
-        "medication2": "3",
-        "severity": "high",
-        "description": "Combining aspirin with warfarin significantly increases bleeding risk.",
-    },
-    {
-        "medication1": "4",
-        "medication2": "7",
-        "severity": "moderate",
-        "description": "Omeprazole may affect the absorption of metformin.",
-    },
-    {
-        "medication1": "5",
-        "medication2": "8",
-        "severity": "moderate",
-        "description": "Lisinopril may interact with sertraline to increase dizziness risk.",
-    },
-    {
-        "medication1": "6",
-        "medication2": "9",
-        "severity": "low",
-        "description": "Amoxicillin may slightly reduce the effectiveness of atorvastatin.",
-    },
-    {
-        "medication1": "7",
-        "medication2": "8",
-        "severity": "moderate",
-        "description": "Omeprazole may increase sertraline levels in the blood.",
-    },
-    {
-        "medication1": "9",
-        "medication2": "10",
-        "severity": "moderate",
-        "description": "Atorvastatin may increase the effects of metoprolol.",
-    },
-]
+# Results returned by /api/medications/search when no limit is given, and
+# the most a client may ask for
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
 
 
 @medications_bp.route("/api/medications", methods=["GET"])
 def get_medications():
-    return jsonify(medications)
+    # Clients revalidate with If-None-Match and get a 304 while the catalog
+    # is unchanged
+    data = get_reference_data()
+    response = Response(data.records_json("medications"), mimetype="application/json")
+    response.set_etag(data.medications_etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@medications_bp.route("/api/medications/search", methods=["GET"])
+def search_medications():
+    query = request.args.get("q", "")
+    try:
+        limit = int(request.args.get("limit", SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    return jsonify(get_reference_data().medication_search.search(query, limit))
 
 
 @medications_bp.route("/api/check-interactions", methods=["POST"])
@@ -97,12 +44,109 @@ def check_interactions():
     selected_medication_ids = data.get("medications", [])
 
     # Find interactions between selected medications
-    interactions = []
-    for interaction in medication_interactions:
-        if (
-            interaction["medication1"] in selected_medication_ids
-            and interaction["medication2"] in selected_medication_ids
-        ):
-            interactions.append(interaction)
+    index = get_reference_data().interaction_index
+    interactions = index.find(selected_medication_ids)
 
     return jsonify(interactions)
+
+
+def parse_medication_list(item, position):
+    """Read one list of a bulk request: an array of ids or {"id", "medications"}.
+
+    Returns (list id, medication ids); lists without an id are numbered by
+    position. Raises ValueError for anything else.
+    """
+    list_id = position
+    if isinstance(item, dict):
+        list_id = item.get("id", position)
+        item = item.get("medications")
+    if not isinstance(item, list) or not all(isinstance(m, str) for m in item):
+        raise ValueError("Each list must be an array of medication ids")
+    return list_id, item
+
+
+def check_lists(lists):
+    """Check parsed (list id, medication ids) pairs together; return results."""
+    index = get_reference_data().interaction_index
+    found = index.find_many([ids for _, ids in lists])
+    return [
+        {
+            "id": list_id,
+            "interactions": interactions,
+            "summary": summarize(interactions),
+        }
+        for (list_id, _), interactions in zip(lists, found)
+    ]
+
+
+def throughput(count, started):
+    elapsed = time.perf_counter() - started
+    stats = {
+        "lists": count,
+        "seconds": round(elapsed, 4),
+        "lists_per_second": round(count / elapsed, 1) if elapsed else None,
+    }
+    logger.info(f"Checked {count} medication lists in {elapsed:.3f}s")
+    return stats
+
+
+@medications_bp.route("/api/check-interactions/bulk", methods=["POST"])
+def check_interactions_bulk():
+    """Check many medication lists in one request.
+
+    A JSON body {"lists": [...]} gets a single response with a result per
+    list and throughput stats. An application/x-ndjson body, one list per
+    line, is read and answered as a stream: one result per line, in batches
+    of BULK_INTERACTION_BATCH, then a final {"stats": ...} line. Lines that
+    cannot be read produce an {"line": n, "error": ...} line instead.
+    """
+    if request.mimetype == "application/x-ndjson":
+        return check_interactions_stream()
+
+    data = request.get_json(silent=True)
+    items = data.get("lists") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return jsonify({"error": "lists is required"}), 400
+    if len(items) > Config.BULK_INTERACTION_MAX_LISTS:
+        return (
+            jsonify(
+                {
+                    "error": f"At most {Config.BULK_INTERACTION_MAX_LISTS} lists "
+                    "per request; stream larger batches as NDJSON"
+                }
+            ),
+            413,
+        )
+
+    started = time.perf_counter()
+    try:
+        lists = [parse_medication_list(item, i) for i, item in enumerate(items)]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    results = check_lists(lists)
+
+    return jsonify({"results": results, "stats": throughput(len(results), started)})
+
+
+def check_interactions_stream():
+    def generate():
+        started = time.perf_counter()
+        count = 0
+        batch = []
+        for line_number, line in enumerate(request.stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                batch.append(parse_medication_list(json.loads(line), count))
+                count += 1
+            except ValueError as e:
+                yield json.dumps({"line": line_number, "error": str(e)}) + "\n"
+                continue
+            if len(batch) >= Config.BULK_INTERACTION_BATCH:
+                yield "".join(json.dumps(r) + "\n" for r in check_lists(batch))
+                batch = []
+        if batch:
+            yield "".join(json.dumps(r) + "\n" for r in check_lists(batch))
+        yield json.dumps({"stats": throughput(count, started)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
@@ -1,12 +1,27 @@
 from flask import Blueprint, jsonify, request, session
 from models.models import db, SavedReport
+from utils.report_search import is_enabled, search_reports
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import defer
+from datetime import datetime
 from functools import wraps
+import base64
+import binascii
+import json
 import logging
 
 reports_bp = Blueprint("reports", __name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Report types that can be saved
+REPORT_TYPES = ["soap", "analysis"]
+
+# Reports per page when a page is asked for without a limit, and the most
+# one page may hold
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
 
 def login_required(f):
     @wraps(f)
@@ -32,7 +47,7 @@ def save_report():
             logger.error("Missing required fields")
             return jsonify({"error": "Missing required fields"}), 400
 
-        if report_type not in ["soap", "analysis"]:
+        if report_type not in REPORT_TYPES:
             logger.error(f"Invalid report type: {report_type}")
             return jsonify({"error": "Invalid report type"}), 400
 
@@ -67,30 +82,157 @@ def save_report():
         return jsonify({"error": str(e)}), 500
 
 
+def report_json(report, content=True):
+    data = {
+        "id": report.id,
+        "title": report.title,
+        "type": report.report_type,
+        "created_at": report.created_at.isoformat(),
+    }
+    if content:
+        data["content"] = report.content
+    return data
+
+
+def encode_cursor(report, report_type):
+    """Return an opaque cursor pointing just past report in the listing.
+
+    The type the listing is filtered on is part of the cursor, so a cursor
+    cannot continue a listing of a different type.
+    """
+    key = json.dumps([report.created_at.isoformat(), report.id, report_type])
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id, report type) from a cursor, or raise ValueError."""
+    try:
+        created_at, report_id, report_type = json.loads(
+            base64.urlsafe_b64decode(cursor)
+        )
+        return datetime.fromisoformat(created_at), int(report_id), report_type
+    except (binascii.Error, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+
 @reports_bp.route("/api/reports", methods=["GET"])
 @login_required
 def get_reports():
+    """List the user's reports, newest first.
+
+    Without limit or cursor, every report is returned with its content, as
+    before. With either, one page is returned along with next_cursor, to
+    pass back as cursor for the following page (null on the last one).
+    Pages are keyed on (created_at, id), so each costs the same however
+    deep it is, and reports saved meanwhile do not shift later pages.
+    type limits the listing to one report type, and pages within it; a
+    cursor only continues a listing of the type it came from. fields=metadata
+    leaves out the content, which is then not even loaded; GET
+    /api/reports/<id> returns it.
+    """
+    fields = request.args.get("fields", "all")
+    if fields not in ("all", "metadata"):
+        return jsonify({"error": "fields must be 'all' or 'metadata'"}), 400
+    report_type = request.args.get("type") or None
+    if report_type and report_type not in REPORT_TYPES:
+        return jsonify({"error": "Invalid report type"}), 400
+    paginate = "limit" in request.args or "cursor" in request.args
     try:
-        reports = (
-            SavedReport.query.filter_by(user_id=session["user_id"])
-            .order_by(SavedReport.created_at.desc())
-            .all()
+        limit = int(request.args.get("limit", PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    query = SavedReport.query.filter_by(user_id=session["user_id"])
+    if report_type:
+        query = query.filter_by(report_type=report_type)
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            created_at, report_id, cursor_type = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        if cursor_type != report_type:
+            return jsonify({"error": "Cursor is for a different report type"}), 400
+        query = query.filter(
+            or_(
+                SavedReport.created_at < created_at,
+                and_(
+                    SavedReport.created_at == created_at,
+                    SavedReport.id < report_id,
+                ),
+            )
         )
+    if fields == "metadata":
+        query = query.options(defer(SavedReport.content))
+    query = query.order_by(SavedReport.created_at.desc(), SavedReport.id.desc())
 
+    try:
+        if not paginate:
+            reports = query.all()
+            return jsonify(
+                {"reports": [report_json(r, fields == "all") for r in reports]}
+            )
+
+        # One extra row tells whether there is a next page
+        reports = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(reports) > limit:
+            reports = reports[:limit]
+            next_cursor = encode_cursor(reports[-1], report_type)
         return jsonify(
             {
-                "reports": [
-                    {
-                        "id": report.id,
-                        "title": report.title,
-                        "content": report.content,
-                        "type": report.report_type,
-                        "created_at": report.created_at.isoformat(),
-                    }
-                    for report in reports
-                ]
+                "reports": [report_json(r, fields == "all") for r in reports],
+                "next_cursor": next_cursor,
             }
         )
     except Exception as e:
         logger.error(f"Error fetching reports: {str(e)}")
         return jsonify({"error": str(e)}), 500
+
+
+@reports_bp.route("/api/reports/search", methods=["GET"])
+@login_required
+def search():
+    """Full-text search of the user's reports, best match first.
+
+    q is matched against titles and content: every word must appear, and a
+    word ending in * matches any word starting with it. type limits the
+    results to one report type. Each result has a snippet of the content
+    with the matched words in bold.
+    """
+    if not is_enabled():
+        return jsonify({"error": "Report search is not available"}), 503
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    report_type = request.args.get("type")
+    if report_type and report_type not in REPORT_TYPES:
+        return jsonify({"error": "Invalid report type"}), 400
+    try:
+        limit = int(request.args.get("limit", PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    try:
+        results = search_reports(session["user_id"], query, report_type, limit)
+        return jsonify({"results": results})
+    except Exception as e:
+        logger.error(f"Error searching reports: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@reports_bp.route("/api/reports/<int:report_id>", methods=["GET"])
+@login_required
+def get_report(report_id):
+    try:
+        report = SavedReport.query.filter_by(
+            id=report_id, user_id=session["user_id"]
+        ).first()
+        if report is None:
+            return jsonify({"error": "Report not found"}), 404
+        return jsonify({"report": report_json(report)})
+    except Exception as e:
+        logger.error(f"Error fetching report {report_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
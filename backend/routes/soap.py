@@ -1,12 +1,20 @@
-from flask import Blueprint, jsonify, request
-import google.generativeai as genai
+from flask import Blueprint, current_app, jsonify, request
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import logging
+import threading
+import time
 from config.config import Config
+from utils.chunking import count_tokens
+from utils.llm import CircuitOpenError, get_llm
+from utils.metrics import LLMUsageStats, log_stream_latency
+from utils.sessions import make_session_store, new_interview
+from utils.sse import format_sse, sse_response
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
 soap_bp = Blueprint("soap", __name__)
+logger = logging.getLogger(__name__)
 
 INITIAL_PROMPT = """You are a medical professional conducting a patient interview to gather information for SOAP notes.
 Your role is to ask one clear, focused question at a time to gather comprehensive information about the patient's condition.
@@ -83,8 +91,269 @@ Format the response exactly as follows:
   - [Key points for patient education]
   - [Lifestyle modifications if applicable]"""
 
-# Store active chat sessions
-active_sessions = {}
+HISTORY_SUMMARY_PROMPT = """Summarize the patient interview below for the interviewer who will continue it.
+Use exactly these headings, in the language of the interview, and write "Unknown" where nothing has been said yet:
+
+Language of the interview:
+Chief complaint:
+Onset and duration:
+Severity and frequency:
+Associated symptoms:
+Past medical history:
+Medications:
+Family history:
+Social history:
+Review of systems:
+Questions already asked:
+
+Be brief and factual. Do not add anything the patient did not say.
+
+{transcript}"""
+
+# Marks the turn that holds the summary of compacted interview history
+HISTORY_SUMMARY_HEADER = "Summary of the interview so far:"
+
+SOAP_NOTES_HEADER = "# SOAP Notes"
+
+# Token counts and latency of interview turns, by stage
+interview_usage = LLMUsageStats()
+
+# Active interviews, keyed by session id
+_session_store = None
+_session_store_lock = threading.Lock()
+
+# Background SOAP draft refreshes running in this process, by session id
+_draft_pool = None
+_draft_refreshes = {}
+_draft_lock = threading.Lock()
+
+
+def get_session_store():
+    """Return the interview session store, creating it on first use."""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = make_session_store(
+                Config.SOAP_SESSION_BACKEND,
+                max_entries=Config.SOAP_SESSION_MAX_ENTRIES,
+                ttl=Config.SOAP_SESSION_TTL,
+            )
+        return _session_store
+
+
+def history_tokens(history):
+    """Estimate the tokens in history, to check it against its budget."""
+    return sum(count_tokens(part) for turn in history for part in turn["parts"])
+
+
+def send_chat_message(llm, history, message, stage):
+    """Send the next message of an interview and record both turns."""
+    start = time.perf_counter()
+    reply, usage = llm.chat(history, message, system_instruction=INITIAL_PROMPT)
+    elapsed = time.perf_counter() - start
+
+    input_tokens, output_tokens = usage["input_tokens"], usage["output_tokens"]
+    interview_usage.record(stage, input_tokens, output_tokens, elapsed)
+    logger.info(
+        f"Interview {stage}: {input_tokens} input tokens, "
+        f"{output_tokens} output tokens, {elapsed * 1000:.0f} ms"
+    )
+
+    history.append({"role": "user", "parts": [message]})
+    history.append({"role": "model", "parts": [reply]})
+    return reply
+
+
+def compact_history(llm, history):
+    """Fold older turns into a summary once the history passes its token budget.
+
+    The last SOAP_HISTORY_KEEP_TURNS question/answer pairs are kept word for
+    word. Everything before them, including any earlier summary, becomes a
+    single summary turn, so the prompt stops growing with every answer. To
+    avoid a summary call on every answer, at least as many pairs as are kept
+    must have accumulated since the last summary. Returns the history to
+    continue with.
+    """
+    keep = 2 * Config.SOAP_HISTORY_KEEP_TURNS
+    summarized = history and history[0]["parts"][0].startswith(HISTORY_SUMMARY_HEADER)
+    verbatim = len(history) - 2 if summarized else len(history)
+    if verbatim < 2 * keep:
+        return history
+    tokens = history_tokens(history)
+    if tokens <= Config.SOAP_HISTORY_TOKEN_BUDGET:
+        return history
+
+    older, recent = history[:-keep], history[-keep:]
+    lines = []
+    for turn in older:
+        text = turn["parts"][0]
+        if text.startswith(HISTORY_SUMMARY_HEADER):
+            lines.append(text)
+        elif turn["role"] == "user":
+            lines.append(f"Patient: {text}")
+        else:
+            lines.append(f"Interviewer: {text}")
+    prompt = HISTORY_SUMMARY_PROMPT.format(transcript="\n".join(lines))
+
+    start = time.perf_counter()
+    summary, usage = llm.generate_with_usage(prompt)
+    summary = summary.strip()
+    elapsed = time.perf_counter() - start
+    interview_usage.record(
+        "compact", usage["input_tokens"], usage["output_tokens"], elapsed
+    )
+
+    compacted = [
+        {"role": "user", "parts": [f"{HISTORY_SUMMARY_HEADER}\n{summary}"]},
+        {"role": "model", "parts": ["Understood. I will continue the interview."]},
+    ] + recent
+    logger.info(
+        f"Compacted interview history from {tokens} to "
+        f"{history_tokens(compacted)} tokens in {elapsed * 1000:.0f} ms"
+    )
+    return compacted
+
+
+def format_interview_history(interview_history):
+    return "\n".join([f"Q: {q}\nA: {a}" for q, a in interview_history])
+
+
+def soap_prompt(interview_history):
+    return SOAP_GENERATION_PROMPT.format(
+        interview_history=format_interview_history(interview_history)
+    )
+
+
+def clean_soap_notes(response):
+    # Clean up the response to ensure it starts with the header
+    notes = response.strip()
+    if not notes.startswith(SOAP_NOTES_HEADER):
+        notes = f"{SOAP_NOTES_HEADER}\n\n" + notes
+    return notes
+
+
+def write_soap_notes(interview_history):
+    """Generate SOAP notes for [question, answer] pairs in one call."""
+    return clean_soap_notes(get_llm().generate(soap_prompt(interview_history)))
+
+
+def current_draft(interview):
+    """Return the interview's draft if it covers the whole transcript."""
+    if interview["draft"] and interview["draft_turns"] == len(interview["transcript"]):
+        return interview["draft"]
+    return None
+
+
+def update_draft(app, session_id):
+    """Redraft a session's SOAP notes until the draft covers every answer.
+
+    Runs in the draft pool. Answers that arrive while a draft is being
+    written are picked up by another pass rather than another task. Drafts
+    only use LLM capacity interactive calls leave spare; when there is none
+    the draft is skipped and generate writes the notes itself.
+    """
+    with app.app_context():
+        store = get_session_store()
+        while True:
+            try:
+                interview = store.get(session_id)
+                if interview and interview["transcript"] and not current_draft(
+                    interview
+                ):
+                    transcript = interview["transcript"]
+                    start = time.perf_counter()
+                    response = get_llm().try_generate(
+                        soap_prompt(transcript), reserve=Config.SOAP_DRAFT_RESERVE
+                    )
+                    if response is None:
+                        logger.info("Skipped a SOAP draft: the LLM is busy")
+                        with _draft_lock:
+                            _draft_refreshes.pop(session_id, None)
+                        return
+                    notes = clean_soap_notes(response)
+                    store.save_draft(session_id, notes, len(transcript))
+                    logger.info(
+                        f"Drafted SOAP notes for {len(transcript)} answers in "
+                        f"{time.perf_counter() - start:.2f}s"
+                    )
+            except Exception as e:
+                logger.warning(f"Failed to draft SOAP notes: {str(e)}")
+                with _draft_lock:
+                    _draft_refreshes.pop(session_id, None)
+                return
+            with _draft_lock:
+                refresh = _draft_refreshes[session_id]
+                if not refresh["again"]:
+                    del _draft_refreshes[session_id]
+                    return
+                refresh["again"] = False
+
+
+def refresh_draft(session_id):
+    """Bring a session's SOAP draft up to date in the background."""
+    global _draft_pool
+    with _draft_lock:
+        refresh = _draft_refreshes.get(session_id)
+        if refresh:
+            refresh["again"] = True
+            return
+        if _draft_pool is None:
+            _draft_pool = ThreadPoolExecutor(
+                max_workers=Config.SOAP_DRAFT_WORKERS, thread_name_prefix="soap-draft"
+            )
+        refresh = _draft_refreshes[session_id] = {"again": False}
+        refresh["future"] = _draft_pool.submit(
+            update_draft, current_app._get_current_object(), session_id
+        )
+
+
+def wait_for_draft(session_id, timeout):
+    """Wait for a draft refresh of the session running in this process."""
+    with _draft_lock:
+        refresh = _draft_refreshes.get(session_id)
+    if refresh:
+        try:
+            refresh["future"].result(timeout=timeout)
+        except TimeoutError:
+            pass
+
+
+def load_interview_history(data):
+    """Return the [question, answer] pairs to write SOAP notes from.
+
+    Requests name an interview by session_id, or send the pairs themselves
+    as interview_history. Returns (interview_history, session_id, error).
+    """
+    session_id = data.get("session_id")
+    if session_id:
+        interview = get_session_store().get(session_id)
+        if interview and interview["transcript"]:
+            return interview["transcript"], session_id, None
+        if interview is None and not data.get("interview_history"):
+            return None, None, "Invalid or expired session"
+    interview_history = data.get("interview_history", [])
+    if not interview_history:
+        return None, None, "Interview history is required"
+    return interview_history, None, None
+
+
+def ensure_soap_header(chunks):
+    """Stream SOAP notes text, prefixing the header if the model left it out."""
+    pending = ""
+    for chunk in chunks:
+        if pending is None:
+            yield chunk
+            continue
+        # Hold text back until there is enough to check for the header
+        pending += chunk
+        if len(pending.lstrip()) < len(SOAP_NOTES_HEADER):
+            continue
+        notes, pending = pending.lstrip(), None
+        if not notes.startswith(SOAP_NOTES_HEADER):
+            notes = f"{SOAP_NOTES_HEADER}\n\n" + notes
+        yield notes
+    if pending is not None:
+        yield f"{SOAP_NOTES_HEADER}\n\n" + pending.lstrip()
 
 
 @soap_bp.route("/api/soap/start", methods=["POST"])
@@ -96,25 +365,26 @@ def start_interview():
         return jsonify({"error": "Initial description is required"}), 400
 
     try:
-        # Configure Gemini
-        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
-        # Get or create chat session
-        chat = model.start_chat()
-        # Initialize with prompt and get first question
-        chat.send_message(INITIAL_PROMPT)
-        response = chat.send_message(
-            f"Patient's initial description: {initial_description}"
+        llm = get_llm()
+        history = []
+
+        # The interview instructions go in the system instruction, so the
+        # first turn is the patient's description
+        question = send_chat_message(
+            llm,
+            history,
+            f"Patient's initial description: {initial_description}",
+            "start",
         )
 
-        # Store the chat session
-        session_id = str(chat)
-        active_sessions[session_id] = chat
+        # Store the conversation
+        session_id = get_session_store().create(new_interview(history, question))
 
-        return jsonify({"question": response.text, "session_id": session_id})
-    except Exception as e:
-        print(f"Error starting interview: {str(e)}")
+        return jsonify({"question": question, "session_id": session_id})
+    except CircuitOpenError:
+        return jsonify({"error": "Interview service is temporarily unavailable"}), 503
+    except Exception:
+        logger.exception("Error starting interview")
         return jsonify({"error": "Failed to start interview"}), 500
 
 
@@ -128,46 +398,113 @@ def submit_answer():
         return jsonify({"error": "Answer and session ID are required"}), 400
 
     try:
-        # Get the existing chat session
-        chat = active_sessions.get(session_id)
-        if not chat:
+        # Get the existing conversation
+        store = get_session_store()
+        interview = store.get(session_id)
+        if interview is None:
             return jsonify({"error": "Invalid or expired session"}), 400
 
         # Get next question
-        response = chat.send_message(answer)
+        llm = get_llm()
+        try:
+            history = compact_history(llm, interview["history"])
+        except Exception as e:
+            # The interview can go on with the whole history
+            logger.error(f"Failed to compact interview history: {str(e)}")
+            history = interview["history"]
+        question = send_chat_message(llm, history, answer, "answer")
+        interview["history"] = history
+        interview["transcript"].append([interview["question"], answer])
+        interview["question"] = question
+        if not store.save(session_id, interview):
+            return jsonify({"error": "Invalid or expired session"}), 400
+
+        if Config.SOAP_DRAFTS:
+            refresh_draft(session_id)
 
-        return jsonify({"question": response.text})
-    except Exception as e:
-        print(f"Error processing answer: {str(e)}")
+        return jsonify({"question": question})
+    except CircuitOpenError:
+        return jsonify({"error": "Interview service is temporarily unavailable"}), 503
+    except Exception:
+        logger.exception("Error processing answer")
         return jsonify({"error": "Failed to process answer"}), 500
 
 
+@soap_bp.route("/api/soap/stats", methods=["GET"])
+def get_interview_stats():
+    return jsonify(interview_usage.stats())
+
+
 @soap_bp.route("/api/soap/generate", methods=["POST"])
 def generate_soap():
     data = request.get_json()
-    interview_history = data.get("interview_history", [])
-
-    if not interview_history:
-        return jsonify({"error": "Interview history is required"}), 400
+    interview_history, session_id, error = load_interview_history(data)
+    if error:
+        return jsonify({"error": error}), 400
 
     try:
-        # Format interview history
-        formatted_history = "\n".join([f"Q: {q}\nA: {a}" for q, a in interview_history])
+        if session_id:
+            # Use the background draft, waiting for it if one is being written
+            store = get_session_store()
+            wait_for_draft(session_id, Config.SOAP_DRAFT_WAIT)
+            interview = store.get(session_id)
+            notes = interview and current_draft(interview)
+            if notes:
+                return jsonify({"soap_notes": notes})
+
+        notes = write_soap_notes(interview_history)
+        if session_id:
+            store.save_draft(session_id, notes, len(interview_history))
 
-        # Configure Gemini
-        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        return jsonify({"soap_notes": notes})
+    except CircuitOpenError:
+        return jsonify({"error": "SOAP generation is temporarily unavailable"}), 503
+    except Exception:
+        logger.exception("Error generating SOAP notes")
+        return jsonify({"error": "Failed to generate SOAP notes"}), 500
 
-        # Generate SOAP notes
-        prompt = SOAP_GENERATION_PROMPT.format(interview_history=formatted_history)
-        response = model.generate_content(prompt)
 
-        # Clean up the response to ensure it starts with the header
-        notes = response.text.strip()
-        if not notes.startswith("# SOAP Notes"):
-            notes = "# SOAP Notes\n\n" + notes
+@soap_bp.route("/api/soap/generate/stream", methods=["POST"])
+def stream_soap():
+    """Like generate_soap, but stream the notes as server-sent events.
 
-        return jsonify({"soap_notes": notes})
-    except Exception as e:
-        print(f"Error generating SOAP notes: {str(e)}")
-        return jsonify({"error": "Failed to generate SOAP notes"}), 500
+    Events: "token" for each chunk of notes text, then "done" with the full
+    notes, or "error" if generation failed.
+    """
+    data = request.get_json()
+    interview_history, session_id, error = load_interview_history(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    prompt = soap_prompt(interview_history)
+
+    def generate():
+        try:
+            if session_id:
+                # A draft that is already up to date is sent in one event
+                interview = get_session_store().get(session_id)
+                notes = interview and current_draft(interview)
+                if notes:
+                    yield format_sse({"text": notes}, "token")
+                    yield format_sse({"soap_notes": notes}, "done")
+                    return
+
+            chunks = (chunk for chunk in get_llm().generate_stream(prompt) if chunk)
+            notes = []
+            for chunk in ensure_soap_header(
+                log_stream_latency(chunks, "generate_soap stream")
+            ):
+                notes.append(chunk)
+                yield format_sse({"text": chunk}, "token")
+
+            notes = "".join(notes).strip()
+            if session_id:
+                get_session_store().save_draft(
+                    session_id, notes, len(interview_history)
+                )
+            yield format_sse({"soap_notes": notes}, "done")
+        except Exception:
+            logger.exception("Error generating SOAP notes")
+            yield format_sse({"error": "Failed to generate SOAP notes"}, "error")
+
+    return sse_response(generate())
@@ -0,0 +1,53 @@
+import os
+
+# Read by config at import: never call Gemini from the tests
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+import pytest
+
+from config.config import Config
+from models.models import db, SavedReport, User
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """The app on a scratch database, with its files in a scratch folder."""
+    from app import INSTANCE_FILES, create_app
+
+    directory = tmp_path_factory.mktemp("instance")
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{directory / 'health_portal.db'}"
+    for name, filename in INSTANCE_FILES.items():
+        setattr(Config, name, str(directory / filename))
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db_session(app):
+    """A database session; the users and reports made with it are removed."""
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+        # Through the ORM, so the search index is kept in step
+        for report in SavedReport.query.all():
+            db.session.delete(report)
+        User.query.delete()
+        db.session.commit()
+
+
+@pytest.fixture
+def make_user(db_session):
+    def make_user(email="patient@example.com"):
+        user = User(email=email, name="Patient")
+        user.set_password("password")
+        db_session.add(user)
+        db_session.commit()
+        return user
+
+    return make_user
@@ -0,0 +1,88 @@
+import json
+
+from config.config import Config
+from utils.reference_data import get_reference_data
+
+
+def ndjson(lines):
+    return "".join(line + "\n" for line in lines)
+
+
+def read_ndjson(response):
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def expected(app, medications):
+    with app.app_context():
+        return get_reference_data().interaction_index.find(medications)
+
+
+def test_json_results_per_list(app, client):
+    lists = [["1", "3"], {"id": "patient-a", "medications": ["2", "3", "1"]}, []]
+    response = client.post("/api/check-interactions/bulk", json={"lists": lists})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["id"] for r in results] == [0, "patient-a", 2]
+    assert results[0]["interactions"] == expected(app, ["1", "3"])
+    assert results[1]["interactions"] == expected(app, ["2", "3", "1"])
+    assert results[1]["summary"]["total"] == len(results[1]["interactions"])
+    assert results[2]["interactions"] == []
+    assert response.get_json()["stats"]["lists"] == 3
+
+
+def test_json_rejects_bad_lists(client):
+    response = client.post("/api/check-interactions/bulk", json={"lists": [[1, 2]]})
+    assert response.status_code == 400
+    response = client.post("/api/check-interactions/bulk", json={})
+    assert response.status_code == 400
+
+
+def test_json_limits_lists(client, monkeypatch):
+    monkeypatch.setattr(Config, "BULK_INTERACTION_MAX_LISTS", 2)
+    response = client.post(
+        "/api/check-interactions/bulk", json={"lists": [["1"], ["2"], ["3"]]}
+    )
+    assert response.status_code == 413
+
+
+def test_ndjson_stream_across_batches(app, client, monkeypatch):
+    monkeypatch.setattr(Config, "BULK_INTERACTION_BATCH", 2)
+    lists = [["1", "3"], ["2", "3"], ["1", "2", "3"], ["4"], ["5", "1"]]
+    body = ndjson(
+        [
+            json.dumps(lists[0]),
+            json.dumps({"id": "b", "medications": lists[1]}),
+            "",
+            json.dumps(lists[2]),
+            json.dumps(lists[3]),
+            json.dumps(lists[4]),
+        ]
+    )
+    response = client.post(
+        "/api/check-interactions/bulk",
+        data=body,
+        content_type="application/x-ndjson",
+    )
+    assert response.status_code == 200
+    *results, stats = read_ndjson(response)
+    assert [r["id"] for r in results] == [0, "b", 2, 3, 4]
+    for result, medications in zip(results, lists):
+        assert result["interactions"] == expected(app, medications)
+    assert stats["stats"]["lists"] == 5
+
+
+def test_ndjson_reports_bad_lines(client):
+    body = ndjson(['["1", "3"]', "not json", '{"medications": "3"}', '["2", "3"]'])
+    response = client.post(
+        "/api/check-interactions/bulk",
+        data=body,
+        content_type="application/x-ndjson",
+    )
+    lines = read_ndjson(response)
+    errors = [line for line in lines if "error" in line]
+    results = [line for line in lines if "interactions" in line]
+    assert [error["line"] for error in errors] == [2, 3]
+    # Lists are numbered by the lists read, not the lines
+    assert [result["id"] for result in results] == [0, 1]
+    assert lines[-1]["stats"]["lists"] == 2
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select, text
+
+from models.types import (
+    MAGIC,
+    STORED,
+    ZLIB_V1,
+    CompressedText,
+    compress_text,
+    decompress_text,
+)
+
+REPORT = "## Subjective\n- **Chief Complaint (CC):** Headache for three days.\n"
+
+# REPORT as compress_text wrote it when the format was introduced. Stored
+# rows must keep decoding, whatever the code that writes them turns into.
+STORED_REPORT = bytes.fromhex(
+    "004d5a0178bb72aceeae233e9e3d60a531a8b02fc9284a4d05171c7a5c00c0e1151c"
+)
+
+
+def test_compressed_format():
+    value = compress_text(REPORT)
+    assert value[: len(MAGIC)] == MAGIC
+    assert value[len(MAGIC)] == ZLIB_V1
+    assert len(value) < len(REPORT.encode("utf-8"))
+    assert decompress_text(value) == REPORT
+
+
+def test_decodes_the_original_format():
+    assert decompress_text(STORED_REPORT) == REPORT
+
+
+@pytest.mark.parametrize("text_", ["", "x", "Ωμέγα ✓", "a9f3Kq"])
+def test_text_that_does_not_shrink_is_stored(text_):
+    value = compress_text(text_)
+    assert value == MAGIC + bytes([STORED]) + text_.encode("utf-8")
+    assert decompress_text(value) == text_
+
+
+@pytest.mark.parametrize("legacy", ["Plain report", b"Plain report"])
+def test_reads_text_written_before_compression(legacy):
+    assert decompress_text(legacy) == "Plain report"
+
+
+def test_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        decompress_text(MAGIC + bytes([99]) + b"payload")
+
+
+def test_column_round_trip(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reports.db'}")
+    metadata = MetaData()
+    reports = Table(
+        "reports",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("content", CompressedText),
+    )
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(reports.insert(), [{"id": 1, "content": REPORT}])
+        # A row written while the column still held plain text
+        connection.execute(
+            text("INSERT INTO reports VALUES (2, 'Legacy report')")
+        )
+        connection.execute(reports.insert(), [{"id": 3, "content": None}])
+    with engine.connect() as connection:
+        raw = connection.execute(text("SELECT content FROM reports WHERE id = 1"))
+        assert raw.scalar().startswith(MAGIC)
+        contents = connection.execute(
+            select(reports.c.content).order_by(reports.c.id)
+        ).scalars()
+        assert list(contents) == [REPORT, "Legacy report", None]
+    engine.dispose()
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from utils import interactions as interactions_module
+from utils.interactions import InteractionIndex, pair_key
+
+SEVERITIES = ("low", "moderate", "high")
+
+
+def synthetic_interactions(pair_count, medication_count, seed):
+    rng = random.Random(seed)
+    seen = set()
+    interactions = []
+    while len(interactions) < pair_count:
+        medication1 = str(int(medication_count * rng.random() ** 2))
+        medication2 = str(rng.randrange(medication_count))
+        key = pair_key(medication1, medication2)
+        if medication1 == medication2 or key in seen:
+            continue
+        seen.add(key)
+        # Pairs in either order, as the source data has them
+        if rng.random() < 0.5:
+            key = key[::-1]
+        interactions.append(
+            {
+                "medication1": key[0],
+                "medication2": key[1],
+                "severity": rng.choice(SEVERITIES),
+                "description": f"Interaction {len(interactions)}",
+            }
+        )
+    return interactions
+
+
+def linear_scan(interactions, selected):
+    """The lookup check_interactions made before the index."""
+    selected = set(selected)
+    return [
+        interaction
+        for interaction in interactions
+        if interaction["medication1"] in selected
+        and interaction["medication2"] in selected
+    ]
+
+
+@pytest.fixture(scope="module")
+def interactions():
+    data = synthetic_interactions(3000, 300, seed=0)
+    # A pair listed twice and a medication interacting with itself
+    data.append({**data[0], "description": "Listed again"})
+    data.append({"medication1": "7", "medication2": "7", "severity": "low"})
+    return data
+
+
+def selections(count, seed):
+    rng = random.Random(seed)
+    medications = [str(i) for i in range(320)]
+    return [
+        rng.sample(medications[:30], 2) + rng.sample(medications, rng.randint(0, 20))
+        for _ in range(count)
+    ]
+
+
+def test_find_matches_linear_scan(interactions):
+    index = InteractionIndex.build(interactions)
+    for selected in selections(300, seed=1):
+        assert index.find(selected) == linear_scan(interactions, selected)
+
+
+def test_find_edge_cases(interactions):
+    index = InteractionIndex.build(interactions)
+    assert index.find([]) == []
+    assert index.find(["unknown", "also unknown"]) == []
+    assert index.find(["7"]) == linear_scan(interactions, ["7"])
+    first = interactions[0]
+    pair = [first["medication1"], first["medication2"]]
+    assert index.find(pair + pair) == linear_scan(interactions, pair)
+    assert index.find(pair + [3, None]) == linear_scan(interactions, pair)
+
+
+def test_find_many_matches_find(interactions):
+    index = InteractionIndex.build(interactions)
+    lists = selections(300, seed=2) + [[], ["unknown"], ["7"]]
+    assert index.find_many(lists) == [index.find(ids) for ids in lists]
+
+
+def test_find_many_in_small_batches(interactions, monkeypatch):
+    # Split every group of same-sized lists over several NumPy lookups
+    monkeypatch.setattr(interactions_module, "BATCH_PAIRS", 50)
+    index = InteractionIndex.build(interactions)
+    lists = selections(200, seed=3)
+    assert index.find_many(lists) == [linear_scan(interactions, ids) for ids in lists]
+
+
+def test_empty_index():
+    index = InteractionIndex.build([])
+    assert index.find(["1", "2"]) == []
+    assert index.find_many([["1", "2"], []]) == [[], []]
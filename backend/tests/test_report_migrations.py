@@ -0,0 +1,115 @@
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+
+from app import MIGRATIONS_DIR
+from models.models import db
+from models.types import MAGIC, compress_text
+from utils.report_search import CREATE_TABLE
+
+REPORTS = [
+    (1, 1, "Chest pain", "Troponin was **normal**.\n", "soap"),
+    (2, 1, "Lab report", "## Findings\n- Potassium low\n" * 20, "analysis"),
+    (3, 2, "Visit", "Café visit, ✓ follow-up.", "soap"),
+]
+
+
+def migrate(engine, revision, direction):
+    """Run one migration's upgrade or downgrade on engine."""
+    module = ScriptDirectory(MIGRATIONS_DIR).get_revision(revision).module
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            getattr(module, direction)()
+
+
+def head_database(path):
+    """A database at the latest migration holding REPORTS."""
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(CREATE_TABLE))
+        for id, user_id, title, content, report_type in REPORTS:
+            row = {
+                "id": id,
+                "user_id": user_id,
+                "title": title,
+                "content": compress_text(content),
+                "report_type": report_type,
+            }
+            connection.execute(
+                text(
+                    "INSERT INTO saved_report "
+                    "(id, user_id, title, content, report_type, created_at) "
+                    "VALUES (:id, :user_id, :title, :content, :report_type, "
+                    "'2026-01-01 00:00:00')"
+                ),
+                row,
+            )
+            connection.execute(
+                text(
+                    "INSERT INTO saved_report_fts "
+                    "(rowid, title, content, user_id, report_type) "
+                    "VALUES (:id, :title, :content, :user_id, :report_type)"
+                ),
+                {**row, "content": content, "user_id": str(user_id)},
+            )
+    return engine
+
+
+def contents(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT content FROM saved_report ORDER BY id")
+        ).scalars().all()
+
+
+def matches(engine, query):
+    with engine.connect() as connection:
+        return connection.execute(
+            text(
+                "SELECT rowid FROM saved_report_fts "
+                "WHERE saved_report_fts MATCH :query ORDER BY rowid"
+            ),
+            {"query": query},
+        ).scalars().all()
+
+
+def index_sql(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE name = 'saved_report_fts'")
+        ).scalar()
+
+
+def test_compression_round_trip(tmp_path):
+    engine = head_database(tmp_path / "reports.db")
+    migrate(engine, "d81f6a2c9e47", "downgrade")
+    migrate(engine, "b3d47c9e5a21", "downgrade")
+    assert contents(engine) == [content for _, _, _, content, _ in REPORTS]
+
+    migrate(engine, "b3d47c9e5a21", "upgrade")
+    stored = contents(engine)
+    assert all(value.startswith(MAGIC) for value in stored)
+    assert stored == [compress_text(content) for _, _, _, content, _ in REPORTS]
+    engine.dispose()
+
+
+def test_search_index_round_trip(tmp_path):
+    engine = head_database(tmp_path / "reports.db")
+    migrate(engine, "d81f6a2c9e47", "downgrade")
+    assert "content=''" not in index_sql(engine)
+    # The index built from the decoded reports, not the stored bytes
+    assert matches(engine, "potassium") == [2]
+    assert matches(engine, "cafe") == [3]
+    with engine.connect() as connection:
+        indexed = connection.execute(
+            text("SELECT content FROM saved_report_fts WHERE rowid = 1")
+        ).scalar()
+    assert indexed == REPORTS[0][3]
+
+    migrate(engine, "d81f6a2c9e47", "upgrade")
+    assert "content=''" in index_sql(engine)
+    assert matches(engine, "troponin") == [1]
+    assert matches(engine, 'user_id:"1" AND (potassium OR troponin)') == [1, 2]
+    engine.dispose()
@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import text
+
+from models.models import SavedReport
+from utils import report_search
+from utils.report_search import query_terms, rebuild_index, search_reports, snippet
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+def save(db_session, user, title, content, report_type="soap"):
+    report = SavedReport(
+        user_id=user.id, title=title, content=content, report_type=report_type
+    )
+    db_session.add(report)
+    db_session.commit()
+    return report
+
+
+def found(user, query, report_type=None):
+    return [result["id"] for result in search_reports(user.id, query, report_type)]
+
+
+def test_index_is_contentless(db_session):
+    sql = db_session.execute(
+        text("SELECT sql FROM sqlite_master WHERE name = :name"),
+        {"name": report_search.TABLE},
+    ).scalar()
+    assert "content=''" in sql
+
+
+def test_insert_is_searchable(db_session, user):
+    report = save(db_session, user, "Chest pain", "Troponin was normal.")
+    assert found(user, "troponin") == [report.id]
+    assert found(user, "chest") == [report.id]
+    assert found(user, "trop*") == [report.id]
+    assert found(user, "trop") == []
+    [result] = search_reports(user.id, "troponin")
+    assert result["title"] == "Chest pain"
+    assert result["snippet"] == "**Troponin** was normal"
+
+
+def test_update_replaces_indexed_text(db_session, user):
+    report = save(db_session, user, "Chest pain", "Troponin was normal.")
+    report.content = "Started on aspirin."
+    report.title = "Follow-up"
+    db_session.commit()
+    assert found(user, "troponin") == []
+    assert found(user, "chest") == []
+    assert found(user, "aspirin") == [report.id]
+    assert found(user, "follow") == [report.id]
+
+    # A second update removes what the first indexed
+    report.content = "Switched to clopidogrel."
+    db_session.commit()
+    assert found(user, "aspirin") == []
+    assert found(user, "clopidogrel") == [report.id]
+
+
+def test_delete_removes_from_index(db_session, user):
+    kept = save(db_session, user, "Kept", "Warfarin dose unchanged.")
+    deleted = save(db_session, user, "Deleted", "Warfarin dose raised.")
+    db_session.delete(deleted)
+    db_session.commit()
+    assert found(user, "warfarin") == [kept.id]
+    assert found(user, "raised") == []
+
+
+def test_search_is_scoped_to_user_and_type(db_session, user, make_user):
+    other = make_user("other@example.com")
+    soap = save(db_session, user, "Visit", "Metformin started.")
+    analysis = save(db_session, user, "Lab report", "Metformin level.", "analysis")
+    save(db_session, other, "Visit", "Metformin started.")
+    assert sorted(found(user, "metformin")) == sorted([soap.id, analysis.id])
+    assert found(user, "metformin", "analysis") == [analysis.id]
+
+
+def test_title_matches_rank_first(db_session, user):
+    in_content = save(db_session, user, "Visit", "Asthma reviewed, inhaler use.")
+    in_title = save(db_session, user, "Asthma", "Inhaler use reviewed.")
+    assert found(user, "asthma") == [in_title.id, in_content.id]
+
+
+def test_rebuild_index(db_session, user):
+    report = save(db_session, user, "Visit", "Lisinopril continued.")
+    # Written behind the ORM's back, so the index does not know
+    db_session.execute(
+        text("UPDATE saved_report SET title = 'Renamed' WHERE id = :id"),
+        {"id": report.id},
+    )
+    db_session.commit()
+    assert found(user, "renamed") == []
+    rebuild_index()
+    assert found(user, "renamed") == [report.id]
+    assert found(user, "lisinopril") == [report.id]
+
+
+def test_search_endpoint(client, db_session, user):
+    report = save(db_session, user, "Visit", "Amoxicillin for ten days.")
+    with client.session_transaction() as session:
+        session["user_id"] = user.id
+    response = client.get("/api/reports/search?q=amoxicillin")
+    assert response.status_code == 200
+    assert [r["id"] for r in response.get_json()["results"]] == [report.id]
+
+
+def test_snippet_marks_matches_in_a_window():
+    text_ = " ".join(f"w{i}" for i in range(40)) + " chest pain " + "w " * 40
+    result = snippet(text_, query_terms("pain chest"), words=8)
+    assert result.startswith("…") and result.endswith("…")
+    assert "**chest** **pain**" in result
+    assert len(result.strip("…").split()) == 8
+
+
+def test_snippet_folds_case_and_accents():
+    result = snippet("Seen at the Café.", query_terms("cafe"))
+    assert result == "Seen at the **Café**"
+
+
+def test_snippet_without_a_match_gives_the_start():
+    result = snippet("One two three four", query_terms("title"), words=2)
+    assert result == "One two…"
+
+
+def test_snippet_drops_the_reports_own_bold():
+    result = snippet("- **Medications:** ibuprofen", query_terms("ibuprofen"))
+    assert result == "Medications: **ibuprofen**"
@@ -0,0 +1,229 @@
+import os
+import sqlite3
+import threading
+import time
+
+from cachetools import LRUCache, TTLCache
+
+from utils.files import touch_private_file
+
+# Bump when the DiskCache tables change; older cache files are rebuilt
+SCHEMA_VERSION = 2
+
+
+def _hit_rate(hits, misses):
+    lookups = hits + misses
+    return hits / lookups if lookups else 0.0
+
+
+class MemoryCache:
+    """An in-process LRU cache of text values with an optional TTL."""
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        if ttl:
+            self._data = TTLCache(maxsize=max_entries, ttl=ttl)
+        else:
+            self._data = LRUCache(maxsize=max_entries)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": _hit_rate(self._hits, self._misses),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = 0
+
+
+class DiskCache:
+    """A bounded LRU cache of text values stored in a SQLite file.
+
+    Entries are evicted least recently used first once the cache holds more
+    than max_bytes or max_entries, and expire ttl seconds after they were
+    stored. Several worker processes can share one cache file: SQLite
+    serialises writers, WAL mode lets readers run alongside a writer, and
+    every thread gets its own connection. Hit and miss counters live in the
+    same file so they add up across workers. The file is readable by this
+    user only.
+    """
+
+    def __init__(self, path, max_bytes=None, max_entries=None, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        touch_private_file(path)
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection must not be reused across a fork
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS entries")
+            conn.execute("DROP TABLE IF EXISTS counters")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO counters
+            VALUES ('hits', 0), ('misses', 0), ('evictions', 0), ('expirations', 0);
+            """
+        )
+
+    def _bump(self, conn, name, amount=1):
+        conn.execute(
+            "UPDATE counters SET value = value + ? WHERE name = ?", (amount, name)
+        )
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None and self.ttl and row[1] + self.ttl < now:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._bump(conn, "expirations")
+            row = None
+        if row is None:
+            self._bump(conn, "misses")
+            return None
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self._bump(conn, "hits")
+        return row[0]
+
+    def set(self, key, value):
+        """Store value under key, evicting least recently used entries."""
+        size = len(value.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        if self.ttl:
+            expired = conn.execute(
+                "DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            if expired:
+                self._bump(conn, "expirations", expired)
+
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+
+        def over_limit():
+            return (self.max_bytes and total > self.max_bytes) or (
+                self.max_entries and count > self.max_entries
+            )
+
+        if not over_limit():
+            return
+        victims = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at"
+        ):
+            victims.append((key,))
+            count -= 1
+            total -= size
+            if not over_limit():
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._bump(conn, "evictions", len(victims))
+
+    def stats(self):
+        """Return entry count, size and hit/miss counters."""
+        conn = self._connect()
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            **counters,
+            "hit_rate": _hit_rate(counters["hits"], counters["misses"]),
+        }
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM entries")
+        conn.execute("UPDATE counters SET value = 0")
+
+
+def make_cache(backend, path=None, max_bytes=None, max_entries=None, ttl=None):
+    """Build a cache for the configured backend name, or None for "none"."""
+    if backend == "memory":
+        return MemoryCache(max_entries or 1024, ttl=ttl)
+    if backend == "sqlite":
+        return DiskCache(path, max_bytes=max_bytes, max_entries=max_entries, ttl=ttl)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,47 @@
+import functools
+import logging
+
+import tiktoken
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+# Gemini's tokenizer is not public; cl100k_base is a close enough estimate
+ENCODING_NAME = "cl100k_base"
+# Rough characters per token, used when the encoding cannot be loaded
+CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding():
+    """Return the tiktoken encoding, or None if it cannot be loaded.
+
+    tiktoken downloads encodings on first use, which fails on hosts without
+    outbound network access.
+    """
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        logger.warning(f"Falling back to estimated token counts: {str(e)}")
+        return None
+
+
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_text(text, chunk_tokens, overlap_tokens):
+    """Split text into chunks of at most chunk_tokens tokens.
+
+    Splits prefer paragraph, then line, then word boundaries, and
+    neighbouring chunks share overlap_tokens tokens of context.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_tokens,
+        chunk_overlap=overlap_tokens,
+        length_function=count_tokens,
+    )
+    return splitter.split_text(text)
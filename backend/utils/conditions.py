@@ -0,0 +1,162 @@
+import numpy as np
+
+# Scoring methods accepted by ConditionRanker
+METHODS = ("tfidf", "jaccard")
+
+
+def condition_arrays(conditions, symptoms):
+    """Compile conditions into the arrays a ConditionRanker reads.
+
+    Symptoms are numbered by their position in symptoms and conditions by
+    theirs in conditions:
+
+    symptom_ids: the id of each symptom
+    sorted_symptom_ids, sorted_symptom_columns: the ids sorted, with their
+        numbers, to look symptoms up by id
+    presence: symptom x condition, 1 where the condition has the symptom
+    weighted: presence IDF-weighted, each condition's vector of unit length
+    idf: the IDF weight of each symptom
+    sizes: the number of symptoms of each condition
+    """
+    columns = {symptom["id"]: i for i, symptom in enumerate(symptoms)}
+    presence = np.zeros((len(conditions), len(symptoms)), dtype=np.float32)
+    for row, condition in enumerate(conditions):
+        for symptom_id in condition["symptoms"]:
+            presence[row, columns[symptom_id]] = 1
+
+    # Smoothed IDF, as in scikit-learn's TfidfTransformer
+    frequency = presence.sum(axis=0)
+    idf = np.log((1 + len(conditions)) / (1 + frequency)) + 1
+    weighted = presence * idf
+    norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+    weighted /= np.maximum(norms, 1e-12)
+
+    symptom_ids = np.array([symptom["id"] for symptom in symptoms], dtype=str)
+    order = np.argsort(symptom_ids, kind="stable")
+    return {
+        "symptom_ids": symptom_ids,
+        "sorted_symptom_ids": symptom_ids[order],
+        "sorted_symptom_columns": order.astype(np.int64),
+        # Stored symptom-major so a query reads contiguous rows
+        "presence": np.ascontiguousarray(presence.T),
+        "weighted": np.ascontiguousarray(weighted.T),
+        "idf": idf,
+        "sizes": presence.sum(axis=1),
+    }
+
+
+class ConditionRanker:
+    """Rank conditions by how well their symptoms match a set of symptoms.
+
+    Each symptom is a row of a precomputed symptom x condition matrix, so
+    scoring every condition against a query only sums the rows of the
+    query's few symptoms: O(symptoms in query x conditions), whatever the
+    number of known symptoms.
+
+    "tfidf" is the cosine similarity of IDF-weighted symptom vectors: rare
+    symptoms that a condition shares with the query count for more than
+    common ones. "jaccard" is shared symptoms over all symptoms of either.
+
+    Reads the arrays of condition_arrays(), which may be memory-mapped and
+    shared by every worker, and fetches the conditions it ranks with
+    fetch(rows), which returns the conditions at those source positions.
+    """
+
+    def __init__(self, arrays, fetch):
+        self._symptom_ids = arrays["symptom_ids"]
+        self._sorted_ids = arrays["sorted_symptom_ids"]
+        self._sorted_columns = arrays["sorted_symptom_columns"]
+        self._presence = arrays["presence"]
+        self._weighted = arrays["weighted"]
+        self._idf = arrays["idf"]
+        self._sizes = arrays["sizes"]
+        self._fetch = fetch
+
+    @classmethod
+    def build(cls, conditions, symptoms):
+        """Rank conditions and symptoms held in memory."""
+        return cls(
+            condition_arrays(conditions, symptoms),
+            lambda rows: [conditions[row] for row in rows],
+        )
+
+    def _columns(self, symptom_ids):
+        """Return the column of each symptom id, or -1 for unknown ones."""
+        columns = np.full(len(symptom_ids), -1, dtype=np.intp)
+        if not symptom_ids or not len(self._sorted_ids):
+            return columns
+        ids = np.array(symptom_ids, dtype=str)
+        found = np.searchsorted(self._sorted_ids, ids)
+        found = np.minimum(found, len(self._sorted_ids) - 1)
+        known = self._sorted_ids[found] == ids
+        columns[known] = self._sorted_columns[found[known]]
+        return columns
+
+    def known(self, symptom_ids):
+        """Split symptom ids into those the ranker knows and the rest."""
+        symptom_ids = list(dict.fromkeys(symptom_ids))
+        columns = self._columns(symptom_ids)
+        known = [s for s, column in zip(symptom_ids, columns) if column >= 0]
+        unknown = [s for s, column in zip(symptom_ids, columns) if column < 0]
+        return known, unknown
+
+    def _scores(self, columns, method):
+        """Score every condition against the symptoms in columns."""
+        if method == "tfidf":
+            weights = self._idf[columns]
+            weights /= np.linalg.norm(weights)
+            return weights @ self._weighted[columns]
+        shared = self._presence[columns].sum(axis=0)
+        return shared / (len(columns) + self._sizes - shared)
+
+    def _top(self, scores, columns, limit):
+        """Return the best (row, score, matched symptoms) for one query."""
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            best = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[best]
+        # Highest score first, then source order
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        top = []
+        for row in candidates.tolist():
+            matched = columns[self._presence[columns, row] > 0]
+            top.append(
+                (
+                    row,
+                    round(float(scores[row]), 4),
+                    self._symptom_ids[matched].tolist(),
+                )
+            )
+        return top
+
+    def rank(self, symptom_ids, limit=10, method="tfidf"):
+        """Return up to limit conditions matching symptom_ids, best first."""
+        return self.rank_many([symptom_ids], limit, method)[0]
+
+    def rank_many(self, symptom_sets, limit=10, method="tfidf"):
+        """Rank conditions for each of many symptom sets."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown ranking method: {method}")
+        # Look every set's symptoms up at once
+        flat = [s for symptom_ids in symptom_sets for s in symptom_ids]
+        all_columns = self._columns(flat)
+        tops = []
+        start = 0
+        for symptom_ids in symptom_sets:
+            columns = all_columns[start : start + len(symptom_ids)]
+            start += len(symptom_ids)
+            columns = np.unique(columns[columns >= 0])
+            if len(columns) == 0:
+                tops.append([])
+                continue
+            tops.append(self._top(self._scores(columns, method), columns, limit))
+
+        rows = sorted({row for top in tops for row, _, _ in top})
+        conditions = dict(zip(rows, self._fetch(rows)))
+        return [
+            [
+                {**conditions[row], "score": score, "matched_symptoms": matched}
+                for row, score, matched in top
+            ]
+            for top in tops
+        ]
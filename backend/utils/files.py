@@ -0,0 +1,54 @@
+import os
+import stat
+
+# Caches and spooled uploads hold patients' documents, so they are kept
+# readable by the server's user only
+PRIVATE_DIR_MODE = 0o700
+PRIVATE_FILE_MODE = 0o600
+
+
+def make_private_dir(path):
+    """Create directory path private to this user, or make it private.
+
+    Only for directories the app owns outright: an existing directory's
+    permissions are changed.
+    """
+    os.makedirs(path, mode=PRIVATE_DIR_MODE, exist_ok=True)
+    os.chmod(path, PRIVATE_DIR_MODE)
+
+
+def open_private_file(path):
+    """Open path for writing in binary mode, private to this user."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, PRIVATE_FILE_MODE)
+    os.fchmod(fd, PRIVATE_FILE_MODE)
+    return os.fdopen(fd, "wb")
+
+
+def touch_private_file(path):
+    """Create path private to this user, or make an existing file private.
+
+    For files another library opens itself, such as SQLite databases, which
+    give their journal files the database's permissions. A missing parent
+    directory is created private as well.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=PRIVATE_DIR_MODE, exist_ok=True)
+    os.close(os.open(path, os.O_WRONLY | os.O_CREAT, PRIVATE_FILE_MODE))
+    os.chmod(path, PRIVATE_FILE_MODE)
+
+
+def is_own_file(path):
+    """Return whether path is this user's and no one else can change it.
+
+    For files read from a directory other users can write to: anything
+    they made there, including a symlink to one of ours, is not trusted.
+    """
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    return (
+        not stat.S_ISLNK(info.st_mode)
+        and info.st_uid == os.getuid()
+        and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    )
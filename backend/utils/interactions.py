@@ -0,0 +1,189 @@
+import functools
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Known severities, mildest first
+SEVERITIES = ("low", "moderate", "high")
+
+# Candidate pairs looked up in one NumPy call by find_many, to bound memory
+BATCH_PAIRS = 1_000_000
+
+
+@functools.lru_cache(maxsize=64)
+def pair_indices(size, self_pairs):
+    """Return the (first, second) index arrays of every pair among size items."""
+    return np.triu_indices(size, 0 if self_pairs else 1)
+
+
+def pair_key(medication1, medication2):
+    """Return the same key for a pair of medications in either order."""
+    if medication2 < medication1:
+        return medication2, medication1
+    return medication1, medication2
+
+
+def interaction_arrays(interactions):
+    """Compile interactions into the arrays an InteractionIndex reads.
+
+    The medications with a known interaction are numbered in sorted order
+    and each pair (i <= j) encoded as i * n + j, so the pairs of many lists
+    can be looked up at once with a binary search:
+
+    medication_ids: the numbered medications, sorted
+    pair_codes: the code of every pair with an interaction, sorted
+    pair_starts: where each pair's interactions start in entries, then the end
+    entries: source positions of the interactions, by pair, in source order
+    """
+    pairs = defaultdict(list)
+    for position, interaction in enumerate(interactions):
+        key = pair_key(interaction["medication1"], interaction["medication2"])
+        pairs[key].append(position)
+    ids = sorted({medication for pair in pairs for medication in pair})
+    numbers = {medication: i for i, medication in enumerate(ids)}
+    coded = sorted(
+        (numbers[a] * len(ids) + numbers[b], positions)
+        for (a, b), positions in pairs.items()
+    )
+    return {
+        "medication_ids": np.array(ids, dtype=str),
+        "pair_codes": np.array([code for code, _ in coded], dtype=np.int64),
+        "pair_starts": np.cumsum(
+            [0] + [len(positions) for _, positions in coded], dtype=np.int64
+        ),
+        "entries": np.array(
+            [position for _, positions in coded for position in positions],
+            dtype=np.int64,
+        ),
+    }
+
+
+class InteractionIndex:
+    """Medication interactions indexed by unordered pair.
+
+    Reads the arrays of interaction_arrays(), which may be memory-mapped
+    and shared by every worker, and fetches the interactions it finds with
+    fetch(positions), which returns the interactions at those source
+    positions. Looking up the interactions among k selected medications
+    costs O(k^2 log pairs), however large the interaction table is.
+    """
+
+    def __init__(self, arrays, fetch):
+        self._ids = arrays["medication_ids"]
+        self._codes = arrays["pair_codes"]
+        self._starts = arrays["pair_starts"]
+        self._entries = arrays["entries"]
+        self._fetch = fetch
+        n = len(self._ids)
+        self._self_pairs = bool(n) and bool(
+            np.any(self._codes // n == self._codes % n)
+        )
+
+    @classmethod
+    def build(cls, interactions):
+        """Index a list of interactions held in memory."""
+        return cls(
+            interaction_arrays(interactions),
+            lambda positions: [interactions[p] for p in positions],
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _numbers(self, medication_lists):
+        """Yield (list index, sorted numbers of its known medications)."""
+        owners, ids = [], []
+        for list_index, medication_ids in enumerate(medication_lists):
+            for medication in set(medication_ids):
+                if isinstance(medication, str):
+                    owners.append(list_index)
+                    ids.append(medication)
+        if not ids or not len(self._ids):
+            return
+        ids = np.array(ids, dtype=str)
+        found = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+        known = self._ids[found] == ids
+        owners, numbers = np.array(owners)[known], found[known]
+        order = np.lexsort((numbers, owners))
+        owners, numbers = owners[order], numbers[order]
+        splits = np.flatnonzero(np.diff(owners)) + 1
+        list_indices = owners[np.r_[0, splits]].tolist()
+        yield from zip(list_indices, np.split(numbers, splits))
+
+    def _entries_of(self, codes):
+        """Return the source positions of the interactions of pair codes.
+
+        Returns the positions found and, for each, the flat index into codes
+        of the pair it belongs to.
+        """
+        codes = codes.ravel()
+        found = np.minimum(np.searchsorted(self._codes, codes), len(self._codes) - 1)
+        hits = np.flatnonzero(self._codes[found] == codes)
+        pairs = found[hits].tolist()
+        positions, owners = [], []
+        for hit, pair in zip(hits.tolist(), pairs):
+            entries = self._entries[self._starts[pair] : self._starts[pair + 1]]
+            positions.extend(entries.tolist())
+            owners.extend([hit] * len(entries))
+        return positions, owners
+
+    def find(self, medication_ids):
+        """Return the interactions among the given medications, in source order."""
+        ids = sorted({m for m in medication_ids if isinstance(m, str)})
+        if not ids or not len(self._codes):
+            return []
+        ids = np.array(ids, dtype=str)
+        found = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+        numbers = found[self._ids[found] == ids]
+        first, second = pair_indices(len(numbers), self._self_pairs)
+        if not len(first):
+            return []
+        codes = numbers[first] * len(self._ids) + numbers[second]
+        positions, _ = self._entries_of(codes)
+        return self._fetch(sorted(positions))
+
+    def find_many(self, medication_lists):
+        """Return the interactions within each of many medication lists.
+
+        Equivalent to [self.find(ids) for ids in medication_lists]: the
+        candidate pairs of all lists with the same number of known
+        medications are encoded and looked up together with NumPy, and the
+        interactions found are fetched together.
+        """
+        n = len(self._ids)
+        positions = [[] for _ in medication_lists]
+        if not len(self._codes):
+            return positions
+        by_size = defaultdict(list)
+        for list_index, numbers in self._numbers(medication_lists):
+            if len(numbers) >= (1 if self._self_pairs else 2):
+                by_size[len(numbers)].append((list_index, numbers))
+
+        for size, group in by_size.items():
+            first, second = pair_indices(size, self._self_pairs)
+            step = max(1, BATCH_PAIRS // len(first))
+            for start in range(0, len(group), step):
+                batch = group[start : start + step]
+                numbers = np.stack([row for _, row in batch])
+                codes = numbers[:, first] * n + numbers[:, second]
+                found, owners = self._entries_of(codes)
+                for position, owner in zip(found, owners):
+                    positions[batch[owner // len(first)][0]].append(position)
+
+        unique = sorted({p for found in positions for p in found})
+        interactions = dict(zip(unique, self._fetch(unique)))
+        return [[interactions[p] for p in sorted(found)] for found in positions]
+
+
+def summarize(interactions):
+    """Count interactions by severity and name the most severe one present."""
+    counts = Counter(interaction.get("severity") for interaction in interactions)
+    worst = None
+    for severity in SEVERITIES:
+        if counts[severity]:
+            worst = severity
+    return {
+        "total": len(interactions),
+        "by_severity": {severity: counts[severity] for severity in SEVERITIES},
+        "max_severity": worst,
+    }
@@ -0,0 +1,64 @@
+import logging
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from models.models import db
+
+logger = logging.getLogger(__name__)
+
+def worker_id():
+    """Identify this process as the owner of the jobs it picks up.
+
+    Read when a job is claimed rather than at import, so each worker forked
+    from a preloaded app claims jobs under its own pid.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_is_alive(owner):
+    """Return True if owner names a live process other than this one.
+
+    Owners on other hosts are assumed alive.
+    """
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    if int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+    """Run jobs by id on a bounded pool of worker threads.
+
+    Each job runs inside an application context so the handler can use the
+    database like a request would.
+    """
+
+    def __init__(self, app, handler, workers):
+        self.app = app
+        self.handler = handler
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="job"
+        )
+
+    def submit(self, job_id):
+        self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                self.handler(job_id)
+            except Exception:
+                logger.exception(f"Job {job_id} failed")
+            finally:
+                db.session.remove()
@@ -0,0 +1,322 @@
+import logging
+import queue
+import threading
+import time
+
+from tenacity import (
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from config.config import Config
+from utils.llm_backends import LLMError, TRANSIENT_ERRORS, make_backend
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+# Put on a stream's queue after its last chunk
+_STREAM_END = object()
+
+
+class CircuitOpenError(LLMError):
+    """Raised instead of calling the upstream while it is known to be failing."""
+
+
+class LLMOverloadedError(CircuitOpenError):
+    """Raised when no call slot comes free within the queue timeout.
+
+    Routes answer it as they do an open circuit: the service is busy now
+    and worth trying again shortly.
+    """
+
+
+class TokenBucket:
+    """Allow rate calls per second on average, with bursts up to capacity."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, reserve=0):
+        """Take a token only if more than reserve would be left; never block."""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1 + reserve:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected for reset_timeout seconds. Then a single trial call is let
+    through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half-open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("LLM upstream is unavailable")
+            if self._trial_running:
+                raise CircuitOpenError("LLM upstream is recovering")
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_running:
+                    logger.warning("LLM circuit breaker opened")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LLMClient:
+    """The shared LLM client used by every route.
+
+    Every call to the backend goes through a concurrency limit, a
+    token-bucket rate limit, retries with jittered exponential backoff for
+    transient errors and a circuit breaker. A call that waits longer than
+    queue_timeout seconds for a slot fails with LLMOverloadedError.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_concurrency,
+        rate_limit,
+        burst,
+        max_attempts,
+        breaker,
+        queue_timeout=None,
+    ):
+        self.backend = backend
+        self.max_attempts = max_attempts
+        self.breaker = breaker
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_limit, burst)
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMOverloadedError("LLM is busy: no call slot came free in time")
+        try:
+            self.breaker.before_call()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _attempts(self):
+        return Retrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=0.5, max=8),
+            retry=retry_if_exception(lambda e: isinstance(e, TRANSIENT_ERRORS)),
+            before_sleep=lambda state: logger.warning(
+                f"Retrying LLM call after: {state.outcome.exception()}"
+            ),
+            reraise=True,
+        )
+
+    def _call(self, contents, system_instruction=None):
+        """Send one request, retrying transient failures."""
+        for attempt in self._attempts():
+            with attempt:
+                self._bucket.acquire()
+                return self.backend.generate(contents, system_instruction)
+
+    def _record(self, error):
+        if error is None or not isinstance(error, TRANSIENT_ERRORS):
+            # Anything but a transient error means the upstream is reachable
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def generate(self, prompt, system_instruction=None):
+        """Generate a complete response and return its text."""
+        return self.generate_with_usage(prompt, system_instruction)[0]
+
+    def generate_with_usage(self, prompt, system_instruction=None):
+        """Generate a complete response.
+
+        Returns the text and a dict of the input_tokens and output_tokens
+        the backend counted for the call.
+        """
+        self._acquire_slot()
+        error = None
+        try:
+            return self._call(prompt, system_instruction)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._slots.release()
+            self._record(error)
+
+    def try_generate(self, prompt, system_instruction=None, reserve=0):
+        """Generate a complete response only if there is spare capacity now.
+
+        For background work, which must not hold up interactive calls: the
+        call is made once, without waiting for a slot or a rate-limit token
+        and without retries, and only while more than reserve tokens are
+        left for other calls. Returns the text, or None if it was skipped.
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            if not self._bucket.try_acquire(reserve):
+                return None
+            self.breaker.before_call()
+            error = None
+            try:
+                return self.backend.generate(prompt, system_instruction)[0]
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                self._record(error)
+        finally:
+            self._slots.release()
+
+    def _read_stream(self, prompt, system_instruction, chunks, cancelled):
+        """Put the upstream's chunks on the chunks queue, then _STREAM_END.
+
+        Runs on its own thread, holding the slot taken for the stream until
+        the upstream has finished. An error is put on the queue to be raised
+        to the reader.
+        """
+        error = None
+        try:
+            for attempt in self._attempts():
+                with attempt:
+                    self._bucket.acquire()
+                    upstream = self.backend.generate_stream(prompt, system_instruction)
+                    first = next(upstream, None)
+            if first is not None:
+                chunks.put(first)
+                for chunk in upstream:
+                    if cancelled.is_set():
+                        upstream.close()
+                        break
+                    chunks.put(chunk)
+        except Exception as e:
+            error = e
+            chunks.put(e)
+        finally:
+            self._slots.release()
+            self._record(error)
+            chunks.put(_STREAM_END)
+
+    def generate_stream(self, prompt, system_instruction=None):
+        """Yield the response text in chunks as it is generated.
+
+        Transient failures are retried until the first chunk arrives; after
+        that an error ends the stream. The upstream is read on a separate
+        thread, so the slot is freed as soon as the upstream finishes, not
+        when the caller, perhaps a slow client, has read every chunk.
+        """
+        self._acquire_slot()
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        threading.Thread(
+            target=self._read_stream,
+            args=(prompt, system_instruction, chunks, cancelled),
+            name="llm-stream",
+            daemon=True,
+        ).start()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _STREAM_END:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            # Stop reading the upstream if the caller stopped reading us
+            cancelled.set()
+
+    def chat(self, history, message, system_instruction=None):
+        """Send the next user message of a conversation.
+
+        history is a list of {"role": "user" | "model", "parts": [text]}
+        turns; it is not modified. Returns the reply and its token counts,
+        as generate_with_usage does.
+        """
+        contents = list(history) + [{"role": "user", "parts": [message]}]
+        return self.generate_with_usage(contents, system_instruction)
+
+
+def get_llm():
+    """Return the process-wide LLM client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(
+                backend=make_backend(Config),
+                max_concurrency=Config.LLM_MAX_CONCURRENCY,
+                queue_timeout=Config.LLM_QUEUE_TIMEOUT,
+                rate_limit=Config.LLM_RATE_LIMIT,
+                burst=Config.LLM_BURST,
+                max_attempts=Config.LLM_MAX_ATTEMPTS,
+                breaker=CircuitBreaker(
+                    Config.LLM_BREAKER_THRESHOLD, Config.LLM_BREAKER_RESET
+                ),
+            )
+        return _client
@@ -0,0 +1,198 @@
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+
+class LLMError(Exception):
+    pass
+
+
+class TransientLLMError(LLMError):
+    """A temporary upstream failure that is worth retrying."""
+
+
+# Upstream errors worth retrying and counting against the circuit breaker
+TRANSIENT_ERRORS = (
+    TransientLLMError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def usage(input_tokens, output_tokens):
+    """Token counts of one call, as reported by the backend."""
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens}
+
+
+def chunk_text(chunk):
+    """Return the text of a streamed Gemini chunk, or "" if it has none."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+class GeminiBackend:
+    """Calls Google's Gemini API.
+
+    contents is either a prompt string or a list of
+    {"role": "user" | "model", "parts": [text]} turns. generate returns the
+    text with the token counts Gemini reports for the call.
+    """
+
+    def __init__(self, model_name, timeout):
+        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+        self.model_name = model_name
+        self.timeout = timeout
+        self._models = {}
+        self._models_lock = threading.Lock()
+
+    def _model(self, system_instruction=None):
+        with self._models_lock:
+            model = self._models.get(system_instruction)
+            if model is None:
+                model = genai.GenerativeModel(
+                    self.model_name, system_instruction=system_instruction
+                )
+                self._models[system_instruction] = model
+            return model
+
+    def generate(self, contents, system_instruction=None):
+        response = self._model(system_instruction).generate_content(
+            contents, request_options={"timeout": self.timeout}
+        )
+        metadata = response.usage_metadata
+        return response.text, usage(
+            metadata.prompt_token_count or 0, metadata.candidates_token_count or 0
+        )
+
+    def generate_stream(self, contents, system_instruction=None):
+        response = self._model(system_instruction).generate_content(
+            contents, stream=True, request_options={"timeout": self.timeout}
+        )
+        for chunk in response:
+            yield chunk_text(chunk)
+
+
+class FakeBackend:
+    """A local stand-in for Gemini, for load tests that must not use quota.
+
+    Replies are deterministic for a given input. Timing follows the
+    configured model: a time to first token drawn from a latency
+    distribution, then output at tokens_per_second. A fraction error_rate
+    of calls fail with a TransientLLMError. Token counts are words of the
+    input and tokens of the reply.
+    """
+
+    WORDS = (
+        "patient follow up medication dose daily review symptoms history "
+        "appointment results normal advised monitor rest hydration plan"
+    ).split()
+
+    def __init__(
+        self,
+        latency="lognormal",
+        latency_ms=800,
+        jitter_ms=300,
+        tokens_per_second=80,
+        output_tokens=300,
+        error_rate=0.0,
+        seed=None,
+    ):
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _first_token_delay(self):
+        """Draw a time to first token, in seconds."""
+        mean, jitter = self.latency_ms, self.jitter_ms
+        with self._random_lock:
+            if self.latency == "constant" or not jitter or mean <= 0:
+                delay = mean
+            elif self.latency == "uniform":
+                delay = self._random.uniform(mean - jitter, mean + jitter)
+            elif self.latency == "normal":
+                delay = self._random.gauss(mean, jitter)
+            elif self.latency == "lognormal":
+                # Parameterised so the mean and standard deviation match
+                sigma2 = math.log(1 + (jitter / mean) ** 2)
+                mu = math.log(mean) - sigma2 / 2
+                delay = self._random.lognormvariate(mu, sigma2**0.5)
+            else:
+                raise ValueError(f"Unknown latency distribution: {self.latency}")
+        return max(delay, 0) / 1000
+
+    def _maybe_fail(self):
+        with self._random_lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise TransientLLMError("Injected fake LLM failure")
+
+    def _reply_tokens(self, contents, system_instruction):
+        digest = hashlib.sha256(
+            repr((contents, system_instruction)).encode("utf-8")
+        ).hexdigest()
+        seeded = random.Random(digest)
+        words = [seeded.choice(self.WORDS) for _ in range(self.output_tokens)]
+        return [f"[fake reply {digest[:8]}]"] + [f" {word}" for word in words]
+
+    def _input_tokens(self, contents, system_instruction):
+        if isinstance(contents, str):
+            contents = [{"parts": [contents]}]
+        texts = [part for turn in contents for part in turn["parts"]]
+        return sum(len(text.split()) for text in [system_instruction or ""] + texts)
+
+    def generate(self, contents, system_instruction=None):
+        text = "".join(self.generate_stream(contents, system_instruction))
+        return text, usage(
+            self._input_tokens(contents, system_instruction),
+            len(self._reply_tokens(contents, system_instruction)),
+        )
+
+    def generate_stream(self, contents, system_instruction=None):
+        time.sleep(self._first_token_delay())
+        self._maybe_fail()
+        tokens = self._reply_tokens(contents, system_instruction)
+        # Emit roughly ten chunks a second, like a streaming API
+        if self.tokens_per_second:
+            per_chunk = max(1, int(self.tokens_per_second / 10))
+        else:
+            per_chunk = len(tokens)
+        for start in range(0, len(tokens), per_chunk):
+            if start and self.tokens_per_second:
+                time.sleep(per_chunk / self.tokens_per_second)
+            yield "".join(tokens[start : start + per_chunk])
+
+
+def make_backend(config):
+    """Build the LLM backend selected by config.LLM_BACKEND."""
+    if config.LLM_BACKEND == "gemini":
+        return GeminiBackend(config.GEMINI_MODEL, config.LLM_TIMEOUT)
+    if config.LLM_BACKEND == "fake":
+        return FakeBackend(
+            latency=config.FAKE_LLM_LATENCY,
+            latency_ms=config.FAKE_LLM_LATENCY_MS,
+            jitter_ms=config.FAKE_LLM_JITTER_MS,
+            tokens_per_second=config.FAKE_LLM_TOKENS_PER_SECOND,
+            output_tokens=config.FAKE_LLM_OUTPUT_TOKENS,
+            error_rate=config.FAKE_LLM_ERROR_RATE,
+            seed=config.FAKE_LLM_SEED,
+        )
+    raise ValueError(f"Unknown LLM backend: {config.LLM_BACKEND}")
@@ -0,0 +1,118 @@
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss():
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # No procfs (e.g. macOS): fall back to the lifetime peak
+        return peak_rss()
+
+
+def peak_rss():
+    """Return the lifetime peak resident set size of this process in bytes."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    return maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+
+
+@contextmanager
+def track_peak_rss(label, interval=0.05):
+    """Sample RSS while the block runs and log the peak when it exits.
+
+    RSS is per process, so concurrent requests in a threaded worker are
+    counted together.
+    """
+    start = current_rss()
+    peak = [start]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], current_rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield
+    finally:
+        done.set()
+        sampler.join()
+        peak[0] = max(peak[0], current_rss())
+        logger.info(
+            f"{label}: peak RSS {peak[0] / 2**20:.1f} MB "
+            f"(+{(peak[0] - start) / 2**20:.1f} MB over {start / 2**20:.1f} MB)"
+        )
+
+
+def track_stream_peak_rss(chunks, label):
+    """Pass chunks through, logging the peak RSS while they are produced.
+
+    For streamed responses, whose work happens after the view returns.
+    """
+    with track_peak_rss(label):
+        yield from chunks
+
+
+def log_stream_latency(chunks, label):
+    """Pass chunks through, logging time to the first chunk and total time."""
+    start = time.perf_counter()
+    first_chunk = None
+    try:
+        for chunk in chunks:
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            yield chunk
+    finally:
+        total = time.perf_counter() - start
+        ttfb = f"{first_chunk:.2f}s" if first_chunk is not None else "n/a"
+        logger.info(f"{label}: first chunk after {ttfb}, total {total:.2f}s")
+
+
+class LLMUsageStats:
+    """Running totals of LLM token usage and latency, grouped by label."""
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, input_tokens, output_tokens, seconds):
+        with self._lock:
+            totals = self._totals.setdefault(
+                label,
+                {
+                    "calls": 0,
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                    "max_input_tokens": 0,
+                    "seconds": 0.0,
+                },
+            )
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            totals["max_input_tokens"] = max(totals["max_input_tokens"], input_tokens)
+            totals["seconds"] += seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                label: {
+                    **totals,
+                    "mean_input_tokens": totals["input_tokens"] / totals["calls"],
+                    "mean_output_tokens": totals["output_tokens"] / totals["calls"],
+                    "mean_latency_ms": 1000 * totals["seconds"] / totals["calls"],
+                }
+                for label, totals in self._totals.items()
+            }
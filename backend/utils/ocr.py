@@ -0,0 +1,250 @@
+import functools
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+
+import pdf2image
+import pytesseract
+from PIL import Image
+
+from config.config import Config
+from utils.cache import DiskCache
+from utils.preprocess import preprocess_image
+
+logger = logging.getLogger(__name__)
+
+# Bump when a change to the OCR pipeline alters its output
+OCR_PIPELINE_VERSION = 3
+
+_pool = None
+_pool_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """Return the shared OCR process pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawn rather than fork: the web server is multi-threaded
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def get_ocr_cache():
+    """Return the shared OCR text cache, or None when caching is disabled."""
+    global _cache
+    if not Config.OCR_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(
+                Config.OCR_CACHE_PATH,
+                Config.OCR_CACHE_MAX_BYTES,
+                ttl=Config.OCR_CACHE_TTL,
+            )
+        return _cache
+
+
+@functools.lru_cache(maxsize=None)
+def ocr_settings_fingerprint():
+    """Describe every setting that changes OCR output, for use in cache keys."""
+    try:
+        tesseract_version = pytesseract.get_tesseract_version()
+    except Exception:
+        tesseract_version = "unknown"
+    text_layer = Config.PDF_TEXT_MIN_CHARS if Config.PDF_TEXT_LAYER else "off"
+    return (
+        f"pipeline={OCR_PIPELINE_VERSION};tesseract={tesseract_version};"
+        f"text_layer={text_layer};preprocess={Config.OCR_PREPROCESS};"
+        f"target_dpi={Config.OCR_TARGET_DPI};raster_dpi={Config.PDF_RASTER_DPI}"
+    )
+
+
+def ocr_cache_key(source):
+    """Hash the file contents together with the OCR settings.
+
+    source is either the file contents as bytes or a path to the file.
+    """
+    if isinstance(source, bytes):
+        digest = hashlib.sha256(source)
+    else:
+        digest = hashlib.sha256()
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    digest.update(ocr_settings_fingerprint().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def extract_text_from_image(image):
+    """Extract text from an image using Tesseract OCR."""
+    try:
+        image = preprocess_image(image, Config.OCR_PREPROCESS, Config.OCR_TARGET_DPI)
+        text = pytesseract.image_to_string(image)
+        return text.strip()
+    except Exception as e:
+        print(f"Error extracting text from image: {str(e)}")
+        return None
+
+
+def ocr_pdf_page(pdf_path, page_number):
+    """Rasterize and OCR a single PDF page (1-based). Runs in a pool worker."""
+    images = render_pdf_pages(pdf_path, page_number, page_number)
+    if not images:
+        return None
+    return extract_text_from_image(images[0])
+
+
+def extract_text_from_pdf_parallel(pdf_path, page_numbers, pool):
+    """OCR the given PDF pages on a process pool, in the order given."""
+    return list(pool.map(ocr_pdf_page, repeat(pdf_path), page_numbers))
+
+
+def render_pdf_pages(pdf_path, first_page, last_page):
+    return pdf2image.convert_from_path(
+        pdf_path,
+        dpi=Config.PDF_RASTER_DPI,
+        first_page=first_page,
+        last_page=last_page,
+    )
+
+
+def iter_pdf_page_windows(pdf_path, page_numbers, window):
+    """Yield (page numbers, rendered pages) for a PDF a few pages at a time.
+
+    Only ``window`` pages are held in memory at once, so peak memory does
+    not grow with the length of the document. Consecutive page numbers are
+    rendered together in one pdftoppm call.
+    """
+    run = []
+    for page_number in page_numbers:
+        if run and (page_number != run[-1] + 1 or len(run) == window):
+            yield run, render_pdf_pages(pdf_path, run[0], run[-1])
+            run = []
+        run.append(page_number)
+    if run:
+        yield run, render_pdf_pages(pdf_path, run[0], run[-1])
+
+
+def extract_embedded_text(pdf_path, page_count):
+    """Return the existing text layer of every page, empty for scanned pages."""
+    result = subprocess.run(
+        ["pdftotext", "-layout", "-enc", "UTF-8", pdf_path, "-"],
+        capture_output=True,
+        check=True,
+    )
+    # pdftotext ends every page with a form feed
+    pages = result.stdout.decode("utf-8", errors="replace").split("\f")
+    return [page.strip() for page in (pages + [""] * page_count)[:page_count]]
+
+
+def extract_text_from_pdf(pdf_path):
+    """Extract text from a PDF file.
+
+    Pages that already carry a text layer are read directly; only scanned
+    pages are rasterized and OCR'd. Returns the text and, for every page,
+    which path it took ("text" or "ocr").
+    """
+    try:
+        page_count = pdf2image.pdfinfo_from_path(pdf_path)["Pages"]
+
+        page_texts = [""] * page_count
+        sources = ["ocr"] * page_count
+        if Config.PDF_TEXT_LAYER:
+            try:
+                embedded = extract_embedded_text(pdf_path, page_count)
+            except Exception as e:
+                logger.warning(f"Could not read PDF text layer: {str(e)}")
+                embedded = page_texts
+            for index, page_text in enumerate(embedded):
+                if len(page_text) >= Config.PDF_TEXT_MIN_CHARS:
+                    page_texts[index] = page_text
+                    sources[index] = "text"
+
+        scanned = [index + 1 for index in range(page_count) if sources[index] == "ocr"]
+
+        if Config.OCR_PARALLEL and Config.OCR_WORKERS > 1 and len(scanned) > 1:
+            ocr_texts = extract_text_from_pdf_parallel(
+                pdf_path, scanned, get_ocr_pool()
+            )
+            for page_number, page_text in zip(scanned, ocr_texts):
+                page_texts[page_number - 1] = page_text
+        else:
+            # Render and OCR the scanned pages window by window
+            for page_numbers, images in iter_pdf_page_windows(
+                pdf_path, scanned, max(Config.OCR_PAGE_WINDOW, 1)
+            ):
+                for page_number, image in zip(page_numbers, images):
+                    page_texts[page_number - 1] = extract_text_from_image(image)
+                    image.close()
+                del images
+
+        text = "\n".join(page_text for page_text in page_texts if page_text)
+        return text.strip(), sources
+    except Exception as e:
+        print(f"Error extracting text from PDF: {str(e)}")
+        return None, []
+
+
+@contextmanager
+def pdf_file(source):
+    """Yield a path to a PDF given as a path or as bytes.
+
+    The poppler tools only read from files, so in-memory PDFs are written
+    to a uniquely named temporary file that is removed afterwards.
+    """
+    if not isinstance(source, bytes):
+        yield source
+        return
+    with tempfile.NamedTemporaryFile(prefix="medassist_", suffix=".pdf") as f:
+        f.write(source)
+        f.flush()
+        yield f.name
+
+
+def extract_text(source, filename):
+    """Extract text from an uploaded PDF or image, reusing cached OCR output.
+
+    source is either the file contents as bytes or a path to the file;
+    filename decides how it is read. Returns the text and the extraction
+    path taken by each page.
+    """
+    cache = get_ocr_cache()
+    key = None
+    if cache:
+        try:
+            key = ocr_cache_key(source)
+            cached = cache.get(key)
+            if cached is not None:
+                logger.debug(f"OCR cache hit for {key}")
+                cached = json.loads(cached)
+                return cached["text"], cached["pages"]
+        except Exception as e:
+            logger.warning(f"OCR cache lookup failed: {str(e)}")
+
+    if filename.lower().endswith(".pdf"):
+        with pdf_file(source) as pdf_path:
+            text, pages = extract_text_from_pdf(pdf_path)
+    else:
+        image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        text, pages = extract_text_from_image(image), ["ocr"]
+
+    if key and text:
+        try:
+            cache.set(key, json.dumps({"text": text, "pages": pages}))
+        except Exception as e:
+            logger.warning(f"OCR cache store failed: {str(e)}")
+    return text, pages
@@ -0,0 +1,403 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from config.config import Config
+from utils.files import PRIVATE_DIR_MODE, is_own_file, open_private_file
+from utils.conditions import ConditionRanker, condition_arrays
+from utils.interactions import InteractionIndex, interaction_arrays
+from utils.search import MedicationSearchIndex, search_arrays
+
+logger = logging.getLogger(__name__)
+
+# Bump when the compiled file layout changes; older files are recompiled
+SCHEMA_VERSION = 3
+
+# Records fetched per query when looking them up by position
+FETCH_BATCH = 500
+
+# Each kind of record and the fields every record of it must have
+KINDS = {
+    "medications": ("id", "name"),
+    "interactions": ("medication1", "medication2", "severity"),
+    "symptoms": ("id", "name"),
+    "conditions": ("id", "name", "symptoms"),
+}
+
+
+class ReferenceDataError(ValueError):
+    pass
+
+
+def validate(data):
+    """Check a reference data document and return its records by kind."""
+    records = {}
+    for kind, fields in KINDS.items():
+        items = data.get(kind, [])
+        if not isinstance(items, list):
+            raise ReferenceDataError(f"{kind} must be a list")
+        for position, item in enumerate(items):
+            missing = [
+                field
+                for field in fields
+                if not isinstance(item, dict) or field not in item
+            ]
+            if missing:
+                raise ReferenceDataError(
+                    f"{kind}[{position}] is missing {', '.join(missing)}"
+                )
+        records[kind] = items
+
+    medication_ids = {m["id"] for m in records["medications"]}
+    for position, interaction in enumerate(records["interactions"]):
+        for field in ("medication1", "medication2"):
+            if interaction[field] not in medication_ids:
+                raise ReferenceDataError(
+                    f"interactions[{position}] names unknown medication "
+                    f"{interaction[field]}"
+                )
+    symptom_ids = {s["id"] for s in records["symptoms"]}
+    for position, condition in enumerate(records["conditions"]):
+        unknown = [s for s in condition["symptoms"] if s not in symptom_ids]
+        if unknown:
+            raise ReferenceDataError(
+                f"conditions[{position}] names unknown symptoms {', '.join(unknown)}"
+            )
+    return records
+
+
+def source_signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def arrays_path(compiled_path, version):
+    """Return the directory holding the index arrays of a compiled version."""
+    return f"{compiled_path}.{version[:16]}.v{SCHEMA_VERSION}.arrays"
+
+
+def write_arrays(compiled_path, version, records):
+    """Build the index arrays of records and save them as .npy files.
+
+    Each version gets its own directory, written under a temporary name and
+    renamed into place, so a worker still serving an older version keeps
+    reading its own arrays.
+    """
+    path = arrays_path(compiled_path, version)
+    if os.path.isdir(path):
+        return
+    arrays = {
+        "interactions": interaction_arrays(records["interactions"]),
+        "medication_search": search_arrays(records["medications"]),
+        "conditions": condition_arrays(records["conditions"], records["symptoms"]),
+    }
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        for index, named in arrays.items():
+            for name, array in named.items():
+                filename = os.path.join(tmp_path, f"{index}.{name}.npy")
+                with open_private_file(filename) as f:
+                    np.save(f, array)
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        # Another worker compiling the same version got there first
+        if not os.path.isdir(path):
+            raise
+
+
+def remove_old_arrays(compiled_path, version):
+    """Remove the array directories of versions other than version.
+
+    Workers that have loaded an older version keep their mappings of its
+    files; one loading it right now fails and loads the new version on its
+    next check. Only directories this user made are removed.
+    """
+    directory = os.path.dirname(os.path.abspath(compiled_path))
+    prefix = os.path.basename(compiled_path) + "."
+    current = os.path.basename(arrays_path(compiled_path, version))
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if (
+            name.startswith(prefix)
+            and name.endswith(".arrays")
+            and name != current
+            and is_own_file(path)
+        ):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def compile_reference_data(source_path, compiled_path):
+    """Validate a JSON source file and write it out as a read-only store.
+
+    The store is a SQLite file of the records, one JSON object per row,
+    and a directory of the index arrays next to it. The file is built under
+    a temporary name and renamed into place after the arrays, so workers
+    never see a half-written store, and two workers compiling at once just
+    replace one identical file with the other.
+    """
+    signature = source_signature(source_path)
+    with open(source_path, "rb") as f:
+        raw = f.read()
+    records = validate(json.loads(raw))
+    version = hashlib.sha256(raw).hexdigest()
+    medications = json.dumps(records["medications"], sort_keys=True)
+
+    directory = os.path.dirname(os.path.abspath(compiled_path))
+    os.makedirs(directory, mode=PRIVATE_DIR_MODE, exist_ok=True)
+    write_arrays(compiled_path, version, records)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        with conn:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("schema_version", str(SCHEMA_VERSION)),
+                    ("source_signature", signature),
+                    ("version", version),
+                    (
+                        "medications_etag",
+                        hashlib.sha256(medications.encode("utf-8")).hexdigest(),
+                    ),
+                ],
+            )
+            for kind, items in records.items():
+                conn.execute(
+                    f"CREATE TABLE {kind} "
+                    "(position INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+                )
+                conn.executemany(
+                    f"INSERT INTO {kind} VALUES (?, ?)",
+                    [
+                        (position, json.dumps(item, sort_keys=True))
+                        for position, item in enumerate(items)
+                    ],
+                )
+        conn.execute("VACUUM")
+        conn.close()
+        os.replace(tmp_path, compiled_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    remove_old_arrays(compiled_path, version)
+    logger.info(f"Compiled reference data from {source_path} to {compiled_path}")
+
+
+def _connect_read_only(path, check_same_thread=True):
+    conn = sqlite3.connect(
+        f"file:{path}?mode=ro", uri=True, check_same_thread=check_same_thread
+    )
+    # Map the file instead of reading it into a private buffer, so the pages
+    # are shared through the OS page cache by every worker
+    conn.execute("PRAGMA mmap_size = 268435456")
+    return conn
+
+
+def trusted_store(compiled_path, version=None):
+    """Return whether a compiled store is this user's own.
+
+    With a version, its array directory and the files in it must be too.
+    """
+    if not is_own_file(compiled_path):
+        return False
+    if version is None:
+        return True
+    path = arrays_path(compiled_path, version)
+    return is_own_file(path) and all(
+        is_own_file(os.path.join(path, name)) for name in os.listdir(path)
+    )
+
+
+def read_meta(compiled_path):
+    """Return the meta table of a compiled store, or None if it is unusable.
+
+    A store another user could have written is unusable, and compiled
+    again.
+    """
+    if not trusted_store(compiled_path):
+        return None
+    try:
+        conn = _connect_read_only(compiled_path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    if meta.get("schema_version") != str(SCHEMA_VERSION):
+        return None
+    return meta
+
+
+def load_arrays(path):
+    """Memory-map the .npy files in path, as {index: {name: array}}."""
+    arrays = {}
+    for filename in os.listdir(path):
+        index, name = filename[: -len(".npy")].split(".", 1)
+        arrays.setdefault(index, {})[name] = np.load(
+            os.path.join(path, filename), mmap_mode="r"
+        )
+    return arrays
+
+
+class ReferenceData:
+    """One loaded version of the reference data and the indexes built on it.
+
+    Nothing is copied into the worker: the index arrays are memory-mapped
+    from the files the store was compiled to, and records are read from its
+    SQLite file as requests need them, so every worker shares the same
+    pages through the OS page cache. The file is opened once, so a version
+    compiled over it later is not mixed in.
+
+    Never modified once loaded: a reload loads a new instance and swaps it
+    in, so a request keeps a consistent view however long it runs.
+    """
+
+    def __init__(self, compiled_path):
+        if not trusted_store(compiled_path):
+            raise ReferenceDataError(
+                f"{compiled_path} was not compiled by this user; not loading it"
+            )
+        # One connection for every thread, so all read the same file
+        self._conn = _connect_read_only(compiled_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        self.version = meta["version"]
+        self.source_signature = meta["source_signature"]
+        self.medications_etag = meta["medications_etag"]
+
+        if not trusted_store(compiled_path, self.version):
+            raise ReferenceDataError(
+                f"The arrays of {compiled_path} were not compiled by this user"
+            )
+        arrays = load_arrays(arrays_path(compiled_path, self.version))
+        self.interaction_index = InteractionIndex(
+            arrays["interactions"],
+            lambda positions: self.fetch("interactions", positions),
+        )
+        self.medication_search = MedicationSearchIndex(
+            arrays["medication_search"],
+            lambda positions: self.fetch("medications", positions),
+        )
+        self.condition_ranker = ConditionRanker(
+            arrays["conditions"], lambda rows: self.fetch("conditions", rows)
+        )
+
+    def fetch(self, kind, positions):
+        """Return the records of a kind at the given positions, in that order."""
+        data = {}
+        unique = list(set(positions))
+        with self._lock:
+            for start in range(0, len(unique), FETCH_BATCH):
+                batch = unique[start : start + FETCH_BATCH]
+                data.update(
+                    self._conn.execute(
+                        f"SELECT position, data FROM {kind} "
+                        f"WHERE position IN ({', '.join('?' * len(batch))})",
+                        batch,
+                    )
+                )
+        records = {position: json.loads(text) for position, text in data.items()}
+        return [records[position] for position in positions]
+
+    def records_json(self, kind):
+        """Return every record of a kind as a JSON array, in source order."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT data FROM {kind} ORDER BY position")
+            return f"[{', '.join(data for (data,) in rows)}]"
+
+
+class ReferenceDataStore:
+    """Serve the current reference data, reloading it when the source changes.
+
+    At most every check_interval seconds the source file is compared with
+    the one the loaded data came from. When it has changed, it is compiled
+    again (unless another worker already has) and the new version is
+    swapped in for later requests. A source that fails to compile is logged
+    and the previous version keeps being served.
+    """
+
+    def __init__(self, source_path, compiled_path, check_interval=5):
+        self.source_path = source_path
+        self.compiled_path = compiled_path
+        self.check_interval = check_interval
+        self._data = None
+        self._checked_at = None
+        # Source version that last failed to compile, so it is reported once
+        self._failed_signature = None
+        self._lock = threading.Lock()
+
+    def _due(self, now):
+        return self._data is None or now - self._checked_at >= self.check_interval
+
+    def get(self):
+        now = time.monotonic()
+        if self._due(now):
+            with self._lock:
+                if self._due(now):
+                    try:
+                        self._refresh()
+                    except Exception as e:
+                        if self._data is None:
+                            raise
+                        logger.error(f"Keeping previous reference data: {str(e)}")
+                    self._checked_at = time.monotonic()
+        return self._data
+
+    def _refresh(self):
+        if os.path.exists(self.source_path):
+            signature = source_signature(self.source_path)
+            if self._data is not None and signature in (
+                self._data.source_signature,
+                self._failed_signature,
+            ):
+                return
+            meta = read_meta(self.compiled_path)
+            if (
+                meta is None
+                or meta["source_signature"] != signature
+                or not os.path.isdir(arrays_path(self.compiled_path, meta["version"]))
+                or not trusted_store(self.compiled_path, meta["version"])
+            ):
+                try:
+                    compile_reference_data(self.source_path, self.compiled_path)
+                except Exception:
+                    self._failed_signature = signature
+                    raise
+        elif self._data is not None:
+            # Only a compiled store (the file and its arrays) was deployed;
+            # it does not change
+            return
+
+        data = ReferenceData(self.compiled_path)
+        if self._data is None or data.version != self._data.version:
+            logger.info(f"Loaded reference data version {data.version[:12]}")
+        self._data = data
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_reference_data():
+    """Return the current reference data, creating the shared store on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ReferenceDataStore(
+                Config.REFERENCE_DATA_SOURCE,
+                Config.REFERENCE_DATA_PATH,
+                Config.REFERENCE_DATA_CHECK_INTERVAL,
+            )
+    return _store.get()
@@ -0,0 +1,339 @@
+import bisect
+import logging
+import re
+import sqlite3
+import unicodedata
+from datetime import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from models.models import db, SavedReport
+from models.types import decompress_text
+
+logger = logging.getLogger(__name__)
+
+TABLE = "saved_report_fts"
+
+# SQLite 3.43 added contentless_delete, which lets rows of a contentless
+# index be deleted by rowid; before it, a row can only be deleted by
+# giving FTS5 the values it was indexed with
+CONTENTLESS_DELETE = sqlite3.sqlite_version_info >= (3, 43, 0)
+
+# Contentless (content=''): the index holds only the terms, not a second,
+# uncompressed copy of every report. user_id and report_type are indexed as
+# tokens so a search narrows to one user's reports inside the full-text
+# index instead of after ranking every user's matches
+CREATE_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+    "USING fts5(title, content, user_id, report_type, content=''"
+    + (", contentless_delete=1" if CONTENTLESS_DELETE else "")
+    + ")"
+)
+
+# Relative weight of a match in each column when ranking
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+# Words of context in each snippet, and the marks around matched words
+# (Markdown bold, as reports are Markdown)
+SNIPPET_WORDS = 16
+HIGHLIGHT = "**"
+ELLIPSIS = "…"
+
+WORD = re.compile(r"\w+")
+WORD_STAR = re.compile(r"(\w+)(\*?)")
+
+# Reports indexed per batch when the index is rebuilt
+REBUILD_BATCH = 1000
+
+_enabled = False
+# Whether the index was created with contentless_delete=1
+_delete_by_rowid = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep the search index out of Alembic autogenerate."""
+    return not (type_ == "table" and name.startswith(TABLE))
+
+
+def query_terms(query):
+    """Return the (word, is_prefix) pairs of a search query, casefolded."""
+    return [
+        (word, star == "*") for word, star in WORD_STAR.findall(query.casefold())
+    ]
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query matching every word in it.
+
+    Each word is quoted, so FTS5 operators in the text are searched for
+    rather than interpreted. A word ending in * matches as a prefix; that is
+    opt-in because FTS5 reads the whole index entry of every word with the
+    prefix, which is several times slower than matching a word outright.
+    Returns None if the text has no words.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return " ".join(f'"{word}"{"*" if prefix else ""}' for word, prefix in terms)
+
+
+def _fold(word):
+    """Casefold word and strip its accents, as FTS5's tokenizer does."""
+    if word.isascii():
+        return word.lower()
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", word.casefold())
+        if not unicodedata.combining(c)
+    )
+
+
+def snippet(text, terms, words=SNIPPET_WORDS, mark=HIGHLIGHT):
+    """Return the words of text around its matches of terms, marked.
+
+    Stands in for FTS5's snippet(), which a contentless index cannot run.
+    Of the windows of that many words starting near a match, the one
+    matching the most different terms is taken, the earliest on a tie. Text
+    without a match, when only the title matched, gives its first words.
+    """
+    tokens = list(WORD.finditer(text))
+    if not tokens:
+        return ""
+    terms = [(_fold(word), prefix) for word, prefix in terms]
+    hits, hit_terms = [], []
+    for position, token in enumerate(tokens):
+        word = _fold(token.group())
+        for index, (term, prefix) in enumerate(terms):
+            if word == term or (prefix and word.startswith(term)):
+                hits.append(position)
+                hit_terms.append(index)
+                break
+
+    # Start a little before a match, so it has some context on both sides
+    lead = words // 4
+    start, best = 0, 0
+    for position in hits:
+        candidate = max(0, min(position - lead, len(tokens) - words))
+        first = bisect.bisect_left(hits, candidate)
+        last = bisect.bisect_left(hits, candidate + words)
+        matched = len(set(hit_terms[first:last]))
+        if matched > best:
+            start, best = candidate, matched
+            if best == len(terms):
+                break
+    end = min(start + words, len(tokens))
+
+    marked = set(hits)
+    parts = [ELLIPSIS] if start > 0 else []
+    for position in range(start, end):
+        token = tokens[position]
+        if position > start:
+            # Only the matches are to be bold, not what the report made bold
+            between = text[tokens[position - 1].end() : token.start()]
+            parts.append(between.replace(mark, ""))
+        if position in marked:
+            parts.append(f"{mark}{token.group()}{mark}")
+        else:
+            parts.append(token.group())
+    if end < len(tokens):
+        parts.append(ELLIPSIS)
+    return "".join(parts)
+
+
+def _row(report):
+    return {
+        "id": report.id,
+        "title": report.title,
+        "content": report.content,
+        "user_id": str(report.user_id),
+        "report_type": report.report_type,
+    }
+
+
+def _stored_row(connection, report_id):
+    """Return a report's indexed values as saved_report holds them now."""
+    row = connection.execute(
+        text(
+            "SELECT id, title, content, user_id, report_type FROM saved_report "
+            "WHERE id = :id"
+        ),
+        {"id": report_id},
+    ).first()
+    if row is None:
+        return None
+    return {
+        "id": row.id,
+        "title": row.title,
+        "content": decompress_text(row.content),
+        "user_id": str(row.user_id),
+        "report_type": row.report_type,
+    }
+
+
+def _insert(connection, rows):
+    connection.execute(
+        text(
+            f"INSERT INTO {TABLE} (rowid, title, content, user_id, report_type) "
+            "VALUES (:id, :title, :content, :user_id, :report_type)"
+        ),
+        rows,
+    )
+
+
+def _delete(connection, report_id):
+    """Remove a report from the index, before saved_report changes."""
+    if _delete_by_rowid:
+        connection.execute(
+            text(f"DELETE FROM {TABLE} WHERE rowid = :id"), {"id": report_id}
+        )
+        return
+    row = _stored_row(connection, report_id)
+    if row is not None:
+        connection.execute(
+            text(
+                f"INSERT INTO {TABLE} "
+                f"({TABLE}, rowid, title, content, user_id, report_type) "
+                "VALUES ('delete', :id, :title, :content, :user_id, :report_type)"
+            ),
+            row,
+        )
+
+
+# The index is kept in step with saved_report from the ORM rather than by
+# SQL triggers: the ORM sees each report's text as saved, whatever form
+# the column stores it in. A report is removed from the index before its
+# row changes, while the values it was indexed with can still be read.
+# Writes that bypass the ORM must call rebuild_index() afterwards.
+
+
+@event.listens_for(SavedReport, "after_insert")
+def _index_inserted(mapper, connection, report):
+    if _enabled:
+        _insert(connection, [_row(report)])
+
+
+@event.listens_for(SavedReport, "before_update")
+def _unindex_updated(mapper, connection, report):
+    if _enabled:
+        _delete(connection, report.id)
+
+
+@event.listens_for(SavedReport, "after_update")
+def _index_updated(mapper, connection, report):
+    if _enabled:
+        _insert(connection, [_row(report)])
+
+
+@event.listens_for(SavedReport, "before_delete")
+def _index_deleted(mapper, connection, report):
+    if _enabled:
+        _delete(connection, report.id)
+
+
+def rebuild_index():
+    """Index every saved report again, from scratch."""
+    db.session.execute(text(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('delete-all')"))
+    batch = []
+    reports = SavedReport.query.order_by(SavedReport.id).yield_per(REBUILD_BATCH)
+    for report in reports:
+        batch.append(_row(report))
+        if len(batch) == REBUILD_BATCH:
+            _insert(db.session.connection(), batch)
+            batch = []
+    if batch:
+        _insert(db.session.connection(), batch)
+    db.session.commit()
+
+
+def ensure_index(create=True):
+    """Enable syncing the search index, creating and filling it if missing.
+
+    The migration normally creates it; create covers databases made with
+    db.create_all(). Without create, a missing index is left for the
+    migration to make. Search stays disabled, with a warning, until the
+    index exists, on databases other than SQLite and on SQLite builds
+    without FTS5.
+    """
+    global _enabled, _delete_by_rowid
+    if db.engine.dialect.name != "sqlite":
+        logger.warning("Report search needs SQLite with FTS5; it is disabled")
+        return
+    sql = db.session.execute(
+        text("SELECT sql FROM sqlite_master WHERE name = :name"), {"name": TABLE}
+    ).scalar()
+    # An index made before it was contentless is replaced by a migration
+    if (sql is None and not create) or (sql and "content=''" not in sql):
+        logger.warning("Report search is disabled until the database is migrated")
+        return
+    if sql is None:
+        try:
+            db.session.execute(text(CREATE_TABLE))
+        except OperationalError as e:
+            db.session.rollback()
+            logger.warning(f"Report search is disabled: {str(e)}")
+            return
+        sql = CREATE_TABLE
+        rebuild_index()
+        logger.info("Created the report search index")
+    _delete_by_rowid = "contentless_delete=1" in sql
+    _enabled = True
+
+
+# Ranked matches among one user's reports; :match comes from user_match().
+# Only the reports on the page are read from saved_report, for their
+# content to be decoded for snippets.
+SEARCH_QUERY = (
+    "SELECT saved_report.id, saved_report.title, saved_report.report_type, "
+    "saved_report.created_at, saved_report.content, ranked.score "
+    f"FROM (SELECT rowid, "
+    f"bm25({TABLE}, :title_weight, :content_weight, 0.0, 0.0) AS score "
+    f"FROM {TABLE} WHERE {TABLE} MATCH :match ORDER BY score LIMIT :limit) "
+    "AS ranked JOIN saved_report ON saved_report.id = ranked.rowid "
+    "ORDER BY ranked.score"
+)
+
+
+def user_match(user_id, query, report_type=None):
+    """Return the FTS5 query for a user's search, or None if it has no words."""
+    match = match_expression(query)
+    if match is None:
+        return None
+    match = f'user_id:"{int(user_id)}" AND ({{title content}}: {match})'
+    if report_type:
+        match = f'report_type:"{report_type}" AND {match}'
+    return match
+
+
+def search_params(match, limit):
+    return {
+        "match": match,
+        "title_weight": TITLE_WEIGHT,
+        "content_weight": CONTENT_WEIGHT,
+        "limit": limit,
+    }
+
+
+def search_reports(user_id, query, report_type=None, limit=20):
+    """Return the user's reports matching query, best first, with snippets."""
+    match = user_match(user_id, query, report_type)
+    if match is None:
+        return []
+    terms = query_terms(query)
+    rows = db.session.execute(text(SEARCH_QUERY), search_params(match, limit))
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "type": row.report_type,
+            "created_at": datetime.fromisoformat(row.created_at).isoformat(),
+            "snippet": snippet(decompress_text(row.content), terms),
+            # bm25() is lower for better matches
+            "score": round(-row.score, 4),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,194 @@
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+# Trigram similarity a fuzzy match needs to be returned at all
+MIN_SIMILARITY = 0.3
+
+
+def normalize(text):
+    """Fold case and accents and reduce punctuation to single spaces."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.casefold()).split())
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def search_arrays(medications):
+    """Compile medication names into the arrays a MedicationSearchIndex reads.
+
+    Every name (and any brand names listed under "aliases") is numbered:
+
+    names: each normalized name
+    name_lengths: the length of each name
+    name_positions: the source position of each name's medication
+    gram_counts: the number of distinct trigrams of each name
+    words, word_names, word_offsets: every suffix of a name that starts a
+        word, sorted, with the name it belongs to and where in it it starts
+    grams, gram_starts, gram_names: every trigram, sorted, and where the
+        names containing it start in gram_names, then the end
+    """
+    names = []
+    positions = []
+    gram_counts = []
+    words = []
+    names_by_gram = defaultdict(list)
+    for position, medication in enumerate(medications):
+        for name in [medication["name"], *medication.get("aliases", ())]:
+            name = normalize(name)
+            if not name:
+                continue
+            name_id = len(names)
+            names.append(name)
+            positions.append(position)
+            word_starts = [0] + [m.end() for m in re.finditer(" ", name)]
+            for start in word_starts:
+                words.append((name[start:], name_id, start))
+            grams = trigrams(name)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                names_by_gram[gram].append(name_id)
+    words.sort()
+    grams = sorted(names_by_gram)
+    return {
+        "names": np.array(names, dtype=str),
+        "name_lengths": np.array([len(name) for name in names], dtype=np.int64),
+        "name_positions": np.array(positions, dtype=np.int64),
+        "gram_counts": np.array(gram_counts, dtype=np.int64),
+        "words": np.array([word for word, _, _ in words], dtype=str),
+        "word_names": np.array([name_id for _, name_id, _ in words], dtype=np.int64),
+        "word_offsets": np.array([start for _, _, start in words], dtype=np.int64),
+        "grams": np.array(grams, dtype=str),
+        "gram_starts": np.cumsum(
+            [0] + [len(names_by_gram[gram]) for gram in grams], dtype=np.int64
+        ),
+        "gram_names": np.array(
+            [name_id for gram in grams for name_id in names_by_gram[gram]],
+            dtype=np.int64,
+        ),
+    }
+
+
+class MedicationSearchIndex:
+    """Ranked, typo-tolerant search over medication names.
+
+    Every name is indexed twice: as a sorted list of its words for prefix
+    lookups, and by character trigrams for fuzzy matches. A query is
+    answered by:
+
+    1. an exact name match,
+    2. names starting with the query,
+    3. names with a word starting with the query,
+    4. names sharing enough trigrams with the query to be a likely typo,
+
+    in that order, shorter names first within each group.
+
+    Reads the arrays of search_arrays(), which may be memory-mapped and
+    shared by every worker, and fetches the medications it finds with
+    fetch(positions), which returns the medications at those source
+    positions.
+    """
+
+    def __init__(self, arrays, fetch):
+        self._names = arrays["names"]
+        self._name_lengths = arrays["name_lengths"]
+        self._name_positions = arrays["name_positions"]
+        self._gram_counts = arrays["gram_counts"]
+        self._words = arrays["words"]
+        self._word_names = arrays["word_names"]
+        self._word_offsets = arrays["word_offsets"]
+        self._grams = arrays["grams"]
+        self._gram_starts = arrays["gram_starts"]
+        self._gram_names = arrays["gram_names"]
+        self._fetch = fetch
+
+    @classmethod
+    def build(cls, medications):
+        """Index medications held in memory."""
+        return cls(
+            search_arrays(medications),
+            lambda positions: [medications[p] for p in positions],
+        )
+
+    def _prefix_matches(self, query, limit):
+        """Return (name id, group) pairs of names with a word starting with query.
+
+        The group is 0 for the query itself, 1 for a name starting with it
+        and 2 for a name with a later word starting with it. The words with
+        the prefix are one slice of the sorted words, ranked in numpy, and
+        only names that can be among the first limit medications are
+        returned, so a short query does not walk most of the vocabulary.
+        """
+        # The first string after every string starting with query
+        after = query[:-1] + chr(ord(query[-1]) + 1)
+        start, end = np.searchsorted(self._words, [query, after]).tolist()
+        name_ids = self._word_names[start:end]
+        lengths = self._name_lengths[name_ids]
+        groups = np.where(
+            self._word_offsets[start:end] == 0,
+            np.where(lengths == len(query), 0, 1),
+            2,
+        )
+        if end - start > limit:
+            # Rank by group, then length; ties on name are left to search()
+            keys = groups * (int(lengths.max()) + 1) + lengths
+            positions = self._name_positions[name_ids]
+            order = np.argsort(keys, kind="stable")
+            _, first = np.unique(positions[order], return_index=True)
+            if len(first) > limit:
+                # Each medication's best key; worse ones cannot make the page
+                best = np.sort(keys[order][first])
+                keep = keys <= best[limit - 1]
+                name_ids, groups = name_ids[keep], groups[keep]
+        return zip(name_ids.tolist(), groups.tolist())
+
+    def _fuzzy_matches(self, query):
+        """Return {name id: similarity} for names that look like query."""
+        query_grams = sorted(trigrams(query))
+        found = np.searchsorted(self._grams, query_grams)
+        name_ids = [
+            self._gram_names[self._gram_starts[i] : self._gram_starts[i + 1]]
+            for i, gram in zip(found.tolist(), query_grams)
+            if i < len(self._grams) and self._grams[i] == gram
+        ]
+        if not name_ids:
+            return {}
+        name_ids, shared = np.unique(np.concatenate(name_ids), return_counts=True)
+        # Dice coefficient of the two trigram sets
+        similarity = 2 * shared / (len(query_grams) + self._gram_counts[name_ids])
+        likely = similarity >= MIN_SIMILARITY
+        return dict(zip(name_ids[likely].tolist(), similarity[likely].tolist()))
+
+    def search(self, query, limit=10):
+        """Return up to limit medications matching query, best first."""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+
+        # Lower ranks sort first: (group, -similarity, name length, name)
+        ranks = {}
+
+        def consider(name_id, rank):
+            name = str(self._names[name_id])
+            position = int(self._name_positions[name_id])
+            rank = rank + (len(name), name)
+            if position not in ranks or rank < ranks[position]:
+                ranks[position] = rank
+
+        for name_id, group in self._prefix_matches(query, limit):
+            consider(name_id, (group, 0))
+        # Typos are only worth looking for when the prefixes did not fill
+        # the page
+        if len(ranks) < limit:
+            for name_id, similarity in self._fuzzy_matches(query).items():
+                consider(name_id, (3, -similarity))
+
+        best = heapq.nsmallest(limit, ranks, key=ranks.get)
+        return self._fetch(best)
@@ -0,0 +1,182 @@
+import copy
+import secrets
+import threading
+from datetime import datetime, timedelta
+
+from cachetools import LRUCache, TTLCache
+
+from models.models import db, InterviewSession
+
+
+def new_session_id():
+    return secrets.token_urlsafe(16)
+
+
+def new_interview(history, question):
+    """Return the stored state of a freshly started interview.
+
+    history is the chat sent to the model, transcript the [question, answer]
+    pairs so far, question the one awaiting an answer, and draft the latest
+    SOAP notes written from the first draft_turns pairs of the transcript.
+    """
+    return {
+        "history": list(history),
+        "transcript": [],
+        "question": question,
+        "draft": None,
+        "draft_turns": 0,
+    }
+
+
+class MemorySessionStore:
+    """Interviews kept in this process.
+
+    Sessions expire after ttl idle seconds and the least recently used are
+    evicted beyond max_entries. Only suitable for a single worker process.
+    """
+
+    def __init__(self, max_entries, ttl=None):
+        if ttl:
+            self._data = TTLCache(maxsize=max_entries, ttl=ttl)
+        else:
+            self._data = LRUCache(maxsize=max_entries)
+        self._lock = threading.Lock()
+
+    def create(self, interview):
+        """Store a new interview and return its session id."""
+        session_id = new_session_id()
+        with self._lock:
+            self._data[session_id] = copy.deepcopy(interview)
+        return session_id
+
+    def get(self, session_id):
+        """Return a copy of the interview, or None if unknown or expired."""
+        with self._lock:
+            interview = self._data.get(session_id)
+            if interview is None:
+                return None
+            # Re-insert so the idle timer and LRU position are refreshed
+            self._data[session_id] = interview
+            return copy.deepcopy(interview)
+
+    def save(self, session_id, interview):
+        """Store the history, transcript and question of an existing interview.
+
+        Returns False if the interview is gone.
+        """
+        with self._lock:
+            stored = self._data.get(session_id)
+            if stored is None:
+                return False
+            stored = dict(stored)
+            for key in ("history", "transcript", "question"):
+                stored[key] = copy.deepcopy(interview[key])
+            self._data[session_id] = stored
+            return True
+
+    def save_draft(self, session_id, draft, turns):
+        """Store a draft unless one covering as many turns is already stored."""
+        with self._lock:
+            stored = self._data.get(session_id)
+            if stored is None or stored["draft_turns"] >= turns:
+                return False
+            self._data[session_id] = dict(stored, draft=draft, draft_turns=turns)
+            return True
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+
+class DatabaseSessionStore:
+    """Interviews kept in the InterviewSession table.
+
+    Every worker process sees the same sessions, so an interview can be
+    continued by whichever worker receives the next answer. Expired and
+    surplus sessions are removed whenever a new interview starts.
+    """
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    def _expired_before(self):
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    def create(self, interview):
+        session_id = new_session_id()
+        db.session.add(
+            InterviewSession(
+                id=session_id,
+                history=interview["history"],
+                transcript=interview["transcript"],
+                question=interview["question"],
+            )
+        )
+        db.session.commit()
+        self.prune()
+        return session_id
+
+    def get(self, session_id):
+        record = db.session.get(InterviewSession, session_id)
+        if record is None or (self.ttl and record.updated_at < self._expired_before()):
+            return None
+        return {
+            "history": list(record.history),
+            "transcript": list(record.transcript),
+            "question": record.question,
+            "draft": record.draft,
+            "draft_turns": record.draft_turns,
+        }
+
+    def save(self, session_id, interview):
+        updated = InterviewSession.query.filter_by(id=session_id).update(
+            {
+                "history": list(interview["history"]),
+                "transcript": list(interview["transcript"]),
+                "question": interview["question"],
+                "updated_at": datetime.utcnow(),
+            }
+        )
+        db.session.commit()
+        return bool(updated)
+
+    def save_draft(self, session_id, draft, turns):
+        # Conditional update: a slower refresh of an older transcript, maybe
+        # from another worker, must not overwrite a newer draft
+        updated = InterviewSession.query.filter(
+            InterviewSession.id == session_id, InterviewSession.draft_turns < turns
+        ).update({"draft": draft, "draft_turns": turns})
+        db.session.commit()
+        return bool(updated)
+
+    def delete(self, session_id):
+        InterviewSession.query.filter_by(id=session_id).delete()
+        db.session.commit()
+
+    def prune(self):
+        """Delete expired sessions and the least recently used beyond max_entries."""
+        if self.ttl:
+            InterviewSession.query.filter(
+                InterviewSession.updated_at < self._expired_before()
+            ).delete()
+        if self.max_entries:
+            surplus = (
+                db.session.query(InterviewSession.id)
+                .order_by(InterviewSession.updated_at.desc())
+                .offset(self.max_entries)
+                .subquery()
+            )
+            InterviewSession.query.filter(
+                InterviewSession.id.in_(db.select(surplus.c.id))
+            ).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def make_session_store(backend, max_entries, ttl=None):
+    """Build a session store for the configured backend name."""
+    if backend == "memory":
+        return MemorySessionStore(max_entries, ttl)
+    if backend == "database":
+        return DatabaseSessionStore(max_entries, ttl)
+    raise ValueError(f"Unknown session store backend: {backend}")
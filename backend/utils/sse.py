@@ -0,0 +1,21 @@
+import json
+
+from flask import Response, stream_with_context
+
+
+def format_sse(data, event=None):
+    """Format one server-sent event with a JSON payload."""
+    message = f"data: {json.dumps(data)}\n\n"
+    if event:
+        message = f"event: {event}\n{message}"
+    return message
+
+
+def sse_response(events):
+    """Stream an iterable of formatted events as a text/event-stream response."""
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,34 +1,63 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import ReactMarkdown from "react-markdown";
 import { useAuth } from "../contexts/AuthContext";
 
 interface Report {
   id: number;
   title: string;
-  content: string;
   type: "soap" | "analysis";
   created_at: string;
 }
 
+interface SearchResult extends Report {
+  snippet: string;
+}
+
+type DocumentType = "soap" | "analysis" | "all";
+
+const PAGE_SIZE = 20;
+const SEARCH_DEBOUNCE_MS = 250;
+
 export const Documents = () => {
   const [documents, setDocuments] = useState<Report[]>([]);
-  const [selectedType, setSelectedType] = useState<"soap" | "analysis" | "all">(
-    "all"
+  const [selectedType, setSelectedType] = useState<DocumentType>("all");
+  // Pages that arrive after the type changed belong to the old listing
+  const listedType = useRef<DocumentType>(selectedType);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [query, setQuery] = useState("");
+  // Search results replace the listing while there is a query
+  const [searchResults, setSearchResults] = useState<SearchResult[] | null>(
+    null
   );
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const { user } = useAuth();
 
   useEffect(() => {
+    listedType.current = selectedType;
     if (user) {
-      fetchDocuments();
+      setDocuments([]);
+      setNextCursor(null);
+      fetchDocuments(selectedType);
     }
-  }, [user]);
+  }, [user, selectedType]);
 
-  const fetchDocuments = async () => {
+  // Lists only titles and dates, a page at a time and filtered by type on
+  // the server; the content is fetched when a document is printed
+  const fetchDocuments = async (type: DocumentType, cursor?: string) => {
     try {
+      const params = new URLSearchParams({
+        fields: "metadata",
+        limit: String(PAGE_SIZE),
+      });
+      if (type !== "all") {
+        params.set("type", type);
+      }
+      if (cursor) {
+        params.set("cursor", cursor);
+      }
       const response = await fetch(
-        `${import.meta.env.VITE_API_BASE_URL}/reports`,
+        `${import.meta.env.VITE_API_BASE_URL}/reports?${params}`,
         {
           credentials: "include",
         }
@@ -37,7 +66,13 @@ export const Documents = () => {
         throw new Error("Failed to fetch documents");
       }
       const data = await response.json();
-      setDocuments(data.reports);
+      if (listedType.current !== type) {
+        return;
+      }
+      setDocuments((previous) =>
+        cursor ? [...previous, ...data.reports] : data.reports
+      );
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error("Failed to fetch documents:", error);
       setError("Failed to load documents. Please try again.");
@@ -46,14 +81,70 @@ export const Documents = () => {
     }
   };
 
-  const filteredDocuments =
-    selectedType === "all"
-      ? documents
-      : documents.filter((doc) => doc.type === selectedType);
+  useEffect(() => {
+    if (!user || !query.trim()) {
+      setSearchResults(null);
+      return;
+    }
 
-  const handlePrint = (content: string) => {
+    // Debounce keystrokes and drop responses to superseded queries
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({ q: query });
+        if (selectedType !== "all") {
+          params.set("type", selectedType);
+        }
+        const response = await fetch(
+          `${import.meta.env.VITE_API_BASE_URL}/reports/search?${params}`,
+          {
+            credentials: "include",
+            signal: controller.signal,
+          }
+        );
+        if (!response.ok) {
+          throw new Error("Failed to search documents");
+        }
+        setSearchResults((await response.json()).results);
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        console.error("Failed to search documents:", error);
+        setError("Failed to search documents. Please try again.");
+      }
+    }, SEARCH_DEBOUNCE_MS);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [user, query, selectedType]);
+
+  // Both are already limited to the selected type by the server
+  const filteredDocuments: (Report | SearchResult)[] =
+    searchResults ?? documents;
+
+  const handlePrint = async (id: number) => {
+    // Open the window before awaiting, or it is treated as a popup
     const printWindow = window.open("", "_blank");
     if (printWindow) {
+      let content: string;
+      try {
+        const response = await fetch(
+          `${import.meta.env.VITE_API_BASE_URL}/reports/${id}`,
+          {
+            credentials: "include",
+          }
+        );
+        if (!response.ok) {
+          throw new Error("Failed to fetch document");
+        }
+        content = (await response.json()).report.content;
+      } catch (error) {
+        console.error("Failed to fetch document:", error);
+        printWindow.close();
+        setError("Failed to load document. Please try again.");
+        return;
+      }
       printWindow.document.write(`
         <html>
           <head>
@@ -84,6 +175,13 @@ export const Documents = () => {
 
   return (
     <div className="documents-container">
+      <input
+        type="text"
+        className="search-input"
+        placeholder="Search documents..."
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+      />
       <div className="document-filters">
         <button
           className={`filter-btn ${selectedType === "all" ? "active" : ""}`}
@@ -119,15 +217,24 @@ export const Documents = () => {
               Type:{" "}
               {doc.type === "soap" ? "Medical Assessment" : "Document Analysis"}
             </div>
+            {"snippet" in doc && <ReactMarkdown>{doc.snippet}</ReactMarkdown>}
             <button
               className="print-btn"
-              onClick={() => handlePrint(doc.content)}
+              onClick={() => handlePrint(doc.id)}
             >
               Print
             </button>
           </div>
         ))}
       </div>
+      {nextCursor && !searchResults && (
+        <button
+          className="filter-btn"
+          onClick={() => fetchDocuments(selectedType, nextCursor)}
+        >
+          Load More
+        </button>
+      )}
     </div>
   );
 };
@@ -2,6 +2,9 @@ import { useState, useEffect, useRef } from "react";
 import { Medication, Interaction } from "../types";
 import { api } from "../services/api";
 
+const SUGGESTION_LIMIT = 10;
+const SEARCH_DEBOUNCE_MS = 150;
+
 interface MedicationCheckerProps {
   isActive: boolean;
 }
@@ -17,47 +20,49 @@ export const MedicationChecker = ({ isActive }: MedicationCheckerProps) => {
   const [isLoading, setIsLoading] = useState(false);
   const [interactions, setInteractions] = useState<Interaction[]>([]);
   const [error, setError] = useState<string | null>(null);
-  const [allMedications, setAllMedications] = useState<Medication[]>([]);
-  const [isLoadingMedications, setIsLoadingMedications] = useState(false);
   const searchRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
 
-  // Fetch all medications once when component becomes active
+  // Search medications on the server as the query changes
   useEffect(() => {
-    const fetchMedications = async () => {
-      if (!isActive || allMedications.length > 0) return;
-
-      setIsLoadingMedications(true);
-      try {
-        const data = await api.getMedications();
-        setAllMedications(data);
-      } catch (err) {
-        console.error("Error fetching medications:", err);
-        setError("Failed to fetch medications. Please try again.");
-      } finally {
-        setIsLoadingMedications(false);
-      }
-    };
-
-    fetchMedications();
-  }, [isActive, allMedications.length]);
-
-  // Filter medications based on search query
-  useEffect(() => {
-    if (query.length < 2) {
+    if (!isActive || query.length < 2) {
       setSuggestions([]);
       setIsOpen(false);
       return;
     }
 
-    const filteredMedications = allMedications.filter(
-      (medication) =>
-        medication.name.toLowerCase().includes(query.toLowerCase()) &&
-        !selectedMedications.some((selected) => selected.id === medication.id)
-    );
-    setSuggestions(filteredMedications);
-    setIsOpen(true);
-  }, [query, selectedMedications, allMedications]);
+    // Debounce keystrokes and drop responses to superseded queries
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const results = await api.searchMedications(
+          query,
+          SUGGESTION_LIMIT + selectedMedications.length,
+          controller.signal
+        );
+        setSuggestions(
+          results
+            .filter(
+              (medication) =>
+                !selectedMedications.some(
+                  (selected) => selected.id === medication.id
+                )
+            )
+            .slice(0, SUGGESTION_LIMIT)
+        );
+        setIsOpen(true);
+      } catch (err) {
+        if (controller.signal.aborted) return;
+        console.error("Error searching medications:", err);
+        setError("Failed to search medications. Please try again.");
+      }
+    }, SEARCH_DEBOUNCE_MS);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [isActive, query, selectedMedications]);
 
   useEffect(() => {
     const handleClickOutside = (event: MouseEvent) => {
@@ -154,34 +159,25 @@ export const MedicationChecker = ({ isActive }: MedicationCheckerProps) => {
                   : ""
               }
               className="search-input"
-              disabled={isLoading || isLoadingMedications}
+              disabled={isLoading}
             />
           </div>
-          {isOpen &&
-            (isLoadingMedications ? (
-              <div className="suggestions-dropdown">
-                <div className="suggestion-item loading">
-                  Loading medications...
-                </div>
-              </div>
-            ) : (
-              suggestions.length > 0 && (
-                <div className="suggestions-dropdown">
-                  {suggestions.map((medication) => (
-                    <div
-                      key={medication.id}
-                      className="suggestion-item"
-                      onClick={() => handleSelectMedication(medication)}
-                    >
-                      <div className="suggestion-name">{medication.name}</div>
-                      <div className="suggestion-description">
-                        {medication.description}
-                      </div>
-                    </div>
-                  ))}
+          {isOpen && suggestions.length > 0 && (
+            <div className="suggestions-dropdown">
+              {suggestions.map((medication) => (
+                <div
+                  key={medication.id}
+                  className="suggestion-item"
+                  onClick={() => handleSelectMedication(medication)}
+                >
+                  <div className="suggestion-name">{medication.name}</div>
+                  <div className="suggestion-description">
+                    {medication.description}
+                  </div>
                 </div>
-              )
-            ))}
+              ))}
+            </div>
+          )}
         </div>
         <button
           onClick={handleSubmit}
@@ -210,13 +206,13 @@ export const MedicationChecker = ({ isActive }: MedicationCheckerProps) => {
                   <div className="interaction-medications">
                     <strong>Medications:</strong>{" "}
                     {
-                      allMedications.find(
+                      selectedMedications.find(
                         (m) => m.id === interaction.medication1
                       )?.name
                     }{" "}
                     +{" "}
                     {
-                      allMedications.find(
+                      selectedMedications.find(
                         (m) => m.id === interaction.medication2
                       )?.name
                     }
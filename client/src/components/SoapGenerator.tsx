@@ -123,7 +123,12 @@ const MedicalInterview: React.FC = () => {
           headers: {
             "Content-Type": "application/json",
           },
-          body: JSON.stringify({ interview_history: history }),
+          // The server drafts the notes from its own transcript of the
+          // session; the history is a fallback if the session has expired
+          body: JSON.stringify({
+            session_id: sessionId,
+            interview_history: history,
+          }),
         }
       );
 
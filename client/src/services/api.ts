@@ -11,6 +11,22 @@ export const api = {
     return response.json();
   },
 
+  searchMedications: async (
+    query: string,
+    limit: number,
+    signal?: AbortSignal
+  ): Promise<Medication[]> => {
+    const params = new URLSearchParams({ q: query, limit: String(limit) });
+    const response = await fetch(
+      `${API_BASE_URL}/medications/search?${params}`,
+      { signal }
+    );
+    if (!response.ok) {
+      throw new Error("Failed to search medications");
+    }
+    return response.json();
+  },
+
   checkInteractions: async (medications: string[]): Promise<Interaction[]> => {
     const response = await fetch(`${API_BASE_URL}/check-interactions`, {
       method: "POST",